@@ -0,0 +1,244 @@
+"""ورود کاربران با جدول یکپارچه credentials و رمزهای هش‌شده.
+
+برای هر نام کاربری (مدیر، معاون، آموزگار یا دانش‌آموز) یک ردیف در
+``credentials`` هست: نقش، جدول و شناسه ردیف اصلی و هش رمز. ورود فقط یک
+خواندن روی ایندکس یکتای نام کاربری است و رمز همین‌جا با PBKDF2-SHA256
+بررسی می‌شود؛ ردیف نمایه فقط پس از ورود موفق با کلید اصلی خوانده می‌شود.
+
+- هزینه هش با ``DARSBAN_PASSWORD_ITERATIONS`` تنظیم می‌شود؛ هش‌های با
+  هزینه قدیمی در اولین ورود موفق دوباره ساخته می‌شوند.
+- تلاش‌های ناموفق تکراری (همان نام کاربری با همان رمز اشتباه) تا
+  ``DARSBAN_LOGIN_NEGATIVE_TTL`` ثانیه بدون پایگاه داده و بدون هش رد می‌شوند.
+- نام کاربری ناموجود هم یک بررسی هش (روی هش ثابت) می‌گیرد تا زمان پاسخ
+  وجود یا نبود حساب را لو ندهد.
+- حساب‌های قدیمی (رمز ساده در ستون ``رمز_عبور``) با هش خالی فهرست می‌شوند؛
+  در اولین ورود موفق رمز هش و ستون رمز ساده پاک می‌شود. با
+  ``python auth.py`` همه آن‌ها یک‌جا هش می‌شوند.
+
+همه نوشتن‌هایی که نام کاربری، نقش یا رمز را تغییر می‌دهند باید از
+``add_accounts``، ``update_account`` و ``delete_account`` بگذرند؛ این دو
+تابع آخر نشست‌های باز حساب (``sessions``) را هم باطل می‌کنند.
+"""
+import base64
+import hashlib
+import hmac
+import os
+import secrets
+
+from data_access import delete_rows, fetch_rows, insert_linked_rows, insert_rows, map_concurrently, update_rows
+from query_cache import QueryCache, make_key
+from sessions import revoke_account
+from views import view_columns
+
+PASSWORD_ITERATIONS = int(os.environ.get("DARSBAN_PASSWORD_ITERATIONS", 100_000))
+NEGATIVE_TTL = float(os.environ.get("DARSBAN_LOGIN_NEGATIVE_TTL", 30))
+ALGORITHM = "pbkdf2_sha256"
+STUDENT_ROLE = "دانش‌آموز"
+ACCOUNT_TABLES = ("users", "students")
+
+# تلاش‌های ناموفق اخیر؛ رمزها فقط به صورت HMAC با کلید تصادفی همین فرایند نگه داشته می‌شوند
+failed_logins = QueryCache(maxsize=4096, ttl=NEGATIVE_TTL)
+_failure_key = secrets.token_bytes(32)
+_dummy_hash = None
+
+
+# -------------------------------
+# هش رمز
+# -------------------------------
+
+def hash_password(password, iterations=None):
+    """هش رمز به صورت ``pbkdf2_sha256$تکرار$نمک$هش`` (نمک تصادفی برای هر رمز)."""
+    iterations = iterations or PASSWORD_ITERATIONS
+    salt = secrets.token_hex(16)
+    digest = hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"), salt.encode("ascii"), iterations)
+    return f"{ALGORITHM}${iterations}${salt}${base64.b64encode(digest).decode('ascii')}"
+
+
+def verify_password(password, encoded):
+    """بررسی رمز با هش ذخیره‌شده (مقایسه در زمان ثابت)."""
+    try:
+        algorithm, iterations, salt, expected = encoded.split("$")
+    except (AttributeError, ValueError):
+        return False
+    if algorithm != ALGORITHM:
+        return False
+    digest = hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"), salt.encode("ascii"), int(iterations))
+    return hmac.compare_digest(base64.b64encode(digest).decode("ascii"), expected)
+
+
+def needs_rehash(encoded):
+    """هش با هزینه‌ای غیر از ``PASSWORD_ITERATIONS`` ساخته شده است."""
+    return encoded.split("$")[1] != str(PASSWORD_ITERATIONS)
+
+
+def _waste_verify(password):
+    """بررسی رمز روی یک هش ثابت با همان هزینه (نتیجه همیشه نادیده گرفته می‌شود)."""
+    global _dummy_hash
+    if _dummy_hash is None:
+        _dummy_hash = hash_password(secrets.token_hex(16))
+    verify_password(password, _dummy_hash)
+
+
+# -------------------------------
+# حافظه تلاش‌های ناموفق
+# -------------------------------
+
+def _failure_cache_key(username, password):
+    attempt = hmac.new(_failure_key, password.encode("utf-8"), hashlib.sha256).hexdigest()
+    return make_key("credentials", "login", {"نام_کاربر": username}, attempt)
+
+
+def _remember_failure(username, password):
+    # برای نام کاربری ناموجود هم فقط همین رمز به خاطر سپرده می‌شود، مثل حساب موجود
+    failed_logins.set(_failure_cache_key(username, password), True)
+
+
+def _recently_failed(username, password):
+    return bool(failed_logins.get(_failure_cache_key(username, password)))
+
+
+def forget_failures(username):
+    """پاک کردن تلاش‌های ناموفق یک نام کاربری (پس از ساخت حساب یا تغییر رمز)."""
+    failed_logins.invalidate_rows("credentials", [{"نام_کاربر": username}])
+
+
+# -------------------------------
+# ورود
+# -------------------------------
+
+def authenticate(username, password):
+    """ردیف نمایه (از users یا students) در صورت درستی نام کاربری و رمز، وگرنه None."""
+    if not username or not password or _recently_failed(username, password):
+        return None
+    # ورود هرگز از حافظه نهان پرس‌وجوها پاسخ داده نمی‌شود
+    credentials = fetch_rows("credentials", "id, جدول, row_id, رمز_هش", {"نام_کاربر": username}, cached=False)
+    if not credentials:
+        _waste_verify(password)
+        _remember_failure(username, password)
+        return None
+    credential = credentials[0]
+    table = credential["جدول"]
+
+    if credential["رمز_هش"] is None:
+        # حساب قدیمی: مقایسه با رمز ساده و ارتقا به هش
+        rows = fetch_rows(table, ", ".join(("رمز_عبور",) + view_columns("profile", table)),
+                          {"id": credential["row_id"]}, cached=False)
+        plain = rows[0].pop("رمز_عبور") if rows else None
+        if plain is None or not hmac.compare_digest(str(plain).encode("utf-8"), password.encode("utf-8")):
+            _waste_verify(password)
+            _remember_failure(username, password)
+            return None
+        _store_hash(credential, password)
+        update_rows(table, {"رمز_عبور": None}, {"id": credential["row_id"]})
+        return rows[0]
+
+    if not verify_password(password, credential["رمز_هش"]):
+        _remember_failure(username, password)
+        return None
+    if needs_rehash(credential["رمز_هش"]):
+        _store_hash(credential, password)
+    rows = fetch_rows(table, ", ".join(view_columns("profile", table)), {"id": credential["row_id"]}, cached=False)
+    return rows[0] if rows else None
+
+
+def _store_hash(credential, password):
+    update_rows("credentials", {"رمز_هش": hash_password(password)}, {"id": credential["id"]})
+
+
+# -------------------------------
+# نوشتن حساب‌ها (جدول اصلی و credentials با هم)
+# -------------------------------
+
+def _role(table, row):
+    return STUDENT_ROLE if table == "students" else row.get("نقش")
+
+
+def add_accounts(table, rows):
+    """درج کاربران یا دانش‌آموزان همراه با ردیف credentials هر کدام.
+
+    هر ردیف ``رمز_عبور`` ساده (که هش می‌شود و در جدول اصلی ذخیره نمی‌شود)
+    یا ``رمز_هش`` آماده دارد. نام کاربری باید در هر دو جدول یکتا باشد.
+    ردیف‌های حساب و credentials با هم درج می‌شوند؛ اگر یکی شکست بخورد هیچ
+    حسابی بدون credentials باقی نمی‌ماند.
+    """
+    rows = [dict(rows)] if isinstance(rows, dict) else [dict(row) for row in rows]
+    if not rows:
+        return []
+    taken = fetch_rows("credentials", "نام_کاربر", {"نام_کاربر": [row["نام_کاربر"] for row in rows]}, cached=False)
+    if taken:
+        raise ValueError(f"نام کاربری تکراری است: {', '.join(row['نام_کاربر'] for row in taken)}")
+    # هش PBKDF2 (که GIL را آزاد می‌کند) برای همه ردیف‌های یک دسته هم‌زمان ساخته می‌شود
+    passwords = [(row.pop("رمز_هش", None), row.pop("رمز_عبور", None)) for row in rows]
+    if any(hashed is None and password is None for hashed, password in passwords):
+        raise ValueError("برای هر حساب رمز_عبور یا رمز_هش لازم است.")
+    hashes = map_concurrently(lambda pair: pair[0] or hash_password(str(pair[1])), passwords)
+    hash_by_username = {row["نام_کاربر"]: hashed for row, hashed in zip(rows, hashes)}
+    # ردیف حساب و ردیف credentials با هم درج می‌شوند (یا هیچ‌کدام)
+    inserted, _ = insert_linked_rows(table, rows, "credentials", lambda row: {
+        "نام_کاربر": row["نام_کاربر"], "نقش": _role(table, row), "جدول": table, "row_id": row["id"],
+        "رمز_هش": hash_by_username[row["نام_کاربر"]],
+    })
+    for row in inserted:
+        forget_failures(row["نام_کاربر"])
+    return inserted
+
+
+def add_account(table, data):
+    return add_accounts(table, [data])[0]
+
+
+def update_account(table, values, filters):
+    """ویرایش ردیف‌های ``table``؛ رمز جدید (اگر خالی نباشد) هش و در credentials ذخیره می‌شود."""
+    values = dict(values)
+    password = values.pop("رمز_عبور", None)
+    if password:
+        # رمز ساده احتمالی حساب قدیمی هم پاک می‌شود
+        values["رمز_عبور"] = None
+    updated = update_rows(table, values, filters) if values else fetch_rows(table, "*", filters, cached=False)
+    for row in updated:
+        changes = {"نام_کاربر": row["نام_کاربر"], "نقش": _role(table, row)}
+        if password:
+            changes["رمز_هش"] = hash_password(str(password))
+        update_rows("credentials", changes, {"جدول": table, "row_id": row["id"]})
+        forget_failures(row["نام_کاربر"])
+        # نشست‌های باز این حساب نمایه قدیمی (یا رمز قدیمی) را نگه داشته‌اند
+        revoke_account(table, row["id"])
+    return updated
+
+
+def delete_account(table, filters):
+    deleted = delete_rows(table, filters)
+    for row in deleted:
+        delete_rows("credentials", {"جدول": table, "row_id": row["id"]})
+        revoke_account(table, row["id"])
+    return deleted
+
+
+def hash_legacy_passwords():
+    """هش همه رمزهای ساده باقی‌مانده و پاک کردن ستون رمز_عبور؛ خروجی: تعداد حساب‌ها.
+
+    اگر نام کاربری یک دانش‌آموز با یک کاربر یکی باشد، مانند ورود قبلی کاربر اولویت دارد.
+    """
+    count = 0
+    for table in ACCOUNT_TABLES:
+        columns = "id, نام_کاربر, رمز_عبور" + (", نقش" if table == "users" else "")
+        for row in fetch_rows(table, columns, cached=False):
+            if row["رمز_عبور"] is None or not row["نام_کاربر"]:
+                continue
+            existing = fetch_rows("credentials", "id, جدول, row_id", {"نام_کاربر": row["نام_کاربر"]}, cached=False)
+            hashed = hash_password(str(row["رمز_عبور"]))
+            if not existing:
+                insert_rows("credentials", {"نام_کاربر": row["نام_کاربر"], "نقش": _role(table, row), "جدول": table,
+                                            "row_id": row["id"], "رمز_هش": hashed})
+            elif (existing[0]["جدول"], existing[0]["row_id"]) == (table, row["id"]):
+                update_rows("credentials", {"رمز_هش": hashed}, {"id": existing[0]["id"]})
+            else:
+                continue
+            update_rows(table, {"رمز_عبور": None}, {"id": row["id"]})
+            count += 1
+    return count
+
+
+if __name__ == "__main__":
+    # هش یک‌جای رمزهای ساده حساب‌های قدیمی (به جای ارتقا در اولین ورود)
+    print(f"رمز {hash_legacy_passwords()} حساب هش شد.")
@@ -0,0 +1,79 @@
+"""ریزبنچمارک آماده‌سازی فونت: تنظیم تکراری قبلی در برابر ماژول farsi_style.
+
+راه‌اندازی سرد (import تا اولین نمودار) در یک فرایند تازه اندازه گرفته
+می‌شود. روش قبلی در هر پنل ``FontProperties`` تازه می‌ساخت و rcParams را
+روی «Vazir» می‌گذاشت بی‌آنکه فونت را در font_manager ثبت کند؛ پس هر رسم
+دنبال خانواده‌ای ناموجود می‌گشت.
+
+اجرا از ریشه مخزن:
+    python -m benchmarks.font_setup
+"""
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CHARTS = 20
+
+# تنظیم قبلی: سه بار در import صفحه و یک بار در هر اجرای پنل دانش‌آموز
+LEGACY_SETUP = """
+import matplotlib.pyplot as plt
+from matplotlib import font_manager
+def setup():
+    font_prop = font_manager.FontProperties(fname="fonts/Vazir.ttf")
+    plt.rcParams["font.family"] = font_prop.get_name()
+    plt.rcParams["axes.unicode_minus"] = False
+    return font_prop
+"""
+
+CURRENT_SETUP = """
+import farsi_style
+def setup():
+    return farsi_style.font_prop
+"""
+
+# اولین نمودار پس از import و میانگین نمودارهای بعدی (هر کدام با داده تازه، بدون حافظه نهان)
+PROBE = """
+import time
+start = time.perf_counter()
+{setup}
+setup(); setup(); setup()
+from matplotlib.figure import Figure
+from io import BytesIO
+def draw(i):
+    font_prop = setup()
+    fig = Figure(figsize=(4, 3))
+    ax = fig.add_subplot()
+    ax.plot([1, 2, 3], [1, 2, i])
+    ax.set_title("عنوان", fontproperties=font_prop)
+    ax.legend(["نمره"], prop=font_prop)
+    fig.savefig(BytesIO(), format="png", dpi=100)
+draw(0)
+cold = time.perf_counter() - start
+start = time.perf_counter()
+for _ in range(1000):
+    setup()
+per_panel = (time.perf_counter() - start) / 1000
+start = time.perf_counter()
+for i in range({charts}):
+    draw(i)
+print(cold, per_panel, (time.perf_counter() - start) / {charts})
+"""
+
+
+def _probe(setup):
+    code = PROBE.format(setup=setup, charts=CHARTS)
+    out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True)
+    return [float(value) for value in out.stdout.split()]
+
+
+def main(runs=5):
+    for name, setup in (("قبلی", LEGACY_SETUP), ("farsi_style", CURRENT_SETUP)):
+        samples = [_probe(setup) for _ in range(runs)]
+        cold, per_panel, per_chart = (min(column) for column in zip(*samples))
+        print(f"{name:12} راه‌اندازی سرد: {cold * 1000:7.1f} ms   تنظیم هر پنل: {per_panel * 1e6:6.1f} µs"
+              f"   هر نمودار: {per_chart * 1000:6.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
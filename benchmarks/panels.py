@@ -0,0 +1,208 @@
+"""بنچمارک بخش داده و محاسبه پنل‌ها و مسیر کارنامه PDF، بدون Streamlit.
+
+هر سناریو همان توابع داده ``panel_data`` را که پنل متناظر در ``main.py``
+صدا می‌زند، همراه با نمودارهای آن پنل (بدون ویجت‌ها) اجرا می‌کند؛ پیش از هر
+تکرار حافظه نهان پرس‌وجوها و نمودارها خالی می‌شود تا هزینه کامل یک بار
+نمایش اندازه گرفته شود.
+
+نتیجه JSON است (تعداد ردیف‌های داده، و کمینه/میانه/میانگین هر سناریو به میلی‌ثانیه).
+با ``--compare`` نتیجه با یک اجرای قبلی مقایسه می‌شود و اگر میانه سناریویی
+بیش از ``--threshold`` کندتر شده باشد، خروجی فرایند ۱ است.
+
+اجرا از ریشه مخزن:
+    python -m benchmarks.panels --db bench.db -o results.json
+    python -m benchmarks.panels --db bench.db --compare baseline.json
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+
+import auth
+import charts
+import data_access
+import panel_data
+import report_card
+from benchmarks import synthetic_school
+from data_access import SQLiteBackend, count_rows, fetch_rows, fetch_view
+from grading import scale_for
+from query_cache import query_cache
+
+
+def _clear_caches():
+    query_cache.clear()
+    charts.chart_cache.clear()
+    auth.failed_logins.clear()
+
+
+# -------------------------------
+# سناریوها (هر کدام معادل یک پنل)
+# -------------------------------
+
+def overall_statistics(subject):
+    """main.show_overall_statistics: رتبه‌بندی کلی و نمودار دایره‌ای همه دروس کلاس."""
+    rollups_df = fetch_view("class_statistics", "score_rollups", {"teacher_id": subject["teacher_id"]})
+    scale = scale_for(subject["school"])
+    panel_data.ranking(rollups_df, scale)
+    for lesson in sorted(rollups_df["درس"].unique()):
+        avg_per_student = panel_data.ranking(rollups_df, scale, lesson)
+        charts.pie_chart(scale.level_counts(avg_per_student["سطح عملکرد"]), "توزیع سطح عملکرد کلاس",
+                         size=(6, 6), title_size=14)
+
+
+def individual_reports(subject):
+    """main.show_teacher_panel + show_individual_reports برای یک دانش‌آموز و همه دروس او."""
+    data = panel_data.teacher_data(subject["teacher_id"])
+    scale = scale_for(subject["school"])
+    student_df = data["scores"][data["scores"]["student_id"] == subject["student_id"]]
+    for lesson in sorted(student_df["درس"].unique()):
+        lesson_df, performance_counts, _ = panel_data.individual_report(
+            student_df, data["rollups"], subject["student_id"], lesson, scale
+        )
+        charts.line_chart(lesson_df["شماره نمره"], lesson_df["نمره"], f"روند نمرات {lesson}", "شماره نمره", "نمره",
+                          size=(7, 4), ylim=(0.5, 4.5), title_size=14)
+        charts.pie_chart(performance_counts, "توزیع نمرات ثبت شده", size=(5.5, 5.5), title_size=12)
+
+
+def _student_report(subject):
+    scores_df = fetch_view("student_panel", "scores", {"student_id": subject["student_id"]})
+    report_df = panel_data.student_report(subject["student_id"], subject["teacher_id"], subject["class"],
+                                          scale_for(subject["school"]))
+    return scores_df, report_df, panel_data.progress_series(scores_df)
+
+
+def student_panel(subject):
+    """main.show_student_panel: نمودارهای هر درس و کارنامه کلی (بدون ساخت PDF)."""
+    scores_df, _, progress_series = _student_report(subject)
+    scale = scale_for(subject["school"])
+    for lesson in scores_df["درس"].unique():
+        lesson_df, performance_counts = panel_data.lesson_history(scores_df[scores_df["درس"] == lesson], scale)
+        charts.line_chart(lesson_df["شماره نمره"], lesson_df["نمره"], f"نمودار پیشرفت در درس {lesson}",
+                          "شماره نمره", "نمره", size=(6, 3.5))
+        charts.pie_chart(performance_counts, f"توزیع سطح عملکرد - {lesson}",
+                         size=(4.5, 4.5), title_size=12, donut=True)
+    charts.multi_line_chart(progress_series, "نمودار پیشرفت نمرات در تمام دروس", "شماره نمره", "نمره", (6, 3.5))
+
+
+def report_card_pdf(subject):
+    """report_card.render_pdf: کارنامه PDF یک دانش‌آموز (نمودار ۳۰۰ dpi و WeasyPrint)."""
+    _, report_df, progress_series = _student_report(subject)
+    meta = {"نام": subject["student"], "مدرسه": subject["school"], "پایه": subject["grade"], "کلاس": subject["class"]}
+    report_card.render_pdf(meta, report_df, progress_series)
+
+
+def login(subject):
+    """main.authenticate: ورود آموزگار و دانش‌آموز و یک تلاش ناموفق تکراری."""
+    for username in (subject["teacher_username"], subject["student_username"]):
+        assert auth.authenticate(username, synthetic_school.PASSWORD)
+    for _ in range(2):
+        assert auth.authenticate(subject["student_username"], "رمز اشتباه") is None
+
+
+DATASET_TABLES = ("users", "students", "scores", "score_rollups", "credentials")
+
+SCENARIOS = {
+    "overall_statistics": overall_statistics,
+    "individual_reports": individual_reports,
+    "student_panel": student_panel,
+    "report_card_pdf": report_card_pdf,
+    "login": login,
+}
+
+
+# -------------------------------
+# اجرا و گزارش
+# -------------------------------
+
+def pick_subject():
+    """اولین آموزگار پایگاه داده و اولین دانش‌آموز او (ثابت برای داده مصنوعی یکسان)."""
+    teacher = fetch_rows("users", "id, نام_کاربر, نام_کامل, مدرسه", {"نقش": "آموزگار"}, order_by="id", limit=1)[0]
+    student = fetch_rows("students", "id, نام_کاربر, student, پایه, کلاس", {"teacher_id": teacher["id"]},
+                         order_by="id", limit=1)[0]
+    return {"teacher_id": teacher["id"], "teacher_username": teacher["نام_کاربر"], "teacher": teacher["نام_کامل"],
+            "school": teacher["مدرسه"], "student_id": student["id"], "student_username": student["نام_کاربر"],
+            "student": student["student"],
+            "grade": student["پایه"], "class": student["کلاس"]}
+
+
+def run(scenarios, subject, repeat):
+    results = {}
+    for name in scenarios:
+        samples = []
+        try:
+            for _ in range(repeat):
+                _clear_caches()
+                start = time.perf_counter()
+                SCENARIOS[name](subject)
+                samples.append((time.perf_counter() - start) * 1000)
+        except (ImportError, OSError) as e:
+            # مثلاً WeasyPrint بدون کتابخانه‌های سیستمی pango
+            results[name] = {"skipped": str(e)}
+            continue
+        results[name] = {
+            "min_ms": round(min(samples), 2),
+            "median_ms": round(statistics.median(samples), 2),
+            "mean_ms": round(statistics.fmean(samples), 2),
+            "runs": repeat,
+        }
+    return results
+
+
+def regressions(current, baseline, threshold):
+    """سناریوهایی که میانه آن‌ها بیش از ``threshold`` (نسبت) از خط پایه کندتر است."""
+    slower = {}
+    for name, result in current["scenarios"].items():
+        before = baseline.get("scenarios", {}).get(name, {})
+        if "median_ms" in result and "median_ms" in before:
+            ratio = result["median_ms"] / before["median_ms"]
+            if ratio > 1 + threshold:
+                slower[name] = round(ratio, 2)
+    return slower
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="بنچمارک پنل‌ها روی داده مصنوعی")
+    parser.add_argument("--db", default="bench.db")
+    parser.add_argument("--regenerate", action="store_true", help="ساخت دوباره داده حتی اگر فایل وجود دارد")
+    parser.add_argument("--teachers", type=int, default=50)
+    parser.add_argument("--students", type=int, default=30)
+    parser.add_argument("--scores", type=int, default=100_000)
+    parser.add_argument("--scenario", action="append", choices=list(SCENARIOS), help="پیش‌فرض: همه")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", "-o", help="مسیر فایل JSON (پیش‌فرض: خروجی استاندارد)")
+    parser.add_argument("--compare", help="فایل JSON یک اجرای قبلی برای تشخیص کندشدن")
+    parser.add_argument("--threshold", type=float, default=0.2, help="کندشدن مجاز میانه (پیش‌فرض ۰٫۲ یعنی ۲۰٪)")
+    args = parser.parse_args(argv)
+
+    if args.regenerate or not os.path.exists(args.db):
+        synthetic_school.generate(args.db, 1, args.teachers, args.students, args.scores)
+    else:
+        data_access.set_backend(SQLiteBackend(args.db))
+
+    result = {
+        "dataset": {table: count_rows(table) for table in DATASET_TABLES},
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "scenarios": run(args.scenario or list(SCENARIOS), pick_subject(), args.repeat),
+    }
+    text = json.dumps(result, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            slower = regressions(result, json.load(f), args.threshold)
+        for name, ratio in slower.items():
+            print(f"⚠️ {name}: {ratio}x کندتر از خط پایه", file=sys.stderr)
+        if slower:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
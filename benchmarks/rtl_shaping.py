@@ -0,0 +1,55 @@
+"""ریزبنچمارک شکل‌دهی متن فارسی: بدون حافظه نهان در برابر ماژول rtl.
+
+بار کاری شبیه رسم نمودارهای پنل‌هاست: عنوان‌ها، نام دروس و سطوح عملکرد
+که بارها تکرار می‌شوند.
+
+اجرا از ریشه مخزن:
+    python -m benchmarks.rtl_shaping
+"""
+import time
+
+import arabic_reshaper
+from bidi.algorithm import get_display
+
+import rtl
+
+LESSONS = ["ریاضی", "علوم", "فارسی", "قرآن", "هدیه‌های آسمان", "مطالعات اجتماعی", "نگارش", "هنر"]
+LEVELS = ["نیاز به تلاش بیشتر", "قابل قبول", "خوب", "خیلی خوب"]
+TITLES = ["شماره نمره", "نمره", "توزیع سطح عملکرد کلاس", "نمودار پیشرفت نمرات در تمام دروس"]
+
+
+def workload(charts=2000):
+    """برچسب‌های رسم‌شده برای ``charts`` نمودار."""
+    labels = []
+    for i in range(charts):
+        lesson = LESSONS[i % len(LESSONS)]
+        labels.append([f"روند نمرات {lesson}", *TITLES, *LEVELS, *LESSONS])
+    return labels
+
+
+def _uncached(text):
+    if not isinstance(text, str) or not text.strip():
+        return text
+    return get_display(arabic_reshaper.reshape(text))
+
+
+def _time(func, charts):
+    start = time.perf_counter()
+    for labels in charts:
+        func(labels)
+    return time.perf_counter() - start
+
+
+def main():
+    charts = workload()
+    count = sum(len(labels) for labels in charts)
+    baseline = _time(lambda labels: [_uncached(text) for text in labels], charts)
+    rtl._shape.cache_clear()
+    cached = _time(rtl.shape_all, charts)
+    print(f"{count} برچسب در {len(charts)} نمودار")
+    print(f"بدون حافظه نهان: {baseline * 1000:.1f} ms")
+    print(f"rtl.shape_all:   {cached * 1000:.1f} ms  ({baseline / cached:.0f}x)  {rtl.cache_info()}")
+
+
+if __name__ == "__main__":
+    main()
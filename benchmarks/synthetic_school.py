@@ -0,0 +1,112 @@
+"""ساخت داده مصنوعی (مدارس، آموزگاران، دانش‌آموزان و نمرات) در پایگاه SQLite.
+
+داده با همان لایه data_access و طرح ``setup_db.py`` نوشته می‌شود و جدول
+تجمیعی در پایان با ``rebuild_rollups`` ساخته می‌شود؛ با ``seed`` یکسان
+خروجی همیشه یکسان است تا نتایج بنچمارک‌ها قابل مقایسه باشند.
+
+اجرا از ریشه مخزن:
+    python -m benchmarks.synthetic_school --teachers 50 --scores 100000 --db bench.db
+"""
+import argparse
+import datetime
+import os
+import random
+
+import data_access
+from auth import add_accounts, hash_password
+from data_access import SQLiteBackend, insert_rows, rebuild_rollups
+
+LESSONS = ["ریاضی", "علوم", "فارسی", "قرآن", "هدیه‌های آسمان", "مطالعات اجتماعی", "نگارش", "هنر"]
+GRADES = ["اول", "دوم", "سوم", "چهارم", "پنجم", "ششم"]
+CLASSES = ["الف", "ب"]
+PASSWORD = "1"
+INSERT_CHUNK = 5000
+
+
+def school_name(i):
+    return f"مدرسه نمونه {i + 1}"
+
+
+def teacher_name(school, i):
+    return f"آموزگار {school + 1}-{i + 1}"
+
+
+def student_name(school, teacher, i):
+    return f"دانش‌آموز {school + 1}-{teacher + 1}-{i + 1}"
+
+
+def _insert(table, rows, insert=insert_rows):
+    """درج تکه‌تکه؛ خروجی: ردیف‌های درج‌شده (با id) به همان ترتیب."""
+    inserted = []
+    for start in range(0, len(rows), INSERT_CHUNK):
+        inserted.extend(insert(table, rows[start:start + INSERT_CHUNK]))
+    return inserted
+
+
+def generate(path, schools=1, teachers=50, students_per_teacher=30, scores=100_000, seed=0):
+    """ساخت پایگاه داده تازه در ``path``؛ خروجی: تعداد ردیف‌های هر جدول."""
+    if os.path.exists(path):
+        os.remove(path)
+    data_access.set_backend(SQLiteBackend(path))
+    rng = random.Random(seed)
+
+    users, students = [], []
+    # همه حساب‌ها یک رمز دارند؛ هش یک بار ساخته و برای همه استفاده می‌شود (فقط در داده مصنوعی)
+    password = {"رمز_هش": hash_password(PASSWORD)}
+    add_accounts("users", {"نام_کاربر": "admin", **password, "نام_کامل": "مدیر سامانه",
+                           "نقش": "مدیر سامانه", "مدرسه": "مرکزی"})
+    for s in range(schools):
+        school = school_name(s)
+        school_id = insert_rows("schools", {"نام_مدرسه": school, "کد_مدرسه": f"S{s + 1:03d}"})[0]["id"]
+        users.append({"نام_کاربر": f"principal{s + 1}", **password, "نام_کامل": f"مدیر {school}",
+                      "نقش": "مدیر مدرسه", "مدرسه": school, "school_id": school_id})
+        users.append({"نام_کاربر": f"assistant{s + 1}", **password, "نام_کامل": f"معاون {school}",
+                      "نقش": "معاون", "مدرسه": school, "school_id": school_id})
+        for t in range(teachers):
+            teacher = teacher_name(s, t)
+            username = f"t{s + 1}_{t + 1}"
+            users.append({"نام_کاربر": username, **password, "نام_کامل": teacher,
+                          "نقش": "آموزگار", "مدرسه": school, "school_id": school_id})
+            grade, class_name = GRADES[t % len(GRADES)], CLASSES[(t // len(GRADES)) % len(CLASSES)]
+            for i in range(students_per_teacher):
+                students.append({
+                    "student": student_name(s, t, i), "نام_کاربر": f"s{s + 1}_{t + 1}_{i + 1}",
+                    **password, "پایه": grade, "کلاس": class_name, "مدرسه": school,
+                    "آموزگار": teacher, "تاریخ_ثبت": "2025-09-23", "teacher_id": username, "school_id": school_id,
+                })
+    user_ids = {row["نام_کاربر"]: row["id"] for row in _insert("users", users, add_accounts)}
+    for student in students:
+        student["teacher_id"] = user_ids[student["teacher_id"]]
+    students = _insert("students", students, add_accounts)
+
+    # نمرات به طور یکنواخت بین دانش‌آموزان و دروس پخش می‌شوند؛ تاریخ‌ها صعودی‌اند
+    start = datetime.date(2025, 9, 23)
+    score_rows = []
+    for n in range(scores):
+        student = students[n % len(students)]
+        score_rows.append({
+            "student": student["student"], "درس": LESSONS[rng.randrange(len(LESSONS))],
+            "نمره": rng.choices((1, 2, 3, 4), weights=(1, 3, 4, 3))[0], "آموزگار": student["آموزگار"],
+            "تاریخ": (start + datetime.timedelta(days=n * 270 // max(scores, 1))).isoformat(),
+            "teacher_id": student["teacher_id"], "student_id": student["id"],
+        })
+    _insert("scores", score_rows)
+    rollup_count = rebuild_rollups()
+    return {"schools": schools, "users": len(users) + 1, "students": len(students),
+            "scores": len(score_rows), "score_rollups": rollup_count}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="ساخت داده مصنوعی مدرسه در SQLite")
+    parser.add_argument("--db", default="bench.db")
+    parser.add_argument("--schools", type=int, default=1)
+    parser.add_argument("--teachers", type=int, default=50, help="تعداد آموزگار هر مدرسه")
+    parser.add_argument("--students", type=int, default=30, help="تعداد دانش‌آموز هر آموزگار")
+    parser.add_argument("--scores", type=int, default=100_000, help="تعداد کل نمرات")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+    print(generate(args.db, args.schools, args.teachers, args.students, args.scores, args.seed))
+
+
+if __name__ == "__main__":
+    main()
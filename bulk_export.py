@@ -0,0 +1,198 @@
+"""خروجی گروهی کارنامه‌ها برای یک کلاس یا کل مدرسه.
+
+داده‌های نمرات هر آموزگار مدرسه فقط یک بار خوانده می‌شود و کارنامه‌ها در یک
+Process Pool ساخته می‌شوند؛ هر فرایند فونت وزیر را یک بار بارگذاری می‌کند.
+در خروجی ZIP هر کارنامه به محض آماده شدن در فایل نوشته می‌شود و تعداد
+کارهای در جریان محدود است، پس حافظه با تعداد دانش‌آموزان رشد نمی‌کند.
+
+اجرا از خط فرمان:
+    python bulk_export.py --school "شهید بهشتی" --output report_cards.zip
+    python bulk_export.py --school "شهید بهشتی" --grade "سوم" --class "الف" --format pdf --output class.pdf
+"""
+import argparse
+import multiprocessing
+import os
+import re
+import sys
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import pandas as pd
+
+import report_card
+from data_access import fetch_rows, resolve_ids
+from grading import scale_for
+
+SCORE_COLUMNS = "student_id, درس, نمره, تاریخ"
+CLASS_AVG_COLUMNS = ["درس", "میانگین کلاس"]
+NO_CLASS_AVG = pd.DataFrame({"درس": pd.Series(dtype=object), "میانگین کلاس": pd.Series(dtype=float)})
+
+
+def _safe_name(text):
+    return re.sub(r'[\\/:*?"<>|]+', "_", str(text)).strip() or "_"
+
+
+def collect_report_jobs(school_id, class_name=None, grade=None):
+    """فهرست کارهای ساخت کارنامه (یک کار برای هر دانش‌آموز دارای نمره).
+
+    نام کلاس (مثلاً «الف») در پایه‌های مختلف تکرار می‌شود؛ برای یک کلاس
+    مشخص ``grade`` و ``class_name`` هر دو داده شوند.
+    هر کار: (نام فایل، اطلاعات دانش‌آموز، ردیف‌های جدول کارنامه، داده نمودار پیشرفت)
+    """
+    filters = {"school_id": school_id}
+    if grade:
+        filters["پایه"] = grade
+    if class_name:
+        filters["کلاس"] = class_name
+    students = fetch_rows("students", "id, student, نام_کاربر, پایه, کلاس, teacher_id", filters, cached=False)
+    if not students:
+        return []
+    students_df = pd.DataFrame(students)
+    schools = fetch_rows("schools", "نام_مدرسه", {"id": school_id})
+    school = schools[0]["نام_مدرسه"] if schools else None
+
+    # یک بار خواندن نمرات هر آموزگار مدرسه
+    frames = []
+    for teacher_id in students_df["teacher_id"].dropna().unique():
+        rows = fetch_rows("scores", SCORE_COLUMNS, {"teacher_id": int(teacher_id)}, order_by="id", cached=False)
+        if rows:
+            frames.append(pd.DataFrame(rows))
+    if not frames:
+        return []
+    scores_df = pd.concat(frames, ignore_index=True).merge(
+        students_df[["id", "teacher_id", "کلاس"]].rename(columns={"id": "student_id"}), on="student_id", how="inner"
+    )
+
+    class_avgs = (
+        scores_df.groupby(["teacher_id", "کلاس", "درس"])["نمره"].mean()
+        .rename("میانگین کلاس").reset_index()
+    )
+    lesson_avgs = scores_df.groupby(["student_id", "درس"], sort=False)["نمره"].mean().reset_index()
+    scores_by_student = dict(tuple(scores_df.groupby("student_id", sort=False)))
+    avgs_by_student = dict(tuple(lesson_avgs.groupby("student_id", sort=False)))
+    avgs_by_class = dict(tuple(class_avgs.groupby(["teacher_id", "کلاس"])))
+
+    scale = scale_for(school)
+    jobs = []
+    for student in students:
+        key = student["id"]
+        if key not in scores_by_student:
+            continue
+        # دانش‌آموز بدون آموزگار یا کلاس: کارنامه بدون ستون میانگین کلاس ساخته می‌شود
+        class_avg = avgs_by_class.get((student["teacher_id"], student["کلاس"]))
+        class_avg = NO_CLASS_AVG if class_avg is None else class_avg[CLASS_AVG_COLUMNS]
+        report_df = report_card.build_report_df(avgs_by_student[key][["درس", "نمره"]], class_avg, scale)
+        progress_series = []
+        for lesson, lesson_scores in scores_by_student[key].groupby("درس", sort=False)["نمره"]:
+            values = lesson_scores.tolist()
+            progress_series.append((lesson, list(range(1, len(values) + 1)), values))
+        meta = {"نام": student["student"], "مدرسه": school,
+                "پایه": student.get("پایه"), "کلاس": student.get("کلاس")}
+        filename = (f"{_safe_name(student.get('پایه'))}/{_safe_name(student.get('کلاس'))}/"
+                    f"{_safe_name(student['student'])}_{_safe_name(student.get('نام_کاربر'))}.pdf")
+        jobs.append((filename, meta, report_df[report_card.REPORT_COLUMNS].to_dict("records"), progress_series))
+    return jobs
+
+
+# -------------------------------
+# کارهای داخل Process Pool
+# -------------------------------
+
+def _init_worker():
+    report_card.font_resources()
+
+
+def _render_card(job):
+    filename, meta, records, progress_series = job
+    return filename, report_card.render_pdf(meta, pd.DataFrame(records), progress_series)
+
+
+def _render_body(job):
+    _, meta, records, progress_series = job
+    return report_card.report_body(meta, pd.DataFrame(records), report_card.progress_chart(progress_series))
+
+
+def _run_pool(func, jobs, workers, on_result, progress):
+    """اجرای کارها با سقف کارهای در جریان (۲ برابر تعداد فرایندها)."""
+    workers = workers or os.cpu_count() or 2
+    total = len(jobs)
+    done = 0
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=_init_worker) as pool:
+        pending = set()
+        for job in jobs:
+            pending.add(pool.submit(func, job))
+            if len(pending) >= 2 * workers:
+                finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    on_result(future.result())
+                    done += 1
+                    if progress:
+                        progress(done, total)
+        for future in wait(pending).done:
+            on_result(future.result())
+            done += 1
+            if progress:
+                progress(done, total)
+    return done
+
+
+def export_zip(school_id, output, class_name=None, grade=None, workers=None, progress=None):
+    """نوشتن کارنامه‌ها در یک فایل ZIP (مسیر یا شیء فایل)؛ خروجی: تعداد کارنامه‌ها."""
+    jobs = collect_report_jobs(school_id, class_name, grade)
+    with zipfile.ZipFile(output, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        return _run_pool(_render_card, jobs, workers,
+                         lambda result: archive.writestr(result[0], result[1]), progress)
+
+
+def export_merged_pdf(school_id, output, class_name=None, grade=None, workers=None, progress=None):
+    """همه کارنامه‌های یک کلاس (پایه و کلاس) در یک PDF (هر کارنامه یک صفحه جدا).
+
+    PDF ادغام‌شده یک‌جا در حافظه ساخته می‌شود، پس فقط برای یک کلاس مجاز است؛
+    برای کل مدرسه از ``export_zip`` استفاده کنید.
+    """
+    if not class_name or not grade:
+        raise ValueError("PDF ادغام‌شده فقط برای یک کلاس (پایه و کلاس) ساخته می‌شود؛ "
+                         "برای کل مدرسه خروجی ZIP را انتخاب کنید.")
+    jobs = collect_report_jobs(school_id, class_name, grade)
+    bodies = []
+    count = _run_pool(_render_body, jobs, workers, bodies.append, progress)
+    if not bodies:
+        return 0
+    pdf_bytes = report_card.write_pdf(report_card.build_report_html(bodies))
+    if hasattr(output, "write"):
+        output.write(pdf_bytes)
+    else:
+        with open(output, "wb") as f:
+            f.write(pdf_bytes)
+    return count
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="خروجی گروهی کارنامه‌ها")
+    parser.add_argument("--school", required=True, help="نام مدرسه")
+    parser.add_argument("--grade", help="فقط یک پایه")
+    parser.add_argument("--class", dest="class_name", help="فقط یک کلاس (همراه با --grade)")
+    parser.add_argument("--format", choices=["zip", "pdf"], default="zip")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--output", "-o", required=True)
+    args = parser.parse_args(argv)
+    if args.class_name and not args.grade:
+        parser.error("--class بدون --grade مبهم است (نام کلاس در پایه‌های مختلف تکرار می‌شود).")
+    if args.format == "pdf" and not args.class_name:
+        parser.error("برای --format pdf باید --grade و --class را هم بدهید (برای کل مدرسه از zip استفاده کنید).")
+    try:
+        _, school_id = resolve_ids(school=args.school)
+    except ValueError as e:
+        parser.error(str(e))
+
+    def progress(done, total):
+        print(f"\r{done}/{total}", end="", file=sys.stderr, flush=True)
+
+    export = export_zip if args.format == "zip" else export_merged_pdf
+    count = export(school_id, args.output, args.class_name, args.grade, args.workers, progress)
+    print(f"\n{count} کارنامه در {args.output} ذخیره شد.", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+"""ساخت نمودارهای Matplotlib با حافظه نهان تصویر PNG.
+
+هر نمودار با اثرانگشت داده‌های رسم‌شده، نوع نمودار، اندازه و dpi شناسایی
+می‌شود؛ نمودار تکراری بدون رسم دوباره از حافظه نهان برگردانده می‌شود.
+شکل‌ها با ``matplotlib.figure.Figure`` (بدون pyplot) ساخته می‌شوند تا
+وضعیت سراسری نداشته باشند و پس از ذخیره آزاد شوند.
+"""
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from io import BytesIO
+
+import matplotlib
+from matplotlib.figure import Figure
+
+from farsi_style import font_prop
+from rtl import shape, shape_all
+
+SCREEN_DPI = 200
+# موتور رسم نمودارهای صفحه در این استقرار: matplotlib (تصویر PNG) یا plotly (رسم در مرورگر)
+RENDERERS = ("matplotlib", "plotly")
+CHART_RENDERER = os.environ.get("DARSBAN_CHART_RENDERER", "matplotlib")
+if CHART_RENDERER not in RENDERERS:
+    raise ValueError(f"DARSBAN_CHART_RENDERER باید یکی از {RENDERERS} باشد.")
+PIE_COLORS = ["#FF9999", "#FFD580", "#90EE90", "#66B2FF"]
+LINE_COLOR = "#007ACC"
+
+
+class ChartCache:
+    """حافظه نهان LRU داده‌های باینری (PNG، PDF) با سقف حجم کل (بایت)."""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._data = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            png = self._data.get(key)
+            if png is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return png
+
+    def put(self, key, png):
+        if len(png) > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._data:
+                self._size -= len(self._data.pop(key))
+            self._data[key] = png
+            self._size += len(png)
+            while self._size > self.max_bytes:
+                _, evicted = self._data.popitem(last=False)
+                self._size -= len(evicted)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._size = 0
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._data), "bytes": self._size, "hits": self.hits, "misses": self.misses}
+
+
+chart_cache = ChartCache(int(float(os.environ.get("DARSBAN_CHART_CACHE_MB", 64)) * 1024 * 1024))
+
+
+def fingerprint(kind, size, dpi, payload):
+    """اثرانگشت پایدار یک نمودار از روی داده‌ها و مشخصات آن."""
+    raw = json.dumps([kind, list(size), dpi, payload], ensure_ascii=False, default=str, sort_keys=True)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def _render(kind, size, dpi, payload, draw):
+    key = fingerprint(kind, size, dpi, payload)
+    png = chart_cache.get(key)
+    if png is None:
+        fig = Figure(figsize=size)
+        draw(fig.subplots())
+        buf = BytesIO()
+        fig.savefig(buf, format="png", bbox_inches="tight", dpi=dpi)
+        png = buf.getvalue()
+        chart_cache.put(key, png)
+    return png
+
+
+def _as_list(values):
+    return [v.item() if hasattr(v, "item") else v for v in values]
+
+
+# -------------------------------
+# انواع نمودار
+# -------------------------------
+
+def line_chart(x, y, title, xlabel, ylabel, size, ylim=None, title_size=None, dpi=SCREEN_DPI):
+    """نمودار خطی روند نمرات؛ خروجی: بایت‌های PNG."""
+    payload = {"x": _as_list(x), "y": _as_list(y), "labels": [title, xlabel, ylabel],
+               "ylim": ylim, "title_size": title_size}
+
+    def draw(ax):
+        ax.plot(payload["x"], payload["y"], marker="o", linewidth=2, color=LINE_COLOR)
+        ax.set_title(shape(title), fontproperties=font_prop, fontsize=title_size)
+        ax.set_xlabel(shape(xlabel), fontproperties=font_prop)
+        ax.set_ylabel(shape(ylabel), fontproperties=font_prop)
+        ax.tick_params(axis="x", rotation=0)
+        if ylim:
+            ax.set_ylim(*ylim)
+
+    return _render("line", size, dpi, payload, draw)
+
+
+def multi_line_chart(series, title, xlabel, ylabel, size, dpi=SCREEN_DPI):
+    """چند نمودار خطی روی یک محور با راهنما؛ ``series`` فهرست (برچسب، x، y) است."""
+    payload = {"series": [[label, _as_list(x), _as_list(y)] for label, x, y in series],
+               "labels": [title, xlabel, ylabel]}
+
+    def draw(ax):
+        colors = matplotlib.colormaps["tab10"].colors
+        for i, (label, x, y) in enumerate(payload["series"]):
+            ax.plot(x, y, marker="o", linewidth=2, color=colors[i % len(colors)], label=shape(label))
+        ax.set_title(shape(title), fontproperties=font_prop)
+        ax.set_xlabel(shape(xlabel), fontproperties=font_prop)
+        ax.set_ylabel(shape(ylabel), fontproperties=font_prop)
+        ax.legend(prop=font_prop, loc="best")
+
+    return _render("multi_line", size, dpi, payload, draw)
+
+
+def pie_chart(counts, title, size, title_size=12, donut=False, dpi=SCREEN_DPI):
+    """نمودار دایره‌ای (یا حلقه‌ای) از یک Series شمارش‌ها."""
+    payload = {"labels": _as_list(counts.index), "values": _as_list(counts.values),
+               "title": title, "title_size": title_size, "donut": donut}
+
+    def draw(ax):
+        ax.axis("equal")
+        wedgeprops = {"linewidth": 1, "edgecolor": "white"}
+        if donut:
+            wedgeprops["width"] = 0.4
+        _, texts, autotexts = ax.pie(
+            payload["values"],
+            labels=shape_all(payload["labels"]),
+            autopct=lambda pct: f"{pct:.1f}%",
+            startangle=140,
+            colors=PIE_COLORS,
+            wedgeprops=wedgeprops,
+            pctdistance=0.7,
+            labeldistance=1.1,
+            textprops={"fontproperties": font_prop},
+        )
+        if donut:
+            for t in texts:
+                t.set_fontsize(10)
+                x, _ = t.get_position()
+                t.set_horizontalalignment("right" if x > 0 else "left")
+            for autotext in autotexts:
+                autotext.set_fontsize(10)
+        ax.set_title(shape(title), fontproperties=font_prop, fontsize=title_size)
+
+    return _render("pie", size, dpi, payload, draw)
+
+
+def bar_chart(labels, values, title, size=(6.4, 4.8), dpi=SCREEN_DPI):
+    """نمودار میله‌ای ساده (مثلاً میانگین نمره هر دانش‌آموز)."""
+    payload = {"labels": _as_list(labels), "values": _as_list(values), "title": title}
+
+    def draw(ax):
+        ax.bar(range(len(payload["values"])), payload["values"])
+        ax.set_xticks(range(len(payload["labels"])))
+        ax.set_xticklabels(shape_all(payload["labels"]), rotation=45, ha="right",
+                           fontproperties=font_prop)
+        if title:
+            ax.set_title(shape(title), fontproperties=font_prop)
+
+    return _render("bar", size, dpi, payload, draw)
+
+
+def stacked_bar_chart(labels, series, title, size, dpi=SCREEN_DPI):
+    """نمودار میله‌ای افقی انباشته؛ ``series`` فهرست (برچسب، مقادیر) برای هر بخش میله است."""
+    payload = {"labels": _as_list(labels), "series": [[name, _as_list(values)] for name, values in series],
+               "title": title}
+
+    def draw(ax):
+        left = [0] * len(payload["labels"])
+        for i, (name, values) in enumerate(payload["series"]):
+            ax.barh(range(len(values)), values, left=left, color=PIE_COLORS[i % len(PIE_COLORS)], label=shape(name))
+            left = [a + b for a, b in zip(left, values)]
+        ax.set_yticks(range(len(payload["labels"])))
+        ax.set_yticklabels(shape_all(payload["labels"]), fontproperties=font_prop)
+        ax.invert_yaxis()
+        ax.legend(prop=font_prop, loc="lower center", bbox_to_anchor=(0.5, 1.0), ncol=len(payload["series"]))
+        if title:
+            ax.set_title(shape(title), fontproperties=font_prop, pad=30)
+
+    return _render("stacked_bar", size, dpi, payload, draw)
@@ -0,0 +1,777 @@
+"""لایه دسترسی به داده درسبان با دو پشتیبان قابل تعویض: Supabase و SQLite محلی.
+
+انتخاب پشتیبان با متغیر محیطی ``DARSBAN_BACKEND`` انجام می‌شود
+(``supabase`` پیش‌فرض، یا ``sqlite``). همه پنل‌ها فقط از توابع این ماژول
+استفاده می‌کنند و مستقیماً به کلاینت پایگاه داده دسترسی ندارند.
+"""
+import datetime
+import os
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+import rollups
+from query_cache import make_key, query_cache
+from setup_db import DB_PATH, create_schema
+from views import view_columns
+
+PAGE_SIZE = int(os.environ.get("DARSBAN_PAGE_SIZE", 1000))
+FETCH_WORKERS = int(os.environ.get("DARSBAN_FETCH_WORKERS", 4))
+FANOUT_WORKERS = int(os.environ.get("DARSBAN_FANOUT_WORKERS", 8))
+OVERVIEW_TTL = float(os.environ.get("DARSBAN_OVERVIEW_TTL", 30))
+OVERVIEW_ACTIVE_DAYS = 30
+
+_fetch_executor = ThreadPoolExecutor(max_workers=FETCH_WORKERS, thread_name_prefix="range-fetch")
+# خواندن‌های مستقل یک صفحه در Pool جداگانه اجرا می‌شوند تا fetch_all داخل
+# آن‌ها منتظر رشته‌های همان Pool نماند
+_fanout_executor = ThreadPoolExecutor(max_workers=FANOUT_WORKERS, thread_name_prefix="fanout")
+
+
+def _quote(name):
+    """نقل‌قول امن نام جدول یا ستون برای SQLite."""
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+def _split_columns(columns):
+    """تبدیل رشته ستون‌ها به سبک Supabase ("الف, ب") به فهرست."""
+    if columns in (None, "*"):
+        return None
+    return [c.strip() for c in columns.split(",") if c.strip()]
+
+
+# -------------------------------
+# پشتیبان Supabase
+# -------------------------------
+
+class SupabaseBackend:
+    """اجرای پرس‌وجوها روی Supabase از طریق PostgREST.
+
+    هر درخواست با یک کلاینت امانتی از ``supabase_utils.ClientPool`` اجرا
+    می‌شود؛ خواندن‌ها پس از خطای گذرای شبکه دوباره امتحان می‌شوند و نوشتن‌ها نه.
+    """
+
+    name = "supabase"
+
+    def __init__(self, client=None, pool=None):
+        from supabase_utils import ClientPool, get_pool
+
+        if pool is None:
+            pool = ClientPool.from_clients([client]) if client is not None else get_pool()
+        self.pool = pool
+
+    def _filtered(self, query, filters):
+        for column, value in (filters or {}).items():
+            if isinstance(value, (list, tuple, set)):
+                query = query.in_(column, list(value))
+            else:
+                query = query.eq(column, value)
+        return query
+
+    def _read(self, build):
+        return self.pool.run(lambda client: build(client).execute(), retry=True)
+
+    def _write(self, build):
+        return self.pool.run(lambda client: build(client).execute())
+
+    def select(self, table, columns="*", filters=None, order_by=None, limit=None, after=None, until=None):
+        def build(client):
+            query = self._filtered(client.table(table).select(columns or "*"), filters)
+            if after is not None:
+                query = query.gt(order_by, after)
+            if until is not None:
+                query = query.lte(order_by, until)
+            if order_by:
+                query = query.order(order_by.lstrip("-"), desc=order_by.startswith("-"))
+            if limit:
+                query = query.limit(limit)
+            return query
+
+        return self._read(build).data or []
+
+    def count(self, table, filters=None):
+        return self._read(
+            lambda client: self._filtered(client.table(table).select("*", count="exact", head=True), filters)
+        ).count or 0
+
+    def insert(self, table, rows):
+        return self._write(lambda client: client.table(table).insert(rows)).data or []
+
+    def update(self, table, values, filters):
+        return self._write(lambda client: self._filtered(client.table(table).update(values), filters)).data or []
+
+    def delete(self, table, filters):
+        return self._write(lambda client: self._filtered(client.table(table).delete(), filters)).data or []
+
+    def delete_all(self, table):
+        from postgrest.types import ReturnMethod
+
+        # PostgREST حذف بدون فیلتر را رد می‌کند؛ id > 0 همه ردیف‌ها را می‌گیرد
+        self._write(lambda client: client.table(table).delete(returning=ReturnMethod.minimal).gt("id", 0))
+
+    def insert_linked(self, table, rows, linked_table, link):
+        # PostgREST تراکنش چنددرخواستی ندارد؛ اگر درج دوم شکست بخورد ردیف‌های اول حذف می‌شوند
+        inserted = self.insert(table, rows)
+        try:
+            linked = self.insert(linked_table, [link(row) for row in inserted])
+        except Exception:
+            self.delete(table, {"id": [row["id"] for row in inserted]})
+            raise
+        return inserted, linked
+
+    def upsert(self, table, rows, on_conflict):
+        return self._write(
+            lambda client: client.table(table).upsert(rows, on_conflict=",".join(on_conflict))
+        ).data or []
+
+    def class_lesson_averages(self, teacher_id, class_name):
+        # تابع RPC تعریف‌شده در supabase_schema.sql
+        params = {"p_teacher_id": teacher_id, "p_class": class_name}
+        return self._read(lambda client: client.rpc("class_lesson_averages", params)).data or []
+
+    def school_overview(self, school_id, since):
+        # تابع RPC تعریف‌شده در supabase_schema.sql؛ خروجی یک شیء JSON است
+        params = {"p_school_id": school_id, "p_since": since}
+        return self._read(lambda client: client.rpc("school_overview", params)).data
+
+    # توابع RPC rollup_* تعریف‌شده در supabase_schema.sql؛ هر کدام یک دستور اتمی در پایگاه داده است
+    def rollup_add(self, deltas):
+        self._write(lambda client: client.rpc("rollup_add", {"p_rows": deltas}))
+
+    def rollup_change(self, key, old_value, old_date, new_value):
+        params = {**self._rollup_params(key), "p_old": old_value, "p_old_date": old_date, "p_new": new_value}
+        return bool(self._write(lambda client: client.rpc("rollup_change", params)).data)
+
+    def rollup_remove(self, key, old_value, old_date):
+        params = {**self._rollup_params(key), "p_old": old_value, "p_old_date": old_date}
+        return bool(self._write(lambda client: client.rpc("rollup_remove", params)).data)
+
+    def rollup_refresh(self, key):
+        self._write(lambda client: client.rpc("rollup_refresh", self._rollup_params(key)))
+
+    @staticmethod
+    def _rollup_params(key):
+        return {"p_teacher_id": key["teacher_id"], "p_student_id": key["student_id"], "p_lesson": key["درس"]}
+
+    def stats(self):
+        return {"pool": self.pool.stats()}
+
+
+# -------------------------------
+# پشتیبان SQLite محلی
+# -------------------------------
+
+# نمرات هر مدرسه از روی مدرسه آموزگار ثبت‌کننده شناخته می‌شوند
+_SCHOOL_SCORES_SQL = """
+    FROM scores sc
+    JOIN users u ON u.id = sc.teacher_id
+    WHERE (:school_id IS NULL OR u.school_id = :school_id)
+"""
+_SCHOOL_TOTALS_SQL = f"""
+    SELECT
+        (SELECT COUNT(*) FROM schools WHERE :school_id IS NULL OR id = :school_id) AS "مدارس",
+        (SELECT COUNT(*) FROM users WHERE :school_id IS NULL OR school_id = :school_id) AS "کاربران",
+        (SELECT COUNT(*) FROM users WHERE "نقش" = 'آموزگار' AND (:school_id IS NULL OR school_id = :school_id)) AS "آموزگاران",
+        (SELECT COUNT(*) FROM students WHERE :school_id IS NULL OR school_id = :school_id) AS "دانش‌آموزان",
+        (SELECT COUNT(*) {_SCHOOL_SCORES_SQL}) AS "نمرات",
+        (SELECT COUNT(DISTINCT sc.teacher_id) {_SCHOOL_SCORES_SQL} AND sc."تاریخ" >= :since) AS "آموزگاران فعال"
+"""
+OVERVIEW_TOTALS = ("مدارس", "کاربران", "آموزگاران", "دانش‌آموزان", "نمرات", "آموزگاران فعال")
+_SCHOOL_GRADES_SQL = """
+    SELECT s."پایه" AS "پایه", COUNT(DISTINCT s.id) AS "دانش‌آموزان",
+           COUNT(sc.id) AS "نمرات", ROUND(AVG(sc."نمره"), 2) AS "میانگین"
+    FROM students s
+    LEFT JOIN scores sc ON sc.student_id = s.id
+    WHERE :school_id IS NULL OR s.school_id = :school_id
+    GROUP BY s."پایه"
+    ORDER BY s."پایه"
+"""
+
+# نگه‌داری جدول تجمیعی با یک دستور اتمی برای هر گروه (معادل توابع rollup_* در
+# supabase_schema.sql)؛ دو نوشتن هم‌زمان روی یک (دانش‌آموز، درس) هیچ‌کدام گم نمی‌شود.
+_ROLLUP_KEY_SQL = 'teacher_id = :teacher_id AND student_id = :student_id AND "درس" = :lesson'
+_ROLLUP_ADD_SQL = """
+    INSERT INTO score_rollups (teacher_id, student_id, "درس", "آموزگار", student,
+                               "تعداد", "مجموع", "کمینه", "بیشینه", "آخرین_نمره", "تاریخ_آخرین")
+    VALUES (:teacher_id, :student_id, :lesson, :teacher, :student, :count, :total, :low, :high, :last, :last_date)
+    ON CONFLICT (teacher_id, student_id, "درس") DO UPDATE SET
+        "تعداد" = "تعداد" + excluded."تعداد",
+        "مجموع" = "مجموع" + excluded."مجموع",
+        "کمینه" = MIN("کمینه", excluded."کمینه"),
+        "بیشینه" = MAX("بیشینه", excluded."بیشینه"),
+        "آخرین_نمره" = CASE WHEN COALESCE(excluded."تاریخ_آخرین", '') >= COALESCE("تاریخ_آخرین", '')
+                            THEN excluded."آخرین_نمره" ELSE "آخرین_نمره" END,
+        "تاریخ_آخرین" = CASE WHEN COALESCE(excluded."تاریخ_آخرین", '') >= COALESCE("تاریخ_آخرین", '')
+                             THEN excluded."تاریخ_آخرین" ELSE "تاریخ_آخرین" END
+"""
+# ویرایش یک نمره فقط وقتی افزایشی است که نمره قبلی کمینه، بیشینه یا (با همان
+# تاریخ و مقدار) شاید آخرین نمره نبوده باشد؛ وگرنه هیچ ردیفی تغییر نمی‌کند و گروه بازسازی می‌شود
+_ROLLUP_CHANGE_SQL = f"""
+    UPDATE score_rollups SET
+        "مجموع" = "مجموع" + :new - :old,
+        "کمینه" = CASE WHEN "تعداد" = 1 THEN :new ELSE MIN("کمینه", :new) END,
+        "بیشینه" = CASE WHEN "تعداد" = 1 THEN :new ELSE MAX("بیشینه", :new) END,
+        "آخرین_نمره" = CASE WHEN "تعداد" = 1 THEN :new ELSE "آخرین_نمره" END
+    WHERE {_ROLLUP_KEY_SQL} AND ("تعداد" = 1 OR (
+        :old > "کمینه" AND :old < "بیشینه" AND NOT ("تاریخ_آخرین" IS :old_date AND "آخرین_نمره" = :old)))
+    RETURNING id
+"""
+_ROLLUP_REMOVE_SQL = f"""
+    UPDATE score_rollups SET "تعداد" = "تعداد" - 1, "مجموع" = "مجموع" - :old
+    WHERE {_ROLLUP_KEY_SQL} AND "تعداد" > 1
+      AND :old > "کمینه" AND :old < "بیشینه" AND "تاریخ_آخرین" IS NOT :old_date
+    RETURNING id
+"""
+_ROLLUP_GROUP_SQL = f"""
+    WITH grp AS (
+        SELECT * FROM scores WHERE {_ROLLUP_KEY_SQL} AND "نمره" IS NOT NULL
+    ), last AS (
+        SELECT * FROM grp ORDER BY COALESCE("تاریخ", '') DESC, id DESC LIMIT 1
+    )
+"""
+_ROLLUP_REFRESH_SQL = (
+    _ROLLUP_GROUP_SQL + """
+    INSERT INTO score_rollups (teacher_id, student_id, "درس", "آموزگار", student,
+                               "تعداد", "مجموع", "کمینه", "بیشینه", "آخرین_نمره", "تاریخ_آخرین")
+    SELECT :teacher_id, :student_id, :lesson, last."آموزگار", last.student,
+           (SELECT COUNT(*) FROM grp), (SELECT SUM("نمره") FROM grp), (SELECT MIN("نمره") FROM grp),
+           (SELECT MAX("نمره") FROM grp), last."نمره", last."تاریخ"
+    FROM last WHERE true
+    ON CONFLICT (teacher_id, student_id, "درس") DO UPDATE SET
+        "تعداد" = excluded."تعداد", "مجموع" = excluded."مجموع", "کمینه" = excluded."کمینه",
+        "بیشینه" = excluded."بیشینه", "آخرین_نمره" = excluded."آخرین_نمره", "تاریخ_آخرین" = excluded."تاریخ_آخرین"
+"""
+)
+_ROLLUP_DROP_EMPTY_SQL = f"""
+    DELETE FROM score_rollups WHERE {_ROLLUP_KEY_SQL} AND NOT EXISTS (
+        SELECT 1 FROM scores WHERE {_ROLLUP_KEY_SQL} AND "نمره" IS NOT NULL)
+"""
+
+
+def _rollup_params(key):
+    return {"teacher_id": key["teacher_id"], "student_id": key["student_id"], "lesson": key["درس"]}
+
+
+class SQLiteBackend:
+    """اجرای پرس‌وجوها روی فایل SQLite ساخته‌شده با ``setup_db.py``.
+
+    هر رشته (نشست Streamlit) اتصال جداگانه خود را دارد؛ حالت WAL اجازه
+    خواندن هم‌زمان را می‌دهد و حافظه دستورات آماده (``cached_statements``)
+    دستورهای پارامتری تکراری را دوباره کامپایل نمی‌کند.
+    """
+
+    name = "sqlite"
+
+    def __init__(self, path=DB_PATH):
+        self.path = path
+        self._local = threading.local()
+        self._schema_lock = threading.Lock()
+        self._schema_ready = False
+
+    def connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False, cached_statements=256)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            with self._schema_lock:
+                if not self._schema_ready:
+                    create_schema(conn)
+                    self._schema_ready = True
+            self._local.conn = conn
+        return conn
+
+    def _where(self, filters):
+        if not filters:
+            return "", []
+        clauses, params = [], []
+        for column, value in filters.items():
+            if isinstance(value, (list, tuple, set)):
+                value = list(value)
+                clauses.append(f"{_quote(column)} IN ({', '.join('?' for _ in value)})" if value else "0")
+                params.extend(value)
+            else:
+                clauses.append(f"{_quote(column)} = ?")
+                params.append(value)
+        return " WHERE " + " AND ".join(clauses), params
+
+    def select(self, table, columns="*", filters=None, order_by=None, limit=None, after=None, until=None):
+        column_list = _split_columns(columns)
+        projection = ", ".join(_quote(c) for c in column_list) if column_list else "*"
+        where, params = self._where(filters)
+        for operator, bound in ((">", after), ("<=", until)):
+            if bound is not None:
+                where += (" AND " if where else " WHERE ") + f"{_quote(order_by)} {operator} ?"
+                params.append(bound)
+        sql = f"SELECT {projection} FROM {_quote(table)}{where}"
+        if order_by:
+            direction = " DESC" if order_by.startswith("-") else ""
+            sql += f" ORDER BY {_quote(order_by.lstrip('-'))}{direction}"
+        if limit:
+            sql += " LIMIT ?"
+            params.append(int(limit))
+        rows = self.connection().execute(sql, params).fetchall()
+        return [dict(row) for row in rows]
+
+    def count(self, table, filters=None):
+        where, params = self._where(filters)
+        sql = f"SELECT COUNT(*) FROM {_quote(table)}{where}"
+        return self.connection().execute(sql, params).fetchone()[0]
+
+    @staticmethod
+    def _insert(conn, table, rows):
+        inserted = []
+        for row in rows:
+            columns = ", ".join(_quote(c) for c in row)
+            marks = ", ".join("?" for _ in row)
+            sql = f"INSERT INTO {_quote(table)} ({columns}) VALUES ({marks}) RETURNING *"
+            inserted.extend(dict(r) for r in conn.execute(sql, list(row.values())).fetchall())
+        return inserted
+
+    def insert(self, table, rows):
+        if isinstance(rows, dict):
+            rows = [rows]
+        conn = self.connection()
+        with conn:
+            return self._insert(conn, table, rows)
+
+    def insert_linked(self, table, rows, linked_table, link):
+        # هر دو درج در یک تراکنش؛ خطا در هر کدام هر دو را برمی‌گرداند
+        conn = self.connection()
+        with conn:
+            inserted = self._insert(conn, table, rows)
+            linked = self._insert(conn, linked_table, [link(row) for row in inserted])
+        return inserted, linked
+
+    def upsert(self, table, rows, on_conflict):
+        conn = self.connection()
+        upserted = []
+        with conn:
+            for row in rows:
+                columns = ", ".join(_quote(c) for c in row)
+                marks = ", ".join("?" for _ in row)
+                conflict = ", ".join(_quote(c) for c in on_conflict)
+                updates = ", ".join(f"{_quote(c)} = excluded.{_quote(c)}" for c in row if c not in on_conflict)
+                sql = (f"INSERT INTO {_quote(table)} ({columns}) VALUES ({marks}) "
+                       f"ON CONFLICT ({conflict}) DO UPDATE SET {updates} RETURNING *")
+                upserted.extend(dict(r) for r in conn.execute(sql, list(row.values())).fetchall())
+        return upserted
+
+    def update(self, table, values, filters):
+        assignments = ", ".join(f"{_quote(c)} = ?" for c in values)
+        where, params = self._where(filters)
+        sql = f"UPDATE {_quote(table)} SET {assignments}{where} RETURNING *"
+        conn = self.connection()
+        with conn:
+            rows = conn.execute(sql, list(values.values()) + params).fetchall()
+        return [dict(row) for row in rows]
+
+    def delete(self, table, filters):
+        where, params = self._where(filters)
+        sql = f"DELETE FROM {_quote(table)}{where} RETURNING *"
+        conn = self.connection()
+        with conn:
+            rows = conn.execute(sql, params).fetchall()
+        return [dict(row) for row in rows]
+
+    def delete_all(self, table):
+        conn = self.connection()
+        with conn:
+            conn.execute(f"DELETE FROM {_quote(table)}")
+
+    def class_lesson_averages(self, teacher_id, class_name):
+        sql = """
+            SELECT sc."درس" AS "درس", AVG(sc."نمره") AS "میانگین کلاس"
+            FROM scores sc
+            JOIN students s ON s.id = sc.student_id
+            WHERE sc.teacher_id = ? AND s."کلاس" = ?
+            GROUP BY sc."درس"
+        """
+        rows = self.connection().execute(sql, (teacher_id, class_name)).fetchall()
+        return [dict(row) for row in rows]
+
+    def school_overview(self, school_id, since):
+        # معادل تابع school_overview در supabase_schema.sql؛ school_id=None یعنی کل سامانه
+        conn = self.connection()
+        params = {"school_id": school_id, "since": since}
+        row = conn.execute(_SCHOOL_TOTALS_SQL, params).fetchone()
+        totals = dict(row) if row is not None else dict.fromkeys(OVERVIEW_TOTALS, 0)
+        totals["پایه‌ها"] = [dict(row) for row in conn.execute(_SCHOOL_GRADES_SQL, params).fetchall()]
+        return totals
+
+    def rollup_add(self, deltas):
+        conn = self.connection()
+        with conn:
+            conn.executemany(_ROLLUP_ADD_SQL, [
+                {**_rollup_params(delta), "teacher": delta["آموزگار"], "student": delta["student"],
+                 "count": delta["تعداد"], "total": delta["مجموع"], "low": delta["کمینه"], "high": delta["بیشینه"],
+                 "last": delta["آخرین_نمره"], "last_date": delta["تاریخ_آخرین"]}
+                for delta in deltas
+            ])
+
+    def rollup_change(self, key, old_value, old_date, new_value):
+        conn = self.connection()
+        params = {**_rollup_params(key), "old": old_value, "old_date": old_date, "new": new_value}
+        with conn:
+            return bool(conn.execute(_ROLLUP_CHANGE_SQL, params).fetchall())
+
+    def rollup_remove(self, key, old_value, old_date):
+        conn = self.connection()
+        params = {**_rollup_params(key), "old": old_value, "old_date": old_date}
+        with conn:
+            return bool(conn.execute(_ROLLUP_REMOVE_SQL, params).fetchall())
+
+    def rollup_refresh(self, key):
+        conn = self.connection()
+        with conn:
+            conn.execute(_ROLLUP_DROP_EMPTY_SQL, _rollup_params(key))
+            conn.execute(_ROLLUP_REFRESH_SQL, _rollup_params(key))
+
+    def stats(self):
+        return {"path": self.path}
+
+
+# -------------------------------
+# انتخاب پشتیبان
+# -------------------------------
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    """پشتیبان فعال (یک نمونه برای کل فرایند) را برمی‌گرداند."""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                kind = os.environ.get("DARSBAN_BACKEND", "supabase").lower()
+                _backend = SQLiteBackend() if kind == "sqlite" else SupabaseBackend()
+    return _backend
+
+
+def set_backend(backend):
+    """جایگزینی پشتیبان فعال (برای اجرای آفلاین و بنچمارک)."""
+    global _backend
+    _backend = backend
+    query_cache.clear()
+
+
+def backend_stats():
+    """وضعیت پشتیبان فعال (برای Supabase: اشباع Pool اتصال‌ها) و حافظه نهان پرس‌وجوها."""
+    backend = get_backend()
+    return {"backend": backend.name, **backend.stats(), "query_cache": query_cache.stats()}
+
+
+# -------------------------------
+# توابع عمومی خواندن و نوشتن
+# -------------------------------
+
+def fetch_rows(table, columns="*", filters=None, order_by=None, limit=None, cached=True):
+    """خواندن ردیف‌ها؛ نتیجه در حافظه نهان مشترک نگه داشته می‌شود.
+
+    بدون ``limit`` همه ردیف‌ها صفحه‌به‌صفحه خوانده می‌شوند (``fetch_all``)
+    تا سقف پیش‌فرض تعداد ردیف پشتیبان نتیجه را بی‌صدا کوتاه نکند.
+    """
+    def load():
+        if limit is None and order_by in (None, "id"):
+            return fetch_all(table, columns, filters)
+        return get_backend().select(table, columns, filters, order_by, limit)
+
+    if not cached:
+        return load()
+    rows = query_cache.get_or_load(make_key(table, columns, filters, order_by, limit), load)
+    # کپی سطحی تا تغییر ردیف‌ها در پنل‌ها به حافظه نهان نشت نکند
+    return [dict(row) for row in rows]
+
+
+def iter_pages(table, columns="*", filters=None, page_size=PAGE_SIZE, key="id", after=None, until=None):
+    """خواندن صفحه‌به‌صفحه بر اساس کلید مرتب (keyset)؛ هر بار یک فهرست ردیف.
+
+    هر صفحه با شرط ``key > آخرین مقدار`` خوانده می‌شود، پس برخلاف OFFSET
+    هزینه صفحه‌های بعدی بالا نمی‌رود. نتیجه در حافظه نهان نگه داشته نمی‌شود.
+    """
+    columns = _with_key(columns, key)
+    while True:
+        rows = get_backend().select(table, columns, filters, key, page_size, after, until)
+        if not rows:
+            return
+        yield rows
+        if len(rows) < page_size:
+            return
+        after = rows[-1][key]
+
+
+def _with_key(columns, key):
+    column_list = _split_columns(columns)
+    if column_list and key not in column_list:
+        return ", ".join(column_list + [key])
+    return columns
+
+
+def fetch_page(table, columns="*", filters=None, after=None, page_size=PAGE_SIZE, key="id"):
+    """یک صفحه از ردیف‌های مرتب بر اساس ``key`` پس از مقدار ``after`` (برای جدول‌های صفحه‌بندی‌شده)."""
+    columns = _with_key(columns, key)
+    rows = query_cache.get_or_load(
+        make_key(table, columns, filters, "page", key, after, page_size),
+        lambda: get_backend().select(table, columns, filters, key, page_size, after),
+    )
+    return [dict(row) for row in rows]
+
+
+def fetch_all(table, columns="*", filters=None, page_size=PAGE_SIZE, key="id"):
+    """همه ردیف‌ها به ترتیب ``key``؛ خواندن‌های بزرگ در چند بازه هم‌زمان انجام می‌شوند.
+
+    صفحه اول عادی خوانده می‌شود؛ اگر پر بود، بازه باقی‌مانده کلیدها بر اساس
+    تعداد ردیف‌ها به چند بخش تقسیم و هر بخش در یک رشته جدا صفحه‌به‌صفحه
+    خوانده می‌شود. ستون ``key`` اگر درخواست نشده باشد از نتیجه حذف می‌شود.
+    """
+    backend = get_backend()
+    requested = _split_columns(columns)
+    strip_key = bool(requested) and key not in requested
+    columns = _with_key(columns, key)
+
+    rows = backend.select(table, columns, filters, key, page_size)
+    if len(rows) == page_size:
+        start = rows[-1][key]
+        last = backend.select(table, key, filters, "-" + key, 1)[0][key]
+        remaining = backend.count(table, filters) - len(rows)
+        ranges = min(FETCH_WORKERS, -(-remaining // page_size))
+        if ranges > 1 and isinstance(start, int) and isinstance(last, int):
+            bounds = [start + (last - start) * i // ranges for i in range(ranges)] + [last]
+            parts = _fetch_executor.map(
+                lambda lo, hi: [row for page in iter_pages(table, columns, filters, page_size, key, lo, hi)
+                                for row in page],
+                bounds[:-1], bounds[1:],
+            )
+            for part in parts:
+                rows.extend(part)
+        else:
+            for page in iter_pages(table, columns, filters, page_size, key, after=start):
+                rows.extend(page)
+    if strip_key:
+        for row in rows:
+            row.pop(key, None)
+    return rows
+
+
+def fetch_df(table, columns="*", filters=None, order_by=None, limit=None, cached=True):
+    rows = fetch_rows(table, columns, filters, order_by, limit, cached)
+    return pd.DataFrame(rows) if rows else pd.DataFrame()
+
+
+def fetch_view(view, table, filters=None, order_by=None, limit=None, cached=True):
+    """DataFrame فقط با ستون‌هایی که نمای ``view`` از ``table`` اعلام کرده است (views.py)."""
+    columns = view_columns(view, table)
+    rows = fetch_rows(table, ", ".join(columns), filters, order_by, limit, cached)
+    return pd.DataFrame(rows, columns=list(columns))
+
+
+def count_rows(table, filters=None):
+    key = make_key(table, "count(*)", filters)
+    return query_cache.get_or_load(key, lambda: get_backend().count(table, filters))
+
+
+def insert_rows(table, rows):
+    inserted = get_backend().insert(table, rows)
+    written = [rows] if isinstance(rows, dict) else list(rows)
+    query_cache.invalidate_rows(table, written + inserted)
+    return inserted
+
+
+def upsert_rows(table, rows, on_conflict):
+    upserted = get_backend().upsert(table, rows, on_conflict)
+    query_cache.invalidate_rows(table, list(rows) + upserted)
+    return upserted
+
+
+def insert_linked_rows(table, rows, linked_table, link):
+    """درج ``rows`` و برای هر ردیف درج‌شده ردیف ``link(row)`` در ``linked_table``، همه یا هیچ.
+
+    در SQLite هر دو درج در یک تراکنش‌اند و در Supabase اگر درج دوم شکست
+    بخورد ردیف‌های درج‌شده اول حذف می‌شوند. خروجی: (ردیف‌های table، ردیف‌های linked_table)
+    """
+    inserted, linked = get_backend().insert_linked(table, list(rows), linked_table, link)
+    query_cache.invalidate_rows(table, list(rows) + inserted)
+    query_cache.invalidate_rows(linked_table, linked)
+    return inserted, linked
+
+
+def update_rows(table, values, filters):
+    updated = get_backend().update(table, values, filters)
+    # مقدار قبلی ستون‌های تغییرکرده معلوم نیست؛ آن‌ها را wildcard می‌گیریم
+    query_cache.invalidate_rows(table, updated, wildcard=tuple(values))
+    return updated
+
+
+def delete_rows(table, filters):
+    deleted = get_backend().delete(table, filters)
+    query_cache.invalidate_rows(table, deleted)
+    return deleted
+
+
+def delete_all_rows(table):
+    """حذف همه ردیف‌های ``table`` با یک درخواست (بدون خواندن شناسه‌ها)."""
+    get_backend().delete_all(table)
+    query_cache.invalidate_table(table)
+
+
+def fetch_concurrently(queries):
+    """اجرای هم‌زمان چند خواندن مستقل؛ زمان کل برابر کندترین خواندن است.
+
+    ``queries`` دیکشنری نام → تابع بدون آرگومان (مثلاً ``functools.partial``
+    روی fetch_view). خروجی دیکشنری نام → نتیجه؛ اگر خواندنی خطا بدهد، اولین
+    خطا (به ترتیب اعلام) دوباره raise می‌شود. داخل یکی از همین خواندن‌ها
+    دوباره فراخوانی نشود.
+    """
+    if len(queries) <= 1:
+        return {name: load() for name, load in queries.items()}
+    futures = {name: _fanout_executor.submit(load) for name, load in queries.items()}
+    return {name: future.result() for name, future in futures.items()}
+
+
+def map_concurrently(func, items):
+    """``func`` روی هر عضو ``items`` در همان Pool خواندن‌های هم‌زمان (به ترتیب ورودی).
+
+    برای کارهای سنگینی که GIL را آزاد می‌کنند (مثل هش PBKDF2 در hashlib).
+    """
+    items = list(items)
+    if len(items) <= 1:
+        return [func(item) for item in items]
+    return list(_fanout_executor.map(func, items))
+
+
+def prefetch(queries):
+    """گرم کردن هم‌زمان حافظه نهان برای خواندن‌هایی که پنل بعداً خودش انجام می‌دهد.
+
+    خطاها نادیده گرفته می‌شوند؛ همان خواندن در پنل دوباره اجرا و خطای آن
+    همان‌جا نمایش داده می‌شود.
+    """
+    futures = [_fanout_executor.submit(load) for load in queries]
+    for future in futures:
+        future.exception()
+
+
+def class_lesson_averages(teacher_id, class_name):
+    """میانگین هر درس در یک کلاس، محاسبه‌شده در پایگاه داده.
+
+    نتیجه برای همه دانش‌آموزان آن کلاس مشترک است و با ثبت نمره جدید
+    برای همان آموزگار باطل می‌شود.
+    """
+    key = make_key("scores", "class_lesson_averages", {"teacher_id": teacher_id, "کلاس": class_name})
+    rows = query_cache.get_or_load(
+        key, lambda: get_backend().class_lesson_averages(teacher_id, class_name)
+    )
+    return [dict(row) for row in rows]
+
+
+def school_overview(school_id=None):
+    """آمار کلی یک مدرسه (یا کل سامانه با ``school_id=None``) در یک فراخوانی.
+
+    خروجی: دیکشنری شمارش مدارس، کاربران، آموزگاران، دانش‌آموزان، نمرات،
+    آموزگاران فعال (ثبت نمره در ``OVERVIEW_ACTIVE_DAYS`` روز اخیر) و فهرست
+    «پایه‌ها». نتیجه برای هر مدرسه فقط ``OVERVIEW_TTL`` ثانیه نگه داشته
+    می‌شود و با نوشتن‌ها باطل نمی‌شود.
+    """
+    since = (datetime.date.today() - datetime.timedelta(days=OVERVIEW_ACTIVE_DAYS)).isoformat()
+    key = make_key("school_overview", "*", {"school_id": school_id}, since)
+    overview = query_cache.get_or_load(key, lambda: get_backend().school_overview(school_id, since), OVERVIEW_TTL)
+    # پاسخ خالی (مثلاً RPC بدون ردیف) با شمارش‌های صفر
+    return {**dict.fromkeys(OVERVIEW_TOTALS, 0), "پایه‌ها": [], **(overview or {})}
+
+
+# -------------------------------
+# توابع کمکی دامنه (کاربران، دانش‌آموزان، نمرات)
+# -------------------------------
+
+def resolve_ids(teacher=None, school=None):
+    """شناسه آموزگار و مدرسه از روی نام‌ها (برای ابزارهای خط فرمان).
+
+    خروجی: (teacher_id، school_id)؛ نامی که داده نشده None است و نام ناموجود ValueError می‌دهد.
+    """
+    teacher_id = school_id = None
+    if school:
+        rows = fetch_rows("schools", "id", {"نام_مدرسه": school})
+        if not rows:
+            raise ValueError(f"مدرسه پیدا نشد: {school}")
+        school_id = rows[0]["id"]
+    if teacher:
+        rows = fetch_rows("users", "id", {"نام_کامل": teacher, "نقش": "آموزگار"}, order_by="id")
+        if not rows:
+            raise ValueError(f"آموزگار پیدا نشد: {teacher}")
+        teacher_id = rows[0]["id"]
+    return teacher_id, school_id
+
+
+def add_score(data):
+    return add_scores([data])
+
+
+def add_scores(rows):
+    """ثبت گروهی نمرات با یک درج؛ جدول تجمیعی با یک upsert افزایشی اتمی به‌روز می‌شود."""
+    rows = list(rows)
+    if not rows:
+        return []
+    inserted = insert_rows("scores", rows) or rows
+
+    # سهم این دسته در هر گروه (تعداد، مجموع، کمینه، بیشینه، آخرین نمره) که در پایگاه داده به ردیف موجود افزوده می‌شود
+    groups = {}
+    for row in inserted:
+        key = rollups.rollup_key(row)
+        groups.setdefault(tuple(key.values()), (key, []))[1].append(row)
+    deltas = [delta for delta in (rollups.from_scores(key, group) for key, group in groups.values()) if delta]
+    if deltas:
+        get_backend().rollup_add(deltas)
+        query_cache.invalidate_rows("score_rollups", deltas)
+    return inserted
+
+
+def update_score(score_id, new_score):
+    old_rows = fetch_rows("scores", filters={"id": score_id}, cached=False)
+    updated = update_rows("scores", {"نمره": new_score}, {"id": score_id})
+    backend = get_backend()
+    for old in old_rows:
+        key = rollups.rollup_key(old)
+        if None in (old["نمره"], new_score) or not backend.rollup_change(key, old["نمره"], old.get("تاریخ"), new_score):
+            backend.rollup_refresh(key)
+        query_cache.invalidate_rows("score_rollups", [key])
+    return updated
+
+
+def delete_score(score_id):
+    deleted = delete_rows("scores", {"id": score_id})
+    backend = get_backend()
+    for old in deleted:
+        key = rollups.rollup_key(old)
+        if old["نمره"] is None or not backend.rollup_remove(key, old["نمره"], old.get("تاریخ")):
+            backend.rollup_refresh(key)
+        query_cache.invalidate_rows("score_rollups", [key])
+    return deleted
+
+
+# -------------------------------
+# جدول تجمیعی نمرات (score_rollups)
+# -------------------------------
+
+def get_rollups(filters=None):
+    """ردیف‌های تجمیعی (یک ردیف برای هر دانش‌آموز و درس) به صورت DataFrame."""
+    return fetch_df("score_rollups", filters=filters)
+
+
+def rebuild_rollups(filters=None):
+    """بازسازی کامل جدول تجمیعی از روی جدول نمرات (برای داده‌های قدیمی)."""
+    groups = {}
+    for row in fetch_rows("scores", filters=filters, cached=False):
+        key = rollups.rollup_key(row)
+        groups.setdefault(tuple(key.values()), (key, []))[1].append(row)
+    if filters:
+        delete_rows("score_rollups", filters)
+    else:
+        delete_all_rows("score_rollups")
+    built = [rollups.from_scores(key, rows) for key, rows in groups.values()]
+    built = [row for row in built if row]
+    if built:
+        insert_rows("score_rollups", built)
+    return len(built)
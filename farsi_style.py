@@ -0,0 +1,60 @@
+"""فونت وزیر و شیوه‌نامه راست‌چین؛ یک بار در هر فرایند آماده می‌شوند.
+
+فونت هنگام import یک بار در font_manager متپلات‌لیب ثبت می‌شود و
+``font.family`` پیش‌فرض نمودارها روی آن تنظیم می‌شود؛ بدون ثبت، متپلات‌لیب
+در هر رسم دنبال خانواده «Vazir» می‌گشت و به فونت پیش‌فرض برمی‌گشت.
+نمودارها ``font_prop`` مشترک را به کار می‌برند و کارنامه PDF همان فایل را
+از ``FONT_FACE_CSS`` (@font-face برای WeasyPrint) می‌خواند.
+"""
+import os
+from functools import lru_cache
+from pathlib import Path
+
+import matplotlib
+from matplotlib import font_manager
+
+FONT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fonts", "Vazir.ttf")
+FONT_FAMILY = "Vazir"
+
+FONT_FACE_CSS = f"""
+@font-face {{
+    font-family: '{FONT_FAMILY}';
+    src: url('{Path(FONT_PATH).as_uri()}') format('truetype');
+}}
+"""
+
+# راست‌چین کردن کل صفحه Streamlit (در هر اجرای اسکریپت یک بار تزریق می‌شود)
+PAGE_CSS = f"""
+    <style>
+    /* تنظیم فونت و جهت برای تمام عناصر Streamlit */
+    body, div, p, h1, h2, h3, h4, h5, h6, label, span, input, select, textarea, button, th, td {{
+        direction: rtl !important;
+        text-align: right !important;
+        font-family: '{FONT_FAMILY}', sans-serif !important;
+    }}
+    /* راست‌چین کردن متن و هدرهای ستون‌های جدول Streamlit */
+    .stDataFrame, .stDataFrame .header {{
+        direction: rtl !important;
+        text-align: right !important;
+    }}
+    /* اجزای فرم (ورودی‌ها، کشوها) */
+    .stSelectbox, .stTextInput, .stButton, .stTextarea {{
+        direction: rtl;
+        text-align: right;
+    }}
+    </style>
+"""
+
+
+@lru_cache(maxsize=1)
+def load_font():
+    """ثبت فونت وزیر در matplotlib؛ خروجی FontProperties مشترک یا None اگر فایل فونت نباشد."""
+    if not os.path.exists(FONT_PATH):
+        return None
+    font_manager.fontManager.addfont(FONT_PATH)
+    matplotlib.rcParams["font.family"] = FONT_FAMILY
+    matplotlib.rcParams["axes.unicode_minus"] = False
+    return font_manager.FontProperties(fname=FONT_PATH)
+
+
+font_prop = load_font()
@@ -0,0 +1,68 @@
+"""سطح‌بندی عملکرد به صورت برداری با مقیاس قابل تنظیم برای هر مدرسه.
+
+هر مقیاس چند مرز صعودی و یک برچسب برای هر بازه دارد؛ مرز پایین هر سطح
+شامل آن است (مثلاً با مقیاس پیش‌فرض، میانگین ۳٫۵ «خیلی خوب» است). خروجی
+یک Series با dtype دسته‌ای مرتب است، پس value_counts و نمودارها ارزان‌اند
+و ترتیب سطوح حفظ می‌شود. مقدار نامعتبر یا خالی «نامشخص» می‌شود.
+
+مقیاس اختصاصی مدارس از فایل JSON با مسیر ``DARSBAN_GRADING_SCALES``
+خوانده می‌شود:
+    {"نام مدرسه": {"مرزها": [1.5, 2.5, 3.5], "سطوح": ["...", "...", "...", "..."]}}
+"""
+import json
+import os
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+UNKNOWN = "نامشخص"
+
+
+class GradingScale:
+    """مقیاس سطح‌بندی: ``thresholds`` مرزهای صعودی و ``labels`` یکی بیشتر از مرزها."""
+
+    def __init__(self, thresholds, labels):
+        thresholds = [float(t) for t in thresholds]
+        if len(labels) != len(thresholds) + 1:
+            raise ValueError("تعداد سطوح باید یکی بیشتر از تعداد مرزها باشد.")
+        if thresholds != sorted(thresholds):
+            raise ValueError("مرزهای مقیاس باید صعودی باشند.")
+        self.thresholds = np.asarray(thresholds)
+        self.labels = list(labels)
+        self.dtype = pd.CategoricalDtype(self.labels + [UNKNOWN], ordered=True)
+
+    def categorize(self, scores):
+        """سطح عملکرد همه مقادیر در یک عملیات؛ خروجی Series دسته‌ای هم‌اندیس با ورودی."""
+        index = scores.index if isinstance(scores, pd.Series) else None
+        values = pd.to_numeric(pd.Series(scores, index=index), errors="coerce").to_numpy(dtype=float)
+        codes = np.searchsorted(self.thresholds, values, side="right")
+        codes[np.isnan(values)] = len(self.labels)
+        return pd.Series(pd.Categorical.from_codes(codes, dtype=self.dtype), index=index)
+
+    def categorize_one(self, score):
+        """سطح عملکرد یک نمره یا میانگین (برای متن‌ها و ردیف‌های تکی)."""
+        return self.categorize([score]).iloc[0]
+
+    def level_counts(self, levels):
+        """تعداد هر سطح به ترتیب مقیاس، بدون سطوح خالی (برای نمودار دایره‌ای)."""
+        counts = levels.value_counts(sort=False)
+        return counts[counts > 0]
+
+
+DEFAULT_SCALE = GradingScale([1.5, 2.5, 3.5], ["نیاز به تلاش بیشتر", "قابل قبول", "خوب", "خیلی خوب"])
+
+
+@lru_cache(maxsize=1)
+def _school_scales():
+    path = os.environ.get("DARSBAN_GRADING_SCALES")
+    if not path:
+        return {}
+    with open(path, encoding="utf-8") as f:
+        config = json.load(f)
+    return {school: GradingScale(spec["مرزها"], spec["سطوح"]) for school, spec in config.items()}
+
+
+def scale_for(school=None):
+    """مقیاس سطح‌بندی یک مدرسه (یا مقیاس پیش‌فرض)."""
+    return _school_scales().get(school, DEFAULT_SCALE)
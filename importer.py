@@ -0,0 +1,221 @@
+"""ورود گروهی دانش‌آموزان و نمرات از فایل‌های CSV و Excel.
+
+فایل به صورت جریانی و در دسته‌های چندصدتایی خوانده می‌شود (XLSX در حالت
+read_only)، هر ردیف جداگانه اعتبارسنجی می‌شود و ردیف‌های معتبر هر دسته با
+یک درج گروهی ثبت می‌شوند. خطاها با شماره ردیف فایل گزارش می‌شوند.
+
+اجرا از خط فرمان:
+    python importer.py students --teacher "نام آموزگار" students.xlsx
+    python importer.py scores --teacher "نام آموزگار" scores.csv
+"""
+import argparse
+import csv
+import datetime
+import io
+import sys
+from itertools import islice
+
+from auth import add_accounts
+from data_access import add_scores, fetch_rows
+
+CHUNK_SIZE = 500
+VALID_SCORES = (1, 2, 3, 4)
+
+# نام‌های قابل قبول سرستون‌ها در فایل ← نام ستون در پایگاه داده
+HEADER_ALIASES = {
+    "student": "student", "دانش‌آموز": "student", "نام دانش‌آموز": "student", "نام_دانش‌آموز": "student",
+    "نام_کاربر": "نام_کاربر", "نام کاربری": "نام_کاربر", "username": "نام_کاربر",
+    "رمز_عبور": "رمز_عبور", "رمز": "رمز_عبور", "رمز عبور": "رمز_عبور", "password": "رمز_عبور",
+    "پایه": "پایه", "کلاس": "کلاس",
+    "درس": "درس", "نمره": "نمره", "تاریخ": "تاریخ",
+}
+STUDENT_REQUIRED = ("student", "نام_کاربر", "رمز_عبور", "پایه", "کلاس")
+SCORE_REQUIRED = ("student", "درس", "نمره")
+
+
+def _normalize_header(header):
+    header = str(header or "").strip()
+    return HEADER_ALIASES.get(header, header)
+
+
+def iter_rows(file, filename):
+    """ردیف‌های فایل به صورت (شماره ردیف، دیکشنری) بدون بارگذاری کل فایل."""
+    if filename.lower().endswith((".xlsx", ".xlsm")):
+        from openpyxl import load_workbook
+
+        workbook = load_workbook(file, read_only=True, data_only=True)
+        try:
+            rows = workbook.active.iter_rows(values_only=True)
+            headers = [_normalize_header(h) for h in next(rows, [])]
+            for number, values in enumerate(rows, start=2):
+                if values and any(v not in (None, "") for v in values):
+                    yield number, dict(zip(headers, values))
+        finally:
+            workbook.close()
+    else:
+        text = file if isinstance(file, io.TextIOBase) else io.TextIOWrapper(file, encoding="utf-8-sig")
+        reader = csv.reader(text)
+        headers = [_normalize_header(h) for h in next(reader, [])]
+        for number, values in enumerate(reader, start=2):
+            if any(v.strip() for v in values):
+                yield number, dict(zip(headers, values))
+
+
+def _chunks(iterable, size):
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def _clean(value):
+    if value is None:
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value).strip()
+
+
+def _parse_score(value):
+    """نمره صحیح مجاز (``VALID_SCORES``)، وگرنه None (متن، inf، nan، اعشار یا خارج از بازه)."""
+    try:
+        number = float(value)
+    except (ValueError, OverflowError):
+        return None
+    if not number.is_integer() or int(number) not in VALID_SCORES:
+        return None
+    return int(number)
+
+
+def _parse_date(value, default):
+    """تاریخ ISO (سال-ماه-روز) از سلول متنی یا تاریخ Excel؛ سلول خالی ← ``default``، نامعتبر ← None."""
+    if isinstance(value, datetime.datetime):
+        return value.date().isoformat()
+    if isinstance(value, datetime.date):
+        return value.isoformat()
+    text = _clean(value)
+    if not text:
+        return default
+    try:
+        return datetime.date.fromisoformat(text).isoformat()
+    except ValueError:
+        return None
+
+
+def _new_report():
+    return {"inserted": 0, "errors": []}
+
+
+# -------------------------------
+# دانش‌آموزان
+# -------------------------------
+
+def import_students(file, filename, teacher, chunk_size=CHUNK_SIZE, progress=None):
+    """ورود دانش‌آموزان یک آموزگار؛ نام کاربری تکراری (در فایل یا پایگاه داده) رد می‌شود.
+
+    ``teacher`` نمایه آموزگار است (id، نام_کامل، مدرسه، school_id).
+    """
+    report = _new_report()
+    seen_usernames = set()
+    today = datetime.date.today().isoformat()
+    for chunk in _chunks(iter_rows(file, filename), chunk_size):
+        candidates = []
+        for number, row in chunk:
+            values = {column: _clean(row.get(column)) for column in STUDENT_REQUIRED}
+            missing = [column for column in STUDENT_REQUIRED if not values[column]]
+            if missing:
+                report["errors"].append((number, f"ستون‌های خالی: {', '.join(missing)}"))
+            elif values["نام_کاربر"] in seen_usernames:
+                report["errors"].append((number, f"نام کاربری تکراری در فایل: {values['نام_کاربر']}"))
+            else:
+                seen_usernames.add(values["نام_کاربر"])
+                candidates.append((number, values))
+
+        usernames = [values["نام_کاربر"] for _, values in candidates]
+        # نام کاربری در همه حساب‌ها (کاربران و دانش‌آموزان) یکتاست
+        existing = {
+            row["نام_کاربر"]
+            for row in fetch_rows("credentials", "نام_کاربر", {"نام_کاربر": usernames}, cached=False)
+        } if usernames else set()
+
+        valid = []
+        for number, values in candidates:
+            if values["نام_کاربر"] in existing:
+                report["errors"].append((number, f"نام کاربری از قبل ثبت شده است: {values['نام_کاربر']}"))
+            else:
+                valid.append({**values, "مدرسه": teacher["مدرسه"], "آموزگار": teacher["نام_کامل"],
+                              "teacher_id": teacher["id"], "school_id": teacher["school_id"], "تاریخ_ثبت": today})
+        if valid:
+            add_accounts("students", valid)
+            report["inserted"] += len(valid)
+        if progress:
+            progress(report)
+    return report
+
+
+# -------------------------------
+# نمرات
+# -------------------------------
+
+def import_scores(file, filename, teacher, chunk_size=CHUNK_SIZE, progress=None):
+    """ورود نمرات دانش‌آموزان یک آموزگار؛ نمره باید عدد صحیح ۱ تا ۴ باشد."""
+    report = _new_report()
+    students = {}
+    for row in fetch_rows("students", "id, student", {"teacher_id": teacher["id"]}, cached=False):
+        students.setdefault(row["student"], []).append(row["id"])
+    today = datetime.date.today().isoformat()
+    for chunk in _chunks(iter_rows(file, filename), chunk_size):
+        valid = []
+        for number, row in chunk:
+            values = {column: _clean(row.get(column)) for column in SCORE_REQUIRED}
+            missing = [column for column in SCORE_REQUIRED if not values[column]]
+            if missing:
+                report["errors"].append((number, f"ستون‌های خالی: {', '.join(missing)}"))
+                continue
+            if values["student"] not in students:
+                report["errors"].append((number, f"دانش‌آموز در فهرست این آموزگار نیست: {values['student']}"))
+                continue
+            if len(students[values["student"]]) > 1:
+                report["errors"].append((number, f"چند دانش‌آموز با این نام ثبت شده است: {values['student']}"))
+                continue
+            score = _parse_score(values["نمره"])
+            if score is None:
+                report["errors"].append((number, f"نمره نامعتبر (باید ۱ تا ۴ باشد): {values['نمره']}"))
+                continue
+            date = _parse_date(row.get("تاریخ"), today)
+            if date is None:
+                report["errors"].append((number, f"تاریخ نامعتبر (باید سال-ماه-روز باشد): {row.get('تاریخ')}"))
+                continue
+            valid.append({"student": values["student"], "درس": values["درس"], "نمره": score,
+                          "آموزگار": teacher["نام_کامل"], "تاریخ": date,
+                          "teacher_id": teacher["id"], "student_id": students[values["student"]][0]})
+        if valid:
+            add_scores(valid)
+            report["inserted"] += len(valid)
+        if progress:
+            progress(report)
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="ورود دانش‌آموزان یا نمرات از فایل CSV/XLSX")
+    parser.add_argument("kind", choices=["students", "scores"])
+    parser.add_argument("path")
+    parser.add_argument("--teacher", required=True, help="نام کامل آموزگار")
+    args = parser.parse_args(argv)
+    teachers = fetch_rows("users", "id, نام_کامل, مدرسه, school_id", {"نام_کامل": args.teacher, "نقش": "آموزگار"},
+                          order_by="id", limit=1)
+    if not teachers:
+        parser.error(f"آموزگار پیدا نشد: {args.teacher}")
+
+    with open(args.path, "rb") as f:
+        if args.kind == "students":
+            report = import_students(f, args.path, teachers[0])
+        else:
+            report = import_scores(f, args.path, teachers[0])
+    for number, message in report["errors"]:
+        print(f"ردیف {number}: {message}", file=sys.stderr)
+    print(f"{report['inserted']} ردیف ثبت شد، {len(report['errors'])} ردیف رد شد.")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,25 +1,37 @@
 import sqlite3
 
-conn = sqlite3.connect("school.db")
+from auth import hash_password
+from setup_db import DB_PATH, create_schema
+
+conn = sqlite3.connect(DB_PATH)
+create_schema(conn)
 cursor = conn.cursor()
 
-# مدیر سامانه (دسترسی کامل)
+# مدرسه کاربران نمونه (پنل‌ها با school_id فیلتر می‌کنند، نه با نام مدرسه)
 cursor.execute("""
-INSERT OR IGNORE INTO users (نام_کاربر, رمز_عبور, نقش, مدرسه, وضعیت, تاریخ_انقضا)
-VALUES ('fatemeh', '1234', 'آموزگار,مدیر سامانه', 'مرکزی', 'فعال', NULL)
+INSERT OR IGNORE INTO schools (نام_مدرسه, کد_مدرسه)
+VALUES ('شهید بهشتی', 'SB001')
 """)
 
-# معاون مدرسه شهید بهشتی
-cursor.execute("""
-INSERT OR IGNORE INTO users (نام_کاربر, رمز_عبور, نقش, مدرسه, وضعیت, تاریخ_انقضا)
-VALUES ('moaven1', '4321', 'معاون', 'شهید بهشتی', 'فعال', '1404/07/30')
-""")
+SEED_USERS = [
+    # مدیر سامانه (دسترسی کامل؛ به مدرسه‌ای وابسته نیست)
+    ("fatemeh", "1234", "فاطمه سیفی‌پور", "مدیر سامانه", "مرکزی", None),
+    # معاون مدرسه شهید بهشتی
+    ("moaven1", "4321", "معاون شهید بهشتی", "معاون", "شهید بهشتی", "1404/07/30"),
+    # آموزگار تستی برای مدرسه شهید بهشتی
+    ("teacher1", "1111", "آموزگار تستی", "آموزگار", "شهید بهشتی", "1404/07/30"),
+]
 
-# آموزگار تستی برای مدرسه شهید بهشتی
-cursor.execute("""
-INSERT OR IGNORE INTO users (نام_کاربر, رمز_عبور, نقش, مدرسه, وضعیت, تاریخ_انقضا)
-VALUES ('teacher1', '1111', 'آموزگار', 'شهید بهشتی', 'فعال', '1404/07/30')
-""")
+for username, password, fullname, role, school, expires in SEED_USERS:
+    cursor.execute("""
+    INSERT OR IGNORE INTO users (نام_کاربر, نام_کامل, نقش, مدرسه, وضعیت, تاریخ_انقضا, school_id)
+    VALUES (?, ?, ?, ?, 'فعال', ?, (SELECT id FROM schools WHERE نام_مدرسه = ?))
+    """, (username, fullname, role, school, expires, school))
+    # رمز فقط به صورت هش در credentials ذخیره می‌شود
+    cursor.execute("""
+    INSERT OR IGNORE INTO credentials (نام_کاربر, نقش, جدول, row_id, رمز_هش)
+    SELECT نام_کاربر, نقش, 'users', id, ? FROM users WHERE نام_کاربر = ?
+    """, (hash_password(password), username))
 
 conn.commit()
 conn.close()
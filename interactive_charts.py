@@ -0,0 +1,82 @@
+"""نمودارهای تعاملی Plotly که در مرورگر رسم می‌شوند.
+
+امضای توابع همان امضای ``charts`` است تا پنل‌ها بتوانند موتور رسم را با
+``DARSBAN_CHART_RENDERER=plotly`` عوض کنند. به جای تصویر PNG فقط سری‌های
+داده (JSON فشرده) به مرورگر فرستاده می‌شود؛ متن فارسی را خود مرورگر
+راست‌به‌چپ نمایش می‌دهد، پس شکل‌دهی rtl لازم نیست. قالب Plotly خاموش
+است (``template="none"``) و ظاهر را تم Streamlit در مرورگر می‌سازد.
+کارنامه PDF همچنان با ``charts`` (matplotlib) ساخته می‌شود.
+
+پارامترهای ``size`` و ``dpi`` فقط برای سازگاری با ``charts`` است؛ عرض
+نمودار عرض ستون صفحه است و ارتفاع از ``size`` حساب می‌شود.
+"""
+import plotly.graph_objects as go
+
+from charts import LINE_COLOR, PIE_COLORS, SCREEN_DPI, _as_list
+from farsi_style import FONT_FAMILY
+
+PIXELS_PER_INCH = 90
+
+
+def _figure(traces, title, size, title_size=None, **layout):
+    fig = go.Figure(data=traces)
+    fig.update_layout(
+        template="none",
+        title={"text": title, "x": 0.5, "font": {"size": title_size} if title_size else {}} if title else None,
+        font={"family": f"{FONT_FAMILY}, Tahoma, sans-serif"},
+        height=int(size[1] * PIXELS_PER_INCH),
+        margin={"l": 40, "r": 20, "t": 60 if title else 20, "b": 40},
+        **layout,
+    )
+    return fig
+
+
+# -------------------------------
+# انواع نمودار
+# -------------------------------
+
+def line_chart(x, y, title, xlabel, ylabel, size, ylim=None, title_size=None, dpi=SCREEN_DPI):
+    """نمودار خطی روند نمرات؛ خروجی: Figure پلاتلی."""
+    trace = go.Scatter(x=_as_list(x), y=_as_list(y), mode="lines+markers", line={"color": LINE_COLOR, "width": 2})
+    return _figure(
+        [trace], title, size, title_size,
+        xaxis={"title": {"text": xlabel}, "dtick": 1},
+        yaxis={"title": {"text": ylabel}, "range": list(ylim) if ylim else None},
+    )
+
+
+def multi_line_chart(series, title, xlabel, ylabel, size, dpi=SCREEN_DPI):
+    """چند نمودار خطی روی یک محور با راهنما؛ ``series`` فهرست (برچسب، x، y) است."""
+    traces = [go.Scatter(x=_as_list(x), y=_as_list(y), name=label, mode="lines+markers")
+              for label, x, y in series]
+    return _figure(traces, title, size, xaxis={"title": {"text": xlabel}}, yaxis={"title": {"text": ylabel}})
+
+
+def pie_chart(counts, title, size, title_size=12, donut=False, dpi=SCREEN_DPI):
+    """نمودار دایره‌ای (یا حلقه‌ای) از یک Series شمارش‌ها."""
+    trace = go.Pie(
+        labels=_as_list(counts.index), values=_as_list(counts.values), hole=0.4 if donut else 0,
+        sort=False, rotation=140, marker={"colors": PIE_COLORS, "line": {"color": "white", "width": 1}},
+        texttemplate="%{percent:.1%}",
+    )
+    return _figure([trace], title, size, title_size)
+
+
+def bar_chart(labels, values, title, size=(6.4, 4.8), dpi=SCREEN_DPI):
+    """نمودار میله‌ای ساده (مثلاً میانگین نمره هر دانش‌آموز)."""
+    trace = go.Bar(x=_as_list(labels), y=_as_list(values))
+    return _figure([trace], title, size, xaxis={"tickangle": -45})
+
+
+def stacked_bar_chart(labels, series, title, size, dpi=SCREEN_DPI):
+    """نمودار میله‌ای افقی انباشته؛ ``series`` فهرست (برچسب، مقادیر) برای هر بخش میله است."""
+    labels = _as_list(labels)
+    traces = [
+        go.Bar(y=labels, x=_as_list(values), name=name, orientation="h",
+               marker={"color": PIE_COLORS[i % len(PIE_COLORS)]})
+        for i, (name, values) in enumerate(series)
+    ]
+    return _figure(
+        traces, title, size, barmode="stack", yaxis={"autorange": "reversed"},
+        legend={"orientation": "h", "x": 0.5, "xanchor": "center", "y": 1.02, "yanchor": "bottom"},
+    )
@@ -1,112 +1,193 @@
 import streamlit as st
 import pandas as pd
-import matplotlib.pyplot as plt
-from io import BytesIO
-from fpdf import FPDF
-from supabase_utils import supabase
+from functools import partial
+from data_access import (
+    fetch_rows, fetch_df, fetch_page, fetch_view, count_rows, insert_rows, update_rows, delete_rows,
+    add_score, update_score, delete_score, school_overview,
+    fetch_concurrently, prefetch, backend_stats,
+)
+from rollups import display_names, student_averages, teacher_comparison
+from views import view_columns
+from grading import scale_for
+import auth
+import bulk_export
+import panel_data
+import ratelimit
+import sessions
+import farsi_style  # فونت وزیر یک بار در matplotlib ثبت می‌شود
+import json
+import os
+import tempfile
 import uuid
-import matplotlib.font_manager as fm  # برای فونت فارسی در نمودارها
-import arabic_reshaper
-from bidi.algorithm import get_display
-def fix_rtl(text):
-    """اعمال الگوریتم BiDi برای تصحیح راست‌چین شدن متون فارسی/عربی."""
-    if not isinstance(text, str) or not text.strip():
-        return text
-    
-    # ۱. اصلاح شکل حروف
-    reshaped_text = arabic_reshaper.reshape(text)
-    # ۲. اعمال جهت‌دهی راست‌چین
-    return get_display(reshaped_text)
 # 🎯 تنظیم صفحه Streamlit
 st.set_page_config(page_title=" دنیای هوشمند درسبان", layout="wide")
 
-# 🎨 تنظیم فونت فارسی برای نمودارها
-font_path = "fonts/Vazir.ttf"  # مسیر به فونت فارسی در پروژه
-font_prop = fm.FontProperties(fname=font_path)
-plt.rcParams["font.family"] = font_prop.get_name()
-plt.rcParams["axes.unicode_minus"] = False
-
-# 📐 تنظیم راست‌چین برای کل صفحه
-st.markdown("""
-    <style>
-    body, div, p, h1, h2, h3, h4, h5, h6 {
-        direction: rtl;
-        text-align: right;
-        font-family: 'Vazir', sans-serif;
+# 📐 تنظیم راست‌چین و فونت فارسی برای کل صفحه (یک بار در هر اجرا)
+st.markdown(farsi_style.PAGE_CSS, unsafe_allow_html=True)
+if farsi_style.font_prop is None:
+    st.error("فایل فونت Vazir.ttf پیدا نشد. لطفاً آن را در پوشه 'fonts' قرار دهید.")
+
+def show_paged_table(table, columns, filters=None, key="table", rename=None, page_size=50):
+    """جدول صفحه‌بندی‌شده؛ هر صفحه جداگانه (keyset بر اساس id) از پایگاه داده خوانده می‌شود."""
+    cursors = st.session_state.setdefault(f"{key}_cursors", [None])
+    rows = current_page_loader(table, columns, filters, key, page_size)()
+    if not rows and len(cursors) > 1:
+        # صفحه خالی شده (مثلاً پس از حذف)؛ بازگشت به صفحه اول
+        del cursors[1:]
+        rows = current_page_loader(table, columns, filters, key, page_size)()
+    # یک ردیف بیشتر از اندازه صفحه خوانده می‌شود تا وجود صفحه بعد معلوم باشد
+    has_next = len(rows) > page_size
+    rows = rows[:page_size]
+    if rows:
+        st.dataframe(pd.DataFrame(rows).drop(columns="id").rename(columns=rename or {}), hide_index=True)
+
+    total_pages = max(1, -(-count_rows(table, filters) // page_size))
+    col1, col2, col3 = st.columns([1, 2, 1])
+    with col1:
+        if st.button("◀️ صفحه قبل", key=f"{key}_prev", disabled=len(cursors) == 1):
+            cursors.pop()
+            st.rerun()
+    with col2:
+        st.caption(f"صفحه {len(cursors)} از {total_pages}")
+    with col3:
+        if st.button("صفحه بعد ▶️", key=f"{key}_next", disabled=not has_next):
+            cursors.append(rows[-1]["id"])
+            st.rerun()
+
+
+def current_page_loader(table, columns, filters=None, key="table", page_size=50):
+    """خواندن صفحه جاری ``show_paged_table`` (``page_size`` + ۱ ردیف) با همان کلید حافظه نهان (برای prefetch)."""
+    after = st.session_state.get(f"{key}_cursors", [None])[-1]
+    return partial(fetch_page, table, columns, filters, after=after, page_size=page_size + 1)
+
+# -------------------------------
+# احراز هویت کاربر
+# -------------------------------
+def authenticate(username, password):
+    """نمایه نشست کاربر در صورت درستی نام کاربری و رمز، وگرنه None."""
+    # یک خواندن از فهرست یکپارچه حساب‌ها (credentials) و بررسی هش رمز در auth
+    row = auth.authenticate(username, password)
+    return make_profile(row) if row else None
+
+
+def make_profile(row):
+    """نمایه نشست از ردیف users یا students؛ همه پنل‌ها نام، نقش و مدرسه را از اینجا می‌خوانند.
+
+    پرس‌وجوهای پنل‌ها با شناسه‌ها (id، teacher_id، school_id) فیلتر می‌شوند؛ نام‌ها فقط برای نمایش‌اند.
+    """
+    if "student" in row:
+        return {
+            "id": row["id"],
+            "نقش": "دانش‌آموز",
+            "نام_کاربر": row["نام_کاربر"],
+            "نام_کامل": row["student"],
+            "مدرسه": row.get("مدرسه"),
+            "پایه": row.get("پایه"),
+            "کلاس": row.get("کلاس"),
+            "آموزگار": row.get("آموزگار"),
+            "teacher_id": row.get("teacher_id"),
+            "school_id": row.get("school_id"),
+        }
+    return {
+        "id": row["id"],
+        "نقش": row["نقش"],
+        "نام_کاربر": row["نام_کاربر"],
+        "نام_کامل": row.get("نام_کامل") or row["نام_کاربر"],
+        "مدرسه": row.get("مدرسه"),
+        "school_id": row.get("school_id"),
     }
-    </style>
-""", unsafe_allow_html=True)
-
-def apply_farsi_style(ax, title=None, xlabel=None, ylabel=None):
-    """تنظیم فونت فارسی و راست‌چین برای نمودارهای Matplotlib"""
-    from matplotlib import font_manager
-    font_path = "fonts/Vazir.ttf"
-    font_prop = font_manager.FontProperties(fname=font_path)
-
-    if title:
-        ax.set_title(title, fontproperties=font_prop, horizontalalignment='right')
-    if xlabel:
-        ax.set_xlabel(xlabel, fontproperties=font_prop, horizontalalignment='right')
-    if ylabel:
-        ax.set_ylabel(ylabel, fontproperties=font_prop, horizontalalignment='right')
-
-    # تنظیم فونت برای تیک‌های محور
-    ax.tick_params(axis='x', labelrotation=0)
-    for label in ax.get_xticklabels() + ax.get_yticklabels():
-        label.set_fontproperties(font_prop)
-        label.set_horizontalalignment('right')
-
-    # تنظیم شبکه
-    ax.grid(True, linestyle="--", alpha=0.5)
+
+
+def current_scale():
+    """مقیاس سطح‌بندی مدرسه کاربر واردشده."""
+    return scale_for((st.session_state.get("user") or {}).get("مدرسه"))
+
+
+def refresh_profile():
+    """خواندن دوباره نمایه کاربر واردشده (فقط پس از تغییر اطلاعات همین کاربر)."""
+    profile = st.session_state.get("user")
+    if not profile:
+        return
+    table = "students" if profile["نقش"] == "دانش‌آموز" else "users"
+    rows = fetch_rows(table, ", ".join(view_columns("profile", table)),
+                      {"نام_کاربر": profile["نام_کاربر"]}, cached=False)
+    if rows:
+        # تغییر حساب نشست‌های قبلی آن را باطل کرده است؛ نشست تازه با نمایه جدید
+        start_session(make_profile(rows[0]))
+    else:
+        end_session()
+
 
 # -------------------------------
-# توابع کمکی Supabase
+# نشست ورود (توکن امضاشده در کوکی مرورگر)
 # -------------------------------
 
-def get_users():
-    response = supabase.table("users").select("*").execute()
-    return pd.DataFrame(response.data) if response.data else pd.DataFrame()
+SESSION_COOKIE = "darsban_session"
+# نسخه‌های قبلی توکن را در این پارامتر نشانی صفحه می‌گذاشتند
+LEGACY_SESSION_PARAM = "session"
 
-def get_students():
-    response = supabase.table("students").select("*").execute()
-    return pd.DataFrame(response.data) if response.data else pd.DataFrame()
 
-def get_scores():
-    response = supabase.table("scores").select("*").execute()
-    return pd.DataFrame(response.data) if response.data else pd.DataFrame()
+def start_session(profile):
+    st.session_state["user"] = profile
+    st.session_state["session_token"] = sessions.issue(profile)
+    st.session_state["session_cookie"] = st.session_state["session_token"]
 
-def add_user(data):
-    supabase.table("users").insert(data).execute()
 
-def add_student(data):
-    supabase.table("students").insert(data).execute()
+def end_session():
+    st.session_state.pop("user", None)
+    token = st.session_state.pop("session_token", None)
+    if token:
+        sessions.revoke(token)
+    st.session_state["session_cookie"] = None
 
-def add_score(data):
-    supabase.table("scores").insert(data).execute()
 
-def update_score(student_name, lesson, new_score):
-    supabase.table("scores").update({"نمره": new_score}).eq("student", student_name).eq("درس", lesson).execute()
+def resume_session():
+    """بازگرداندن کاربر پس از قطع و وصل اتصال با کوکی نشست، بدون پایگاه داده.
+
+    فقط یک بار در آغاز هر نشست Streamlit انجام می‌شود؛ توکن کوکی با یک توکن
+    تازه جایگزین و توکن قبلی باطل می‌شود.
+    """
+    if st.session_state.get("session_checked"):
+        return
+    st.session_state["session_checked"] = True
+    if LEGACY_SESSION_PARAM in st.query_params:
+        # توکن در نشانی صفحه (پیوند کپی‌شده یا تاریخچه مرورگر) دیگر پذیرفته نمی‌شود
+        sessions.revoke(st.query_params[LEGACY_SESSION_PARAM])
+        del st.query_params[LEGACY_SESSION_PARAM]
+    token = st.context.cookies.get(SESSION_COOKIE)
+    if not token:
+        return
+    profile, token = sessions.rotate(token)
+    if profile:
+        st.session_state["user"] = profile
+        st.session_state["session_token"] = token
+    st.session_state["session_cookie"] = token
 
-def delete_student(student_name):
-    supabase.table("students").delete().eq("نام", student_name).execute()
 
-# -------------------------------
-# احراز هویت کاربر
-# -------------------------------
-def authenticate(username, password):
-    # 👑 جستجو در جدول users (مدیر، معاون، آموزگار)
-    response = supabase.table("users").select("*").eq("نام_کاربر", username).eq("رمز_عبور", password).execute()
-    if response.data:
-        return response.data[0]
+def write_session_cookie():
+    """نوشتن (یا پاک کردن) کوکی نشست در مرورگر، اگر در این اجرا تغییر کرده باشد.
+
+    Streamlit برای نوشتن کوکی API ندارد؛ کوکی با یک جزء HTML بی‌اندازه از
+    خود صفحه نوشته می‌شود و در نشانی صفحه، تاریخچه مرورگر یا پیوندهای کپی‌شده نمی‌آید.
+    """
+    if "session_cookie" not in st.session_state:
+        return
+    token = st.session_state.pop("session_cookie")
+    max_age = int(sessions.SESSION_TTL) if token else 0
+    cookie = f"{SESSION_COOKIE}={token or ''}; Path=/; Max-Age={max_age}; SameSite=Strict"
+    st.iframe(
+        f"<script>parent.document.cookie = {json.dumps(cookie)}"
+        " + (parent.location.protocol === 'https:' ? '; Secure' : '');</script>",
+        height=1,
+    )
 
-    # 🎓 جستجو در جدول students (دانش‌آموز)
-    response2 = supabase.table("students").select("*").eq("نام_کاربر", username).eq("رمز_عبور", password).execute()
-    if response2.data:
-        student = response2.data[0]
-        student["نقش"] = "دانش‌آموز"
-        return student
 
-    return None
+def client_ip():
+    """نشانی IP کاربر؛ پشت پراکسی مورد اعتماد از سرآیند X-Forwarded-For."""
+    forwarded = st.context.headers.get("X-Forwarded-For") if ratelimit.TRUST_PROXY else None
+    if forwarded:
+        return forwarded.split(",")[0].strip()
+    return st.context.ip_address or "نامعلوم"
 
 
 # -------------------------------
@@ -116,31 +197,30 @@ def authenticate(username, password):
 def register_user(username, password, role, fullname, school=None):
     data = {
         "نام_کاربر": username,
-        "رمز": password,
+        "رمز_عبور": password,
         "نقش": role,
         "نام_کامل": fullname,
         "مدرسه": school or "",
     }
-    supabase.table("users").insert(data).execute()
+    auth.add_account("users", data)
     st.success("کاربر جدید با موفقیت ثبت شد ✅")
 
 # -------------------------------
 # داشبورد اصلی بعد از ورود
 # -------------------------------
 
-def main_dashboard(user):
-    role = user["نقش"]
-    username = user["نام_کاربر"]
+def main_dashboard(profile):
+    role = profile["نقش"]
 
     # 👋 خوش‌آمدگویی در بالای صفحه
     col1, col2 = st.columns([4, 1])
     with col1:
         st.markdown(
-            f"### 👋 خوش آمدی، **{user.get('نام_کامل', user.get('student', 'کاربر'))}**"
+            f"### 👋 خوش آمدی، **{profile['نام_کامل']}**"
         )
     with col2:
         if st.button("🚪 خروج از سامانه"):
-            st.session_state.pop("user", None)
+            end_session()
             st.success("با موفقیت خارج شدید ✅")
             st.rerun()
 
@@ -148,15 +228,15 @@ def main_dashboard(user):
 
     # 📌 نمایش پنل مناسب بر اساس نقش
     if role == "مدیر سامانه":
-        show_superadmin_panel(username)
+        show_superadmin_panel(profile)
     elif role == "مدیر مدرسه":
-        show_school_admin_panel(username)
+        show_school_admin_panel(profile)
     elif role == "معاون":
-        show_assistant_panel(username)
+        show_assistant_panel(profile)
     elif role == "آموزگار":
-        show_teacher_panel(username)
+        show_teacher_panel(profile)
     elif role == "دانش‌آموز":
-        show_student_panel(username)
+        show_student_panel(profile)
     else:
         st.error("نقش کاربر نامعتبر است!")
 
@@ -172,9 +252,14 @@ def login_page():
     password = st.text_input("رمز عبور:", type="password")
 
     if st.button("ورود"):
-        user = authenticate(username, password)
-        if user:
-            st.session_state["user"] = user
+        # تلاش‌های پشت‌سرهم از یک IP یا برای یک نام کاربری پیش از پایگاه داده رد می‌شوند
+        wait = ratelimit.check_login(client_ip(), username)
+        user = None if wait else authenticate(username, password)
+        if wait:
+            st.error(f"تلاش‌های ورود بیش از حد مجاز است؛ لطفاً {wait} ثانیه دیگر دوباره امتحان کنید.")
+        elif user:
+            ratelimit.login_by_username.reset(username)
+            start_session(user)
             st.success("ورود موفقیت‌آمیز ✅")
             st.rerun()
         else:
@@ -183,17 +268,54 @@ def login_page():
     st.markdown("---")
     st.info("🌸 درسبان، همراه هوشمند شما — طراحی‌شده توسط فاطمه سیفی‌پور 💙")
 
+# -------------------------------
+# آمار کلی مدرسه (مدیر سامانه، مدیر مدرسه، معاون)
+# -------------------------------
+
+def show_school_overview(school_id):
+    """آمار کلی یک مدرسه یا کل سامانه (school_id=None) از یک فراخوانی school_overview."""
+    try:
+        overview = school_overview(school_id)
+    except Exception as e:
+        st.error(f"❌ خطا در دریافت آمار کلی: {e}")
+        return
+
+    lines = []
+    if school_id is None:
+        lines += [f"- 🏫 تعداد مدارس: **{overview['مدارس']}**",
+                  f"- 👥 تعداد کاربران: **{overview['کاربران']}**"]
+    lines += [
+        f"- 👩‍🏫 تعداد آموزگاران: **{overview['آموزگاران']}** (فعال در ۳۰ روز اخیر: **{overview['آموزگاران فعال']}**)",
+        f"- 👨‍🎓 تعداد دانش‌آموزان: **{overview['دانش‌آموزان']}**",
+        f"- 📝 تعداد نمرات ثبت‌شده: **{overview['نمرات']}**",
+    ]
+    st.markdown("\n".join(lines))
+    if overview["پایه‌ها"]:
+        st.markdown("#### آمار به تفکیک پایه")
+        st.dataframe(pd.DataFrame(overview["پایه‌ها"]), hide_index=True)
+
 # -------------------------------
 # پنل مدیر سامانه
 # -------------------------------
 import uuid
 import pandas as pd
-import matplotlib.pyplot as plt
 import streamlit as st
 
-def show_superadmin_panel(username):
+def show_superadmin_panel(profile):
     st.title("🏫 پنل مدیر سامانه")
-    st.markdown(f"👤 مدیر: {username}")
+    st.markdown(f"👤 مدیر: {profile['نام_کاربر']}")
+
+    # خواندن‌های همه تب‌ها هم‌زمان انجام می‌شوند و تب‌ها از حافظه نهان می‌خوانند؛
+    # ستون‌ها و فیلترها باید دقیقاً همان خواندن‌های تب‌ها باشند تا کلید حافظه نهان یکی شود
+    prefetch([
+        partial(fetch_rows, "schools", "id, نام_مدرسه"),
+        partial(fetch_rows, "users", "نام_کاربر"),
+        current_page_loader("schools", "نام_مدرسه, کد_مدرسه", key="schools_table"),
+        current_page_loader("users", "نام_کاربر, نام_کامل, نقش, مدرسه", key="users_table"),
+        partial(count_rows, "schools"),
+        partial(count_rows, "users"),
+        partial(school_overview, None),
+    ])
 
     tabs = st.tabs(["مدیریت مدارس", "مدیریت کاربران", "گزارش‌ها"])
 
@@ -205,18 +327,17 @@ def show_superadmin_panel(username):
         if st.button("افزودن مدرسه"):
             if new_school.strip():
                 school_code = str(uuid.uuid4())[:8]
-                supabase.table("schools").insert({
+                insert_rows("schools", {
                     "نام_مدرسه": new_school,
                     "کد_مدرسه": school_code
-                }).execute()
+                })
                 st.success("✅ مدرسه با موفقیت افزوده شد.")
                 st.rerun()
             else:
                 st.warning("لطفاً نام مدرسه را وارد کنید.")
 
-        schools_response = supabase.table("schools").select("*").execute()
-        if schools_response.data:
-            schools_df = pd.DataFrame(schools_response.data)
+        schools_df = fetch_df("schools", "id, نام_مدرسه")
+        if not schools_df.empty:
             st.markdown("### لیست مدارس ثبت‌شده")
             selected_school = st.selectbox("انتخاب مدرسه برای ویرایش یا حذف:", schools_df["نام_مدرسه"].tolist())
             new_name = st.text_input("نام جدید برای مدرسه:")
@@ -224,17 +345,17 @@ def show_superadmin_panel(username):
             with col1:
                 if st.button("ویرایش نام مدرسه"):
                     if new_name.strip():
-                        supabase.table("schools").update({"نام_مدرسه": new_name}).eq("نام_مدرسه", selected_school).execute()
+                        update_rows("schools", {"نام_مدرسه": new_name}, {"نام_مدرسه": selected_school})
                         st.success("✅ نام مدرسه ویرایش شد.")
                         st.rerun()
                     else:
                         st.warning("نام جدید نمی‌تواند خالی باشد.")
             with col2:
                 if st.button("🗑️ حذف مدرسه"):
-                    supabase.table("schools").delete().eq("نام_مدرسه", selected_school).execute()
+                    delete_rows("schools", {"نام_مدرسه": selected_school})
                     st.success("✅ مدرسه حذف شد.")
                     st.rerun()
-            st.dataframe(schools_df[["نام_مدرسه", "کد_مدرسه"]])
+            show_paged_table("schools", "نام_مدرسه, کد_مدرسه", key="schools_table")
         else:
             st.info("هیچ مدرسه‌ای ثبت نشده است.")
 
@@ -242,33 +363,35 @@ def show_superadmin_panel(username):
     with tabs[1]:
         st.subheader("مدیریت کاربران سیستم")
 
-        users_response = supabase.table("users").select("*").execute()
-        users_df = pd.DataFrame(users_response.data) if users_response.data else pd.DataFrame()
+        users_df = fetch_df("users", "نام_کاربر")
 
         if not users_df.empty:
-            st.dataframe(users_df[["نام_کاربر", "نام_کامل", "نقش", "مدرسه"]])
+            show_paged_table("users", "نام_کاربر, نام_کامل, نقش, مدرسه", key="users_table")
             selected_user = st.selectbox("انتخاب کاربر برای ویرایش یا حذف:", users_df["نام_کاربر"].tolist())
             new_fullname = st.text_input("نام کامل جدید:")
             new_password = st.text_input("رمز عبور جدید:", type="password")
             new_role = st.selectbox("نقش جدید:", ["آموزگار", "مدیر مدرسه", "معاون"])
-            school_list = supabase.table("schools").select("نام_مدرسه").execute()
-            school_names = [row["نام_مدرسه"] for row in school_list.data] if school_list.data else []
+            school_ids = {row["نام_مدرسه"]: row["id"] for row in fetch_rows("schools", "id, نام_مدرسه")}
+            school_names = list(school_ids)
             new_school = st.selectbox("مدرسه جدید:", school_names)
 
             col1, col2 = st.columns(2)
             with col1:
                 if st.button("ویرایش اطلاعات کاربر"):
-                    supabase.table("users").update({
+                    auth.update_account("users", {
                         "نام_کامل": new_fullname,
                         "رمز_عبور": new_password,
                         "نقش": new_role,
-                        "مدرسه": new_school
-                    }).eq("نام_کاربر", selected_user).execute()
+                        "مدرسه": new_school,
+                        "school_id": school_ids.get(new_school),
+                    }, {"نام_کاربر": selected_user})
+                    if selected_user == profile["نام_کاربر"]:
+                        refresh_profile()
                     st.success("✅ اطلاعات کاربر ویرایش شد.")
                     st.rerun()
             with col2:
                 if st.button("🗑️ حذف کاربر"):
-                    supabase.table("users").delete().eq("نام_کاربر", selected_user).execute()
+                    auth.delete_account("users", {"نام_کاربر": selected_user})
                     st.success("✅ کاربر حذف شد.")
                     st.rerun()
 
@@ -286,15 +409,19 @@ def show_superadmin_panel(username):
 
         if st.button("افزودن کاربر"):
             if username and password and fullname:
-                supabase.table("users").insert({
-                    "نام_کاربر": username,
-                    "رمز_عبور": password,
-                    "نام_کامل": fullname,
-                    "نقش": role,
-                    "مدرسه": school
-                }).execute()
-                st.success("✅ کاربر با موفقیت افزوده شد.")
-                st.rerun()
+                try:
+                    auth.add_account("users", {
+                        "نام_کاربر": username,
+                        "رمز_عبور": password,
+                        "نام_کامل": fullname,
+                        "نقش": role,
+                        "مدرسه": school,
+                        "school_id": school_ids.get(school),
+                    })
+                    st.success("✅ کاربر با موفقیت افزوده شد.")
+                    st.rerun()
+                except ValueError as e:
+                    st.error(f"❌ {e}")
             else:
                 st.warning("لطفاً تمام فیلدها را پر کنید.")
 
@@ -302,13 +429,10 @@ def show_superadmin_panel(username):
     with tabs[2]:
         st.subheader("گزارش کلی کاربران و مدارس")
 
-        school_count = supabase.table("schools").select("*", count="exact").execute().count or 0
-        user_count = supabase.table("users").select("*", count="exact").execute().count or 0
+        show_school_overview(None)
 
-        st.markdown(f"""
-        - 🏫 تعداد مدارس: **{school_count}**
-        - 👩‍🏫 تعداد کاربران: **{user_count}**
-        """)
+        with st.expander("🔌 وضعیت اتصال پایگاه داده"):
+            st.json(backend_stats())
 
         
 
@@ -318,34 +442,32 @@ def show_superadmin_panel(username):
 
 import streamlit as st
 import pandas as pd
-# ... (سایر ایمپورت‌ها: plt, supabase, fix_rtl, categorize, show_individual_reports, show_overall_statistics)
-
-def show_school_admin_panel(username):
-    global font_prop
+# ... (سایر ایمپورت‌ها: data_access, show_individual_reports, show_overall_statistics)
 
+def show_school_admin_panel(profile):
     st.title("🏫 پنل مدیر مدرسه")
-    st.markdown(f"👤 مدیر مدرسه: {username}")
+    st.markdown(f"👤 مدیر مدرسه: {profile['نام_کاربر']}")
 
-    # دریافت نام مدرسه
-    try:
-        user_row = supabase.table("users").select("مدرسه, نام_کامل").eq("نام_کاربر", username).execute()
-        if not user_row.data:
-            st.error("مدرسه‌ای برای این مدیر ثبت نشده است.")
-            return
-        school = user_row.data[0]["مدرسه"]
-    except Exception as e:
-        st.error(f"❌ خطا در دریافت اطلاعات مدرسه: {e}")
+    # مدرسه از نمایه نشست
+    school, school_id = profile["مدرسه"], profile.get("school_id")
+    if not school_id:
+        st.error("مدرسه‌ای برای این مدیر ثبت نشده است.")
         return
 
-    tabs = st.tabs(["مدیریت آموزگاران", "📊 گزارش عملکرد آموزگاران", "📈 آمار کلی مدرسه"])
+    prefetch([
+        partial(fetch_view, "school_teachers", "users", {"school_id": school_id, "نقش": "آموزگار"}),
+        partial(school_overview, school_id),
+        partial(fetch_rows, "students", "پایه, کلاس", {"school_id": school_id}),
+    ])
+
+    tabs = st.tabs(["مدیریت آموزگاران", "📊 گزارش عملکرد آموزگاران", "🆚 مقایسه آموزگاران", "📈 آمار کلی مدرسه", "📦 کارنامه‌های گروهی"])
 
     # --- تب مدیریت آموزگاران (بدون تغییر) ---
     with tabs[0]:
         st.subheader("👩‍🏫 مدیریت آموزگاران مدرسه")
 
         try:
-            teachers = supabase.table("users").select("*").eq("مدرسه", school).eq("نقش", "آموزگار").execute()
-            df_teachers = pd.DataFrame(teachers.data) if teachers.data else pd.DataFrame()
+            df_teachers = fetch_view("school_teachers", "users", {"school_id": school_id, "نقش": "آموزگار"})
             if not df_teachers.empty:
                 st.dataframe(df_teachers[["نام_کاربر", "نام_کامل"]].rename(columns={"نام_کاربر": "نام کاربری", "نام_کامل": "نام کامل"}))
             else:
@@ -365,13 +487,14 @@ def show_school_admin_panel(username):
         if st.button("افزودن آموزگار"):
             if new_teacher_username and new_teacher_password and new_teacher_fullname:
                 try:
-                    supabase.table("users").insert({
+                    auth.add_account("users", {
                         "نام_کاربر": new_teacher_username,
                         "رمز_عبور": new_teacher_password, 
                         "نام_کامل": new_teacher_fullname,
                         "نقش": "آموزگار",
-                        "مدرسه": school
-                    }).execute()
+                        "مدرسه": school,
+                        "school_id": school_id,
+                    })
                     st.success("✅ آموزگار با موفقیت افزوده شد.")
                     st.rerun()
                 except Exception as e:
@@ -389,31 +512,28 @@ def show_school_admin_panel(username):
         if df_teachers.empty:
             st.info("هیچ آموزگاری در این مدرسه برای نمایش گزارش وجود ندارد.")
         else:
-            teacher_fullnames = sorted(df_teachers["نام_کامل"].tolist())
-            selected_teacher_fullname = st.selectbox("انتخاب آموزگار برای مشاهده گزارش:", teacher_fullnames, key="admin_report_teacher_select")
-
-            st.markdown(f"**🔍 سیستم در حال جستجوی نمرات ثبت شده با نام آموزگار:** `{selected_teacher_fullname}`")
+            teacher_names = dict(zip(df_teachers["id"], df_teachers["نام_کامل"]))
+            selected_teacher_id = st.selectbox(
+                "انتخاب آموزگار برای مشاهده گزارش:", sorted(teacher_names, key=teacher_names.get),
+                format_func=teacher_names.get, key="admin_report_teacher_select",
+            )
+            selected_teacher_fullname = teacher_names[selected_teacher_id]
 
-            # دریافت نمرات مربوط به آموزگار انتخاب شده
+            # دریافت هم‌زمان نمرات و جدول تجمیعی آموزگار انتخاب شده
             try:
-                # کوئری دقیق بر اساس نام کامل آموزگار
-                scores_response = supabase.table("scores").select("*").eq("آموزگار", selected_teacher_fullname).execute()
-                scores_df_teacher = pd.DataFrame(scores_response.data) if scores_response.data else pd.DataFrame()
+                # کوئری بر اساس شناسه آموزگار (ایندکس teacher_id، درس)
+                teacher_filter = {"teacher_id": int(selected_teacher_id)}
+                teacher_data = fetch_concurrently({
+                    "scores": partial(fetch_view, "individual_reports", "scores", teacher_filter),
+                    "rollups": partial(fetch_view, "class_statistics", "score_rollups", teacher_filter),
+                })
+                scores_df_teacher, rollups_df_teacher = teacher_data["scores"], teacher_data["rollups"]
             except Exception as e:
                 st.error(f"❌ خطا در اجرای کوئری نمرات: {e}")
                 scores_df_teacher = pd.DataFrame() 
 
             if scores_df_teacher.empty:
-                st.error("⚠️ **هیچ نمره‌ای با این نام آموزگار پیدا نشد!**")
-                # نمایش پیام عیب‌یابی واضح
-                st.warning(
-                    f"""
-                    **تعداد نمرات پیدا شده: 0**
-                    
-                    اگر نمره ثبت شده، تنها دلیل عدم نمایش **ناهماهنگی نام آموزگار** در دو جدول است.
-                    لطفاً نام آموزگار را در جدول `users` با نام ثبت شده در ستون `آموزگار` در جدول `scores` **دقیقاً یکسان کنید.**
-                    """
-                )
+                st.info("هنوز نمره‌ای برای این آموزگار ثبت نشده است.")
             else:
                 st.success(f"✅ **{len(scores_df_teacher)}** نمره از آموزگار **{selected_teacher_fullname}** پیدا شد. آمار در زیر نمایش داده می‌شود.")
                 st.divider()
@@ -428,25 +548,68 @@ def show_school_admin_panel(username):
 
                 if report_option == "📊 گزارش‌های فردی دانش‌آموزان":
                     # توجه: توابع show_individual_reports باید در دسترس باشد.
-                    show_individual_reports(scores_df_teacher)
+                    show_individual_reports(scores_df_teacher, rollups_df_teacher)
                 else:
                     # توجه: توابع show_overall_statistics باید در دسترس باشد.
-                    show_overall_statistics(scores_df_teacher)
+                    show_overall_statistics(rollups_df_teacher, int(selected_teacher_id), selected_teacher_fullname)
 
 
-    # --- تب آمار کلی مدرسه (بدون تغییر) ---
+    # --- تب مقایسه همه آموزگاران (یک خواندن برای کل مدرسه) ---
     with tabs[2]:
-        st.subheader("📈 آمار کلی مدرسه")
-        try:
-            total_students = supabase.table("students").select("id", count="exact").eq("مدرسه", school).execute().count or 0
-            total_teachers = supabase.table("users").select("id", count="exact").eq("مدرسه", school).eq("نقش", "آموزگار").execute().count or 0
+        if df_teachers.empty:
+            st.info("هیچ آموزگاری در این مدرسه ثبت نشده است.")
+        else:
+            show_teacher_comparison(dict(zip(df_teachers["id"], df_teachers["نام_کامل"])))
 
-            st.markdown(f"""
-            - 👩‍🏫 تعداد آموزگاران: **{total_teachers}**
-            - 👨‍🎓 تعداد دانش‌آموزان: **{total_students}**
-            """)
-        except Exception as e:
-            st.error(f"❌ خطا در دریافت آمار کلی مدرسه: {e}")
+    # --- تب آمار کلی مدرسه (بدون تغییر) ---
+    with tabs[3]:
+        st.subheader("📈 آمار کلی مدرسه")
+        show_school_overview(school_id)
+        show_export_downloads("school", school, school_id=school_id)
+
+    # --- تب خروجی گروهی کارنامه‌ها ---
+    with tabs[4]:
+        st.subheader("📦 خروجی گروهی کارنامه‌ها")
+        class_rows = fetch_rows("students", "پایه, کلاس", {"school_id": school_id})
+        # نام کلاس در پایه‌های مختلف تکرار می‌شود؛ هر کلاس با (پایه، کلاس) مشخص است
+        classes = sorted({(row["پایه"], row["کلاس"]) for row in class_rows if row.get("پایه") and row.get("کلاس")})
+        export_class = st.selectbox(
+            "کلاس:", [None] + classes, key="bulk_export_class",
+            format_func=lambda c: "همه کلاس‌ها" if c is None else f"پایه {c[0]} - کلاس {c[1]}",
+        )
+        export_format = st.radio(
+            "قالب خروجی:", ["ZIP (یک فایل برای هر دانش‌آموز)", "PDF ادغام‌شده"],
+            horizontal=True, key="bulk_export_format",
+        )
+        if export_format == "PDF ادغام‌شده" and export_class is None:
+            st.info("برای PDF ادغام‌شده یک کلاس را انتخاب کنید.")
+        elif st.button("📦 ساخت کارنامه‌ها", key="btn_bulk_export"):
+            progress_bar = st.progress(0.0, text="در حال ساخت کارنامه‌ها...")
+
+            def on_progress(done, total):
+                progress_bar.progress(done / total, text=f"{done} از {total} کارنامه")
+
+            grade_filter, class_filter = export_class or (None, None)
+            is_zip = export_format.startswith("ZIP")
+            export = bulk_export.export_zip if is_zip else bulk_export.export_merged_pdf
+            tmp = tempfile.NamedTemporaryFile(suffix=".zip" if is_zip else ".pdf", delete=False)
+            try:
+                with tmp:
+                    count = export(school_id, tmp, class_filter, grade_filter, progress=on_progress)
+                if count:
+                    with open(tmp.name, "rb") as f:
+                        st.download_button(
+                            label=f"📥 دانلود {count} کارنامه",
+                            data=f,
+                            file_name=f"کارنامه‌ها_{school}{'.zip' if is_zip else '.pdf'}",
+                            mime="application/zip" if is_zip else "application/pdf",
+                        )
+                else:
+                    st.info("هیچ نمره‌ای برای ساخت کارنامه پیدا نشد.")
+            except Exception as e:
+                st.error(f"❌ خطا در ساخت کارنامه‌ها: {e}")
+            finally:
+                os.remove(tmp.name)
 
 # -------------------------------
 # پنل معاون مدرسه
@@ -454,29 +617,21 @@ def show_school_admin_panel(username):
 
 import streamlit as st
 import pandas as pd
-# ... (سایر ایمپورت‌ها مانند: plt, supabase, fix_rtl, categorize, show_individual_reports, show_overall_statistics باید در دسترس باشند)
-
-def show_assistant_panel(username):
-    global font_prop
+# ... (سایر ایمپورت‌ها مانند: data_access, show_individual_reports, show_overall_statistics باید در دسترس باشند)
 
+def show_assistant_panel(profile):
     st.title("🧾 پنل معاون مدرسه")
-    st.markdown(f"👤 معاون: {username}")
+    st.markdown(f"👤 معاون: {profile['نام_کاربر']}")
 
-    # 1. دریافت نام مدرسه
-    try:
-        user_row = supabase.table("users").select("مدرسه").eq("نام_کاربر", username).execute()
-        if not user_row.data:
-            st.error("مدرسه‌ای برای این معاون ثبت نشده است.")
-            return
-        school = user_row.data[0]["مدرسه"]
-    except Exception as e:
-        st.error(f"❌ خطا در دریافت اطلاعات مدرسه: {e}")
+    # 1. مدرسه از نمایه نشست
+    school, school_id = profile["مدرسه"], profile.get("school_id")
+    if not school_id:
+        st.error("مدرسه‌ای برای این معاون ثبت نشده است.")
         return
 
     # 2. دریافت لیست آموزگاران
     try:
-        teachers = supabase.table("users").select("نام_کامل").eq("مدرسه", school).eq("نقش", "آموزگار").execute()
-        df_teachers = pd.DataFrame(teachers.data) if teachers.data else pd.DataFrame()
+        df_teachers = fetch_view("school_teachers", "users", {"school_id": school_id, "نقش": "آموزگار"})
     except Exception as e:
          st.error(f"❌ خطا در دریافت لیست آموزگاران: {e}")
          df_teachers = pd.DataFrame() 
@@ -493,28 +648,28 @@ def show_assistant_panel(username):
         if df_teachers.empty:
             st.info("هیچ آموزگاری در این مدرسه برای نمایش گزارش وجود ندارد.")
         else:
-            teacher_fullnames = sorted(df_teachers["نام_کامل"].tolist())
-            selected_teacher_fullname = st.selectbox("انتخاب آموزگار برای مشاهده گزارش:", teacher_fullnames, key="assistant_report_teacher_select")
-
-            st.markdown(f"**🔍 سیستم در حال جستجوی نمرات ثبت شده با نام آموزگار:** `{selected_teacher_fullname}`")
+            teacher_names = dict(zip(df_teachers["id"], df_teachers["نام_کامل"]))
+            selected_teacher_id = st.selectbox(
+                "انتخاب آموزگار برای مشاهده گزارش:", sorted(teacher_names, key=teacher_names.get),
+                format_func=teacher_names.get, key="assistant_report_teacher_select",
+            )
+            selected_teacher_fullname = teacher_names[selected_teacher_id]
 
-            # دریافت نمرات مربوط به آموزگار انتخاب شده
+            # دریافت هم‌زمان نمرات و جدول تجمیعی آموزگار انتخاب شده
             try:
-                # کوئری دقیق بر اساس نام کامل آموزگار (این کلید حل مشکل است)
-                scores_response = supabase.table("scores").select("*").eq("آموزگار", selected_teacher_fullname).execute()
-                scores_df_teacher = pd.DataFrame(scores_response.data) if scores_response.data else pd.DataFrame()
+                # کوئری بر اساس شناسه آموزگار (ایندکس teacher_id، درس)
+                teacher_filter = {"teacher_id": int(selected_teacher_id)}
+                teacher_data = fetch_concurrently({
+                    "scores": partial(fetch_view, "individual_reports", "scores", teacher_filter),
+                    "rollups": partial(fetch_view, "class_statistics", "score_rollups", teacher_filter),
+                })
+                scores_df_teacher, rollups_df_teacher = teacher_data["scores"], teacher_data["rollups"]
             except Exception as e:
                 st.error(f"❌ خطا در اجرای کوئری نمرات: {e}")
                 scores_df_teacher = pd.DataFrame() 
 
             if scores_df_teacher.empty:
-                st.error("⚠️ **هیچ نمره‌ای با این نام آموزگار پیدا نشد!**")
-                st.warning(
-                    """
-                    **تعداد نمرات پیدا شده: 0**
-                    دلیل عدم نمایش آمار، ناهماهنگی نام آموزگار در جدول کاربران و جدول نمرات است.
-                    """
-                )
+                st.info("هنوز نمره‌ای برای این آموزگار ثبت نشده است.")
             else:
                 st.success(f"✅ **{len(scores_df_teacher)}** نمره از آموزگار **{selected_teacher_fullname}** پیدا شد.")
                 st.divider()
@@ -528,9 +683,9 @@ def show_assistant_panel(username):
                 )
 
                 if report_option == "📊 گزارش‌های فردی دانش‌آموزان":
-                    show_individual_reports(scores_df_teacher)
+                    show_individual_reports(scores_df_teacher, rollups_df_teacher)
                 else:
-                    show_overall_statistics(scores_df_teacher)
+                    show_overall_statistics(rollups_df_teacher, int(selected_teacher_id), selected_teacher_fullname)
 
 
     # -------------------------------------------------------------------------
@@ -538,107 +693,44 @@ def show_assistant_panel(username):
     # -------------------------------------------------------------------------
     with tabs[1]:
         st.subheader("📈 آمار کلی مدرسه")
-        try:
-            total_students = supabase.table("students").select("id", count="exact").eq("مدرسه", school).execute().count or 0
-            # تعداد آموزگاران
-            total_teachers = len(df_teachers)
-
-            st.markdown(f"""
-            - 👩‍🏫 تعداد آموزگاران: **{total_teachers}**
-            - 👨‍🎓 تعداد دانش‌آموزان: **{total_students}**
-            """)
-        except Exception as e:
-            st.error(f"❌ خطا در دریافت آمار کلی مدرسه: {e}")
+        show_school_overview(school_id)
+        show_export_downloads("school", school, school_id=school_id)
 # -------------------------------
 # پنل آموزگار
 # -------------------------------
 import streamlit as st
 import pandas as pd
-import matplotlib.pyplot as plt
 import datetime
-from matplotlib import font_manager
-# فرض بر این است که فایل اتصال به دیتابیس (supabase_utils) و متغیر supabase در دسترس هستند
-from supabase_utils import supabase 
+# دسترسی به داده فقط از طریق لایه data_access انجام می‌شود
+from data_access import fetch_rows, fetch_df, fetch_view, fetch_concurrently, insert_rows, update_rows, add_score, add_scores, update_score, delete_score
+from rollups import display_names, student_averages
+import charts
+import importer
+import score_export
 import os
-from io import BytesIO # برای توابع PDF (اگر دارید)
-import base64 # برای توابع PDF (اگر دارید)
-
-# -------------------- ایمپورت‌های جدید برای اصلاح راست‌چین (BiDi) --------------------
-import arabic_reshaper
-from bidi.algorithm import get_display
-
-# -------------------------------------------------------------------------------------
-# 🛠️ تنظیمات فونت سراسری و RTL
-# -------------------------------------------------------------------------------------
-
-# مسیر فونت فارسی
-font_path = "fonts/Vazir.ttf" 
-absolute_font_path = os.path.abspath(font_path)
-
-# 🎨 تنظیم فونت فارسی (مخصوص نمودارها)
-try:
-    font_prop = font_manager.FontProperties(fname=font_path)
-    plt.rcParams["font.family"] = font_prop.get_name()
-    plt.rcParams["axes.unicode_minus"] = False
-except FileNotFoundError:
-    st.error("فایل فونت Vazir.ttf پیدا نشد. لطفاً آن را در پوشه 'fonts' قرار دهید.")
-    font_prop = None
-
-# 📐 تنظیم راست‌چین سراسری برای کل صفحه (حل مشکل بهم ریختگی متن Streamlit)
-st.markdown("""
-    <style>
-    /* تنظیم فونت و جهت برای تمام عناصر Streamlit */
-    body, div, p, h1, h2, h3, h4, h5, h6, label, span, input, select, textarea, button, th, td {
-        direction: rtl !important;
-        text-align: right !important;
-        font-family: 'Vazir', sans-serif !important; 
-    }
-    /* راست‌چین کردن متن و هدرهای ستون‌های جدول Streamlit */
-    .stDataFrame, .stDataFrame .header {
-        direction: rtl !important;
-        text-align: right !important;
-    }
-    /* اجزای فرم (ورودی‌ها، کشوها) */
-    .stSelectbox, .stTextInput, .stButton, .stTextarea {
-        direction: rtl;
-        text-align: right;
-    }
-    </style>
-""", unsafe_allow_html=True)
 
-# -------------------------------
-# توابع کمکی (برای RTL و دسته‌بندی)
-# -------------------------------
 
-def fix_rtl(text):
-    """(فقط برای Matplotlib) اعمال BiDi برای تصحیح راست‌چین شدن متون فارسی/عربی."""
-    if not isinstance(text, str) or not text.strip():
-        return text
-    reshaped_text = arabic_reshaper.reshape(text)
-    return get_display(reshaped_text)
+def show_chart(kind, *args, **kwargs):
+    """نمایش نمودار ``kind`` با موتور رسم این استقرار (``charts.CHART_RENDERER``).
 
-def categorize(score):
-    """دسته‌بندی سطح عملکرد بر اساس نمره (فرض بر اساس نمره 1 تا 4)."""
-    try:
-        score = float(score)
-    except:
-        return "نامشخص" # متن عادی، نه fix_rtl
-
-    if score >= 3.5:
-        return "خیلی خوب"
-    elif score >= 2.5:
-        return "خوب"
-    elif score >= 1.5:
-        return "قابل قبول"
+    matplotlib: تصویر PNG (با حافظه نهان) در سرور ساخته می‌شود؛ plotly: فقط
+    سری‌های داده به مرورگر فرستاده و همان‌جا رسم می‌شود.
+    """
+    if charts.CHART_RENDERER == "plotly":
+        import interactive_charts
+
+        st.plotly_chart(getattr(interactive_charts, kind)(*args, **kwargs), width="stretch")
     else:
-        return "نیاز به تلاش بیشتر"
+        st.image(getattr(charts, kind)(*args, **kwargs), width="stretch")
 
 # -------------------------------
 # 1. ماژول مدیریت و ثبت نمره
 # -------------------------------
 
-def show_management_panel(full_name, school_name, students_df):
+def show_management_panel(profile, students_df):
     """شامل لیست دانش‌آموزان، افزودن دانش‌آموز، تغییر رمز، ثبت نمره و مدیریت نمرات."""
+    full_name = profile["نام_کامل"]
+    school_name = profile["مدرسه"] or "نامشخص"
     
     # 📚 لیست دانش‌آموزان
     st.subheader("📚 لیست دانش‌آموزان شما")
@@ -670,7 +762,7 @@ def show_management_panel(full_name, school_name, students_df):
     if st.button("ثبت دانش‌آموز"):
         if student_name and student_username and student_password and class_name:
             try:
-                supabase.table("students").insert({
+                auth.add_account("students", {
                     "student": student_name,
                     "نام_کاربر": student_username,
                     "رمز_عبور": student_password, 
@@ -678,8 +770,10 @@ def show_management_panel(full_name, school_name, students_df):
                     "کلاس": class_name,
                     "مدرسه": school_name_input,
                     "آموزگار": full_name,
-                    "تاریخ_ثبت": datetime.date.today().isoformat()
-                }).execute()
+                    "تاریخ_ثبت": datetime.date.today().isoformat(),
+                    "teacher_id": profile["id"],
+                    "school_id": profile.get("school_id"),
+                })
                 st.success("✅ دانش‌آموز با موفقیت ثبت شد.")
                 st.rerun()
             except Exception as e:
@@ -695,7 +789,7 @@ def show_management_panel(full_name, school_name, students_df):
         new_password = st.text_input("رمز جدید:", type="password", key="new_student_pass")
         if st.button("ثبت رمز جدید", key="btn_change_pass"):
             if new_password:
-                supabase.table("students").update({"رمز_عبور": new_password}).eq("نام_کاربر", selected_user).execute() 
+                auth.update_account("students", {"رمز_عبور": new_password}, {"نام_کاربر": selected_user})
                 st.success("✅ رمز جدید با موفقیت ثبت شد.")
                 st.rerun()
             else:
@@ -706,31 +800,98 @@ def show_management_panel(full_name, school_name, students_df):
     # ✏️ ثبت نمره برای دانش‌آموز
     st.subheader("✏️ ثبت نمره برای دانش‌آموز")
     if not students_df.empty:
-        selected_student_score = st.selectbox("انتخاب دانش‌آموز:", students_df["student"].tolist(), key="submit_score_student")
+        student_names = dict(zip(students_df["id"], students_df["student"]))
+        selected_student_score = st.selectbox("انتخاب دانش‌آموز:", list(student_names), format_func=student_names.get,
+                                              key="submit_score_student")
         lesson = st.text_input("نام درس:")
         score = st.selectbox("نمره (۱ تا ۴):", [1, 2, 3, 4]) 
         if st.button("ثبت نمره", key="btn_add_score"):
             if lesson:
-                supabase.table("scores").insert({
-                    "student": selected_student_score,
+                add_score({
+                    "student": student_names[selected_student_score],
                     "درس": lesson,
                     "نمره": score,
                     "آموزگار": full_name,
-                    "تاریخ": datetime.date.today().isoformat()
-                }).execute()
+                    "تاریخ": datetime.date.today().isoformat(),
+                    "teacher_id": profile["id"],
+                    "student_id": int(selected_student_score),
+                })
                 st.success("✅ نمره ثبت شد.")
                 st.rerun()
             else:
                 st.warning("لطفاً نام درس را وارد کنید.")
     else:
         st.info("برای ثبت نمره ابتدا باید دانش‌آموزی ثبت کنید.")
-        
+
+    # 📋 ثبت گروهی نمره برای کل کلاس (یک درس، یک تاریخ، یک درج)
+    st.subheader("📋 ثبت گروهی نمره برای کل کلاس")
+    if not students_df.empty:
+        with st.form("bulk_scores_form"):
+            col1, col2 = st.columns(2)
+            with col1:
+                bulk_lesson = st.text_input("نام درس:", key="bulk_lesson")
+            with col2:
+                bulk_date = st.date_input("تاریخ:", value=datetime.date.today(), key="bulk_date")
+            grid = pd.DataFrame({"id": students_df["id"].tolist(), "دانش‌آموز": students_df["student"].tolist(),
+                                 "نمره": [None] * len(students_df)})
+            edited_grid = st.data_editor(
+                grid,
+                column_config={
+                    "id": None,
+                    "دانش‌آموز": st.column_config.TextColumn("دانش‌آموز", disabled=True),
+                    "نمره": st.column_config.SelectboxColumn("نمره (۱ تا ۴)", options=[1, 2, 3, 4]),
+                },
+                hide_index=True,
+                key="bulk_scores_grid",
+            )
+            submitted = st.form_submit_button("ثبت نمرات کلاس")
+        if submitted:
+            filled = edited_grid[edited_grid["نمره"].notna()]
+            if not bulk_lesson:
+                st.warning("لطفاً نام درس را وارد کنید.")
+            elif filled.empty:
+                st.warning("هیچ نمره‌ای وارد نشده است.")
+            else:
+                add_scores([
+                    {
+                        "student": row["دانش‌آموز"],
+                        "درس": bulk_lesson,
+                        "نمره": int(row["نمره"]),
+                        "آموزگار": full_name,
+                        "تاریخ": bulk_date.isoformat(),
+                        "teacher_id": profile["id"],
+                        "student_id": int(row["id"]),
+                    }
+                    for _, row in filled.iterrows()
+                ])
+                st.success(f"✅ {len(filled)} نمره ثبت شد.")
+                st.rerun()
+
+    # 📥 ورود دانش‌آموزان یا نمرات از فایل (ردیف‌های نامعتبر جداگانه گزارش می‌شوند)
+    st.subheader("📥 ورود از فایل اکسل/CSV")
+    import_kind = st.radio("نوع داده:", ["دانش‌آموزان", "نمرات"], horizontal=True, key="import_kind")
+    if import_kind == "دانش‌آموزان":
+        st.caption("ستون‌ها: دانش‌آموز، نام کاربری، رمز، پایه، کلاس")
+    else:
+        st.caption("ستون‌ها: دانش‌آموز، درس، نمره (۱ تا ۴)، تاریخ (اختیاری)")
+    uploaded = st.file_uploader("انتخاب فایل:", type=["csv", "xlsx"], key="import_file")
+    if uploaded is not None and st.button("ورود اطلاعات", key="btn_import"):
+        with st.spinner("در حال ورود اطلاعات..."):
+            if import_kind == "دانش‌آموزان":
+                report = importer.import_students(uploaded, uploaded.name, profile)
+            else:
+                report = importer.import_scores(uploaded, uploaded.name, profile)
+        if report["inserted"]:
+            st.success(f"✅ {report['inserted']} ردیف ثبت شد.")
+        if report["errors"]:
+            st.warning(f"⚠️ {len(report['errors'])} ردیف ثبت نشد:")
+            st.dataframe(pd.DataFrame(report["errors"], columns=["ردیف", "خطا"]), hide_index=True)
+
     # ----------------------------------------------------
     # مدیریت نمرات ثبت شده (جدول نمرات حذف شد)
     # ----------------------------------------------------
     st.subheader("🛠️ مدیریت نمرات ثبت‌شده")
-    scores_response = supabase.table("scores").select("*").eq("آموزگار", full_name).execute()
-    scores_df = pd.DataFrame(scores_response.data) if scores_response.data else pd.DataFrame()
+    scores_df = fetch_view("score_management", "scores", {"teacher_id": profile["id"]})
 
     if not scores_df.empty:
         selected_row = st.selectbox(
@@ -747,12 +908,12 @@ def show_management_panel(full_name, school_name, students_df):
         col1, col2 = st.columns(2)
         with col1:
             if st.button("ویرایش نمره", key="btn_edit_score"):
-                supabase.table("scores").update({"نمره": new_score}).eq("id", selected_id).execute()
+                update_score(selected_id, new_score)
                 st.success("✅ نمره ویرایش شد.")
                 st.rerun()
         with col2:
             if st.button("🗑️ حذف نمره", key="btn_delete_score"):
-                supabase.table("scores").delete().eq("id", selected_id).execute()
+                delete_score(selected_id)
                 st.success("✅ نمره حذف شد.")
                 st.rerun()
     else:
@@ -763,17 +924,22 @@ def show_management_panel(full_name, school_name, students_df):
 # 2. ماژول گزارش‌های فردی
 # -------------------------------
 
-def show_individual_reports(df):
-    """بخش گزارش فردی: انتخاب دانش‌آموز، درس، نمایش نمودار خطی، دایره‌ای و جدول نمرات."""
-    
-    global font_prop
+def show_individual_reports(df, rollups_df, names=None):
+    """بخش گزارش فردی: انتخاب دانش‌آموز، درس، نمایش نمودار خطی، دایره‌ای و جدول نمرات.
 
+    دانش‌آموز با شناسه انتخاب می‌شود؛ ``names`` (شناسه ← نام فعلی) فقط برای نمایش است.
+    """
+    
     st.info("دانش‌آموز و درس مورد نظر را انتخاب کنید تا گزارش عملکرد او را مشاهده نمایید.")
 
-    all_students = sorted(df['student'].unique().tolist())
-    selected_student = st.selectbox("دانش‌آموز مورد نظر را انتخاب کنید:", all_students, key="rep_student")
+    student_names = display_names(df, "student_id", "student", names)
+    selected_student_id = st.selectbox(
+        "دانش‌آموز مورد نظر را انتخاب کنید:", sorted(student_names.index, key=student_names.get),
+        format_func=student_names.get, key="rep_student",
+    )
+    selected_student = student_names[selected_student_id]
     
-    student_df = df[df['student'] == selected_student].copy()
+    student_df = df[df['student_id'] == selected_student_id].copy()
     available_lessons = sorted(student_df['درس'].unique().tolist())
     
     if not available_lessons:
@@ -782,8 +948,11 @@ def show_individual_reports(df):
         
     selected_lesson = st.selectbox("درس مورد نظر را انتخاب کنید:", available_lessons, key="rep_lesson")
     
-    lesson_df = student_df[student_df["درس"] == selected_lesson].sort_values("تاریخ", ascending=True).reset_index(drop=True)
-    lesson_df["شماره نمره"] = lesson_df.index + 1
+    scale = current_scale()
+    # میانگین از جدول تجمیعی خوانده می‌شود
+    lesson_df, performance_counts, avg_score = panel_data.individual_report(
+        student_df, rollups_df, selected_student_id, selected_lesson, scale
+    )
 
     st.divider()
     
@@ -799,68 +968,38 @@ def show_individual_reports(df):
 
     # --- 2. Line Chart (روند پیشرفت) ---
     st.subheader(f"📈 نمودار خطی روند پیشرفت {selected_student} در درس {selected_lesson}")
-    fig_line, ax_line = plt.subplots(figsize=(7, 4)) 
-    ax_line.plot(lesson_df["شماره نمره"], lesson_df["نمره"], marker="o", linewidth=2, color="#007ACC")
-    
-    # ✅ FIX: اعمال font_prop و fix_rtl (فقط برای Matplotlib)
-    ax_line.set_title(fix_rtl(f"روند نمرات {selected_lesson}"), fontproperties=font_prop, fontsize=14)
-    ax_line.set_xlabel(fix_rtl("شماره نمره"), fontproperties=font_prop)
-    ax_line.set_ylabel(fix_rtl("نمره"), fontproperties=font_prop)
-    ax_line.tick_params(axis='x', rotation=0)
-    ax_line.set_ylim(0.5, 4.5) 
-    st.pyplot(fig_line)
+    show_chart(
+        "line_chart", lesson_df["شماره نمره"], lesson_df["نمره"],
+        f"روند نمرات {selected_lesson}", "شماره نمره", "نمره",
+        size=(7, 4), ylim=(0.5, 4.5), title_size=14,
+    )
 
     # --- 3. Pie Chart (سطح عملکرد) ---
     st.subheader(f"🎯 نمودار دایره‌ای توزیع نمرات ثبت شده در درس {selected_lesson}") 
     
-    def categorize_single_score(score):
-        return {1: "نیاز به تلاش بیشتر", 2: "قابل قبول", 3: "خوب", 4: "خیلی خوب"}.get(score, "نامشخص")
-        
-    lesson_df["سطح عملکرد"] = lesson_df["نمره"].apply(categorize_single_score)
-    performance_counts = lesson_df["سطح عملکرد"].value_counts()
-    
-    # ✅ FIX: اعمال font_prop و fix_rtl (فقط برای Matplotlib)
-    labels_bidi = [fix_rtl(label) for label in performance_counts.index]
-    
-    fig_pie, ax_pie = plt.subplots(figsize=(5.5, 5.5)) 
-    ax_pie.axis('equal') 
-    
-    ax_pie.pie(
-        performance_counts,
-        labels=labels_bidi, 
-        autopct=lambda pct: f"{pct:.1f}%",
-        startangle=140,
-        colors=["#FF9999", "#FFD580", "#90EE90", "#66B2FF"],
-        wedgeprops={'linewidth': 1, 'edgecolor': 'white'}, 
-        pctdistance=0.7, 
-        labeldistance=1.1,
-        textprops={'fontproperties': font_prop} 
-    )
-    
-    ax_pie.set_title(fix_rtl(f"توزیع نمرات ثبت شده"), fontproperties=font_prop, fontsize=12)
-    st.pyplot(fig_pie)
-    avg_score = lesson_df["نمره"].mean()
-    st.success(f"میانگین نمره این دانش‌آموز در این درس: {round(avg_score, 2)} ({categorize(avg_score)})")
+    show_chart("pie_chart", performance_counts, "توزیع نمرات ثبت شده", size=(5.5, 5.5), title_size=12)
+    st.success(f"میانگین نمره این دانش‌آموز در این درس: {round(avg_score, 2)} ({scale.categorize_one(avg_score)})")
 
 
 # -------------------------------
 # 3. ماژول آمار کلی (رتبه‌بندی کلی اضافه شد)
 # -------------------------------
 
-def show_overall_statistics(df):
-    """بخش آمار کلی کلاس: شامل رتبه‌بندی کلی و آمار درسی."""
-    
-    global font_prop
+def show_overall_statistics(rollups_df, teacher_id, teacher_name, names=None):
+    """بخش آمار کلی کلاس: شامل رتبه‌بندی کلی و آمار درسی (بر پایه جدول تجمیعی نمرات).
 
+    رتبه‌بندی با شناسه دانش‌آموز است؛ ``names`` (شناسه ← نام فعلی) فقط برای نمایش است.
+    """
+    
     # -------------------------------------------
     # 🏆 رتبه‌بندی کلی دانش‌آموزان (جدید)
     # -------------------------------------------
     st.subheader("🏆 رتبه‌بندی کلی دانش‌آموزان (تمام دروس)")
     
-    overall_avg_all = df.groupby("student")["نمره"].mean().reset_index()
-    overall_avg_all["سطح عملکرد"] = overall_avg_all["نمره"].apply(categorize)
+    scale = current_scale()
+    overall_avg_all = panel_data.ranking(rollups_df, scale, names=names)
     
-    st.dataframe(overall_avg_all.sort_values("نمره", ascending=False).rename(
+    st.dataframe(overall_avg_all.rename(
         columns={
             "student": "نام دانش‌آموز",
             "نمره": "میانگین کلی نمره",
@@ -875,39 +1014,18 @@ def show_overall_statistics(df):
     # -------------------------------------------
     st.info("درس مورد نظر را انتخاب کنید تا توزیع سطح عملکرد دانش‌آموزان کلاس در آن درس را مشاهده نمایید.")
 
-    available_lessons = sorted(df['درس'].unique().tolist())
+    available_lessons = sorted(rollups_df['درس'].unique().tolist())
     selected_lesson = st.selectbox("درس مورد نظر را انتخاب کنید:", available_lessons, key="overall_lesson")
 
-    lesson_df_all = df[df["درس"] == selected_lesson].copy()
-    avg_per_student = lesson_df_all.groupby("student")["نمره"].mean().reset_index()
-    avg_per_student["سطح عملکرد"] = avg_per_student["نمره"].apply(categorize)
-    performance_counts = avg_per_student["سطح عملکرد"].value_counts()
+    avg_per_student = panel_data.ranking(rollups_df, scale, selected_lesson, names)
+    performance_counts = scale.level_counts(avg_per_student["سطح عملکرد"])
 
     st.divider()
     
     # --- Overall Class Pie Chart ---
     st.subheader(f"📈 نمودار دایره‌ای توزیع عملکرد دانش‌آموزان در درس {selected_lesson}") 
     
-    # ✅ FIX: اعمال font_prop و fix_rtl (فقط برای Matplotlib)
-    labels_bidi = [fix_rtl(label) for label in performance_counts.index]
-    
-    fig_pie, ax_pie = plt.subplots(figsize=(6, 6)) 
-    ax_pie.axis('equal') 
-    
-    ax_pie.pie(
-        performance_counts,
-        labels=labels_bidi, 
-        autopct=lambda pct: f"{pct:.1f}%",
-        startangle=140,
-        colors=["#FF9999", "#FFD580", "#90EE90", "#66B2FF"],
-        wedgeprops={'linewidth': 1, 'edgecolor': 'white'}, 
-        pctdistance=0.7, 
-        labeldistance=1.1,
-        textprops={'fontproperties': font_prop}
-    )
-    
-    ax_pie.set_title(fix_rtl(f"توزیع سطح عملکرد کلاس"), fontproperties=font_prop, fontsize=14)
-    st.pyplot(fig_pie)
+    show_chart("pie_chart", performance_counts, "توزیع سطح عملکرد کلاس", size=(6, 6), title_size=14)
     
     class_avg = round(avg_per_student["نمره"].mean(), 2)
     st.success(f"میانگین کلی نمرات دانش‌آموزان شما در این درس: {class_avg}")
@@ -915,7 +1033,7 @@ def show_overall_statistics(df):
     # نمایش جدول میانگین نمرات (رتبه‌بندی درسی)
     st.markdown("---")
     st.subheader("🏆 رتبه‌بندی دانش‌آموزان در این درس")
-    st.dataframe(avg_per_student.sort_values("نمره", ascending=False).rename(
+    st.dataframe(avg_per_student.rename(
         columns={
             "student": "نام دانش‌آموز",
             "نمره": "میانگین نمره",
@@ -923,11 +1041,38 @@ def show_overall_statistics(df):
         }
     ))
 
+    show_export_downloads("overall", teacher_name, teacher_id=teacher_id)
+
+
+def show_export_downloads(key, label, teacher_id=None, school_id=None):
+    """دکمه دانلود نمرات، رتبه‌بندی و خلاصه دروس یک آموزگار یا کل مدرسه (CSV/XLSX).
+
+    ``label`` (نام آموزگار یا مدرسه) فقط در نام فایل می‌آید.
+    """
+    with st.expander("📥 خروجی اکسل / CSV"):
+        kind = st.selectbox(
+            "گزارش:", list(score_export.EXPORT_KINDS),
+            format_func=score_export.EXPORT_KINDS.get, key=f"{key}_export_kind",
+        )
+        fmt = st.radio("قالب فایل:", score_export.FORMATS, horizontal=True, key=f"{key}_export_format")
+        if st.button("آماده‌سازی فایل", key=f"{key}_btn_export"):
+            with tempfile.TemporaryFile() as f:
+                count = score_export.export(kind, fmt, f, teacher_id=teacher_id, school_id=school_id,
+                                            scale=current_scale())
+                f.seek(0)
+                st.download_button(
+                    label=f"📥 دانلود {count} ردیف",
+                    data=f.read(),
+                    file_name=f"{score_export.EXPORT_KINDS[kind]}_{label}.{fmt}",
+                    mime=score_export.MIME_TYPES[fmt],
+                    key=f"{key}_download",
+                )
+
 
 # -------------------------------
 # تابع اصلی (Router) - ماژولار شده
 # -------------------------------
-def show_teacher_panel(username):
+def show_teacher_panel(profile):
     # تنظیمات کلی صفحه 
     if 'layout' not in st.session_state:
         st.set_page_config(layout="wide")
@@ -935,30 +1080,21 @@ def show_teacher_panel(username):
 
     st.title("👩‍🏫 پنل آموزگار")
 
-    # 📌 دریافت اطلاعات آموزگار و هندل کردن خطای اتصال به پایگاه داده
+    # 📌 اطلاعات آموزگار از نمایه نشست
+    full_name = profile["نام_کامل"]
+    school_name = profile["مدرسه"] or "نامشخص"
+
     try:
-        teacher_info = supabase.table("users").select("نام_کامل, مدرسه").eq("نام_کاربر", username).limit(1).execute()
+        # 📚 دریافت هم‌زمان لیست دانش‌آموزان، نمرات و جدول تجمیعی
+        teacher_data = panel_data.teacher_data(profile["id"])
+        students_df, scores_df, rollups_df = teacher_data["students"], teacher_data["scores"], teacher_data["rollups"]
     except Exception as e:
-        st.error(f"❌ خطا در اتصال به پایگاه داده (users): {e}")
-        full_name = username
-        school_name = "نامشخص"
+        st.error(f"❌ خطا در اتصال به پایگاه داده (students/scores): {e}")
         students_df = pd.DataFrame()
         scores_df = pd.DataFrame()
-    else:
-        full_name = teacher_info.data[0]["نام_کامل"] if teacher_info.data else username
-        school_name = teacher_info.data[0]["مدرسه"] if teacher_info.data else "نامشخص"
-
-        try:
-            # 📚 دریافت لیست دانش‌آموزان و نمرات 
-            students_response = supabase.table("students").select("*").eq("آموزگار", full_name).execute()
-            students_df = pd.DataFrame(students_response.data) if students_response.data else pd.DataFrame()
-            
-            scores_response = supabase.table("scores").select("*").eq("آموزگار", full_name).execute()
-            scores_df = pd.DataFrame(scores_response.data) if scores_response.data else pd.DataFrame()
-        except Exception as e:
-            st.error(f"❌ خطا در اتصال به پایگاه داده (students/scores): {e}")
-            students_df = pd.DataFrame()
-            scores_df = pd.DataFrame()
+        rollups_df = pd.DataFrame()
+    # نام فعلی هر دانش‌آموز (نام‌های ذخیره‌شده کنار نمرات ممکن است قدیمی باشند)
+    student_names = dict(zip(students_df["id"], students_df["student"])) if not students_df.empty else None
 
     # 🧾 نمایش اطلاعات آموزگار
     st.markdown(
@@ -1036,19 +1172,19 @@ def show_teacher_panel(username):
     st.header(menu_options_display[selected_option_key])
 
     if selected_option_key == "management":
-        show_management_panel(full_name, school_name, students_df)
+        show_management_panel(profile, students_df)
 
     elif selected_option_key == "reports":
         if scores_df.empty:
             st.warning("برای مشاهده گزارش‌ها، ابتدا باید نمره‌ای ثبت کنید.")
         else:
-            show_individual_reports(scores_df)
+            show_individual_reports(scores_df, rollups_df, student_names)
 
     elif selected_option_key == "overall":
-        if scores_df.empty:
+        if rollups_df.empty:
             st.warning("برای مشاهده آمار کلی، ابتدا باید نمره‌ای ثبت کنید.")
         else:
-            show_overall_statistics(scores_df)
+            show_overall_statistics(rollups_df, profile["id"], full_name, student_names)
 
 
 
@@ -1056,77 +1192,19 @@ def show_teacher_panel(username):
 # -------------------------------
 import streamlit as st
 import pandas as pd
-import matplotlib.pyplot as plt
-from matplotlib import font_manager
-from io import BytesIO # ✅ تصحیح شده
 import os
-import base64
-from weasyprint import HTML
-# اگر از supabase استفاده می‌کنید، این خط را حفظ کنید
-# from supabase_utils import supabase 
-
-# -------------------- ایمپورت‌های جدید برای اصلاح راست‌چین (BiDi) --------------------
-import arabic_reshaper
-from bidi.algorithm import get_display
-
-# 🛠️ تابع اصلی برای تصحیح راست‌چین متون در نمودارها (برای Matplotlib)
-def fix_rtl(text):
-    """اعمال الگوریتم BiDi برای تصحیح راست‌چین شدن متون فارسی/عربی در محیط Matplotlib."""
-    if not isinstance(text, str) or not text.strip():
-        return text
-    
-    # ۱. اصلاح شکل حروف
-    reshaped_text = arabic_reshaper.reshape(text)
-    # ۲. اعمال جهت‌دهی راست‌چین
-    return get_display(reshaped_text)
-# -------------------------------------------------------------------------------------
-
-# مسیر فونت فارسی
-font_path = "fonts/Vazir.ttf"
-absolute_font_path = os.path.abspath(font_path)
-
-# تابع کمکی تبدیل نمودار به Base64
-def convert_image_to_base64(fig):
-    # ✅ FIX: اصلاح Bytes瓯 به BytesIO
-    buf = BytesIO()
-    fig.savefig(buf, format="png", bbox_inches="tight", dpi=300)
-    buf.seek(0)
-    return base64.b64encode(buf.read()).decode("utf-8")
-
-# تابع دسته‌بندی سطح عملکرد
-def categorize(score):
-    try:
-        score = float(score)
-    except:
-        return "نامشخص"
-
-    if score >= 3.5:
-        return "خیلی خوب"
-    elif score >= 2.5:
-        return "خوب"
-    elif score >= 1.5:
-        return "قابل قبول"
-    else:
-        return "نیاز به تلاش بیشتر"
-        
-# -------------------------------------------------------------------------------------
-
-def show_student_panel(username):
-    font_prop = font_manager.FontProperties(fname=font_path)
-    plt.rcParams["font.family"] = font_prop.get_name()
-    plt.rcParams["axes.unicode_minus"] = False
+import report_card
+# شکل‌دهی متن فارسی نمودارها در ماژول مشترک rtl (با حافظه نهان) انجام می‌شود
+# و فونت وزیر یک بار در farsi_style ثبت شده است
 
+def show_student_panel(profile):
     st.title("🎓 پنل دانش‌آموز") 
 
-    student_response = supabase.table("students").select("*").eq("نام_کاربر", username).execute()
-    if not student_response.data:
-        st.error("❌ اطلاعات دانش‌آموز پیدا نشد.") 
-        return
-    student_info = student_response.data[0]
-    full_name = student_info["student"]
-    school_name = student_info.get("مدرسه", "نامشخص")
-    class_name = student_info.get("کلاس", "نامشخص")
-    grade = student_info.get("پایه", "نامشخص")
+    # اطلاعات دانش‌آموز از نمایه نشست
+    full_name = profile["نام_کامل"]
+    school_name = profile.get("مدرسه") or "نامشخص"
+    class_name = profile.get("کلاس") or "نامشخص"
+    grade = profile.get("پایه") or "نامشخص"
 
     st.markdown(
         f"""
@@ -1141,11 +1219,10 @@ def show_student_panel(username):
     )
     st.divider()
 
-    scores_response = supabase.table("scores").select("درس, نمره").eq("student", full_name).execute()
-    if not scores_response.data:
+    scores_df = fetch_view("student_panel", "scores", {"student_id": profile["id"]})
+    if scores_df.empty:
         st.info("هنوز نمره‌ای برای شما ثبت نشده است.") 
         return
-    scores_df = pd.DataFrame(scores_response.data)
 
     lessons = scores_df["درس"].unique().tolist()
     
@@ -1155,79 +1232,31 @@ def show_student_panel(username):
     selected_lesson_display = selected_lesson
 
     if selected_lesson != "📊 آمار کلی":
-        lesson_df = scores_df[scores_df["درس"] == selected_lesson].reset_index(drop=True)
-        lesson_df["شماره نمره"] = lesson_df.index + 1
+        scale = scale_for(profile.get("مدرسه"))
+        lesson_df, performance_counts = panel_data.lesson_history(scores_df[scores_df["درس"] == selected_lesson], scale)
 
         # --- نمودار خطی (Line Chart) ---
         st.subheader(f"📈 روند پیشرفت در درس {selected_lesson_display}") 
-        # FIX: اندازه نمودار
-        fig_line, ax_line = plt.subplots(figsize=(6, 3.5)) 
-        ax_line.plot(
-            lesson_df["شماره نمره"],
-            lesson_df["نمره"],
-            marker="o",
-            linewidth=2,
-            color="#007ACC"
+        show_chart(
+            "line_chart", lesson_df["شماره نمره"], lesson_df["نمره"],
+            f"نمودار پیشرفت در درس {selected_lesson_display}", "شماره نمره", "نمره",
+            size=(6, 3.5),
         )
-        
-        ax_line.set_title(fix_rtl(f"نمودار پیشرفت در درس {selected_lesson_display}"), fontproperties=font_prop)
-        ax_line.set_xlabel(fix_rtl("شماره نمره"), fontproperties=font_prop)
-        ax_line.set_ylabel(fix_rtl("نمره"), fontproperties=font_prop)
-        ax_line.tick_params(axis='x', rotation=0)
-        st.pyplot(fig_line)
 
         # --- نمودار دایره‌ای (Pie Chart) ---
         st.subheader(f"🎯 سطح عملکرد در درس {selected_lesson_display}") 
-        lesson_df["سطح عملکرد"] = lesson_df["نمره"].apply(categorize)
-        performance_counts = lesson_df["سطح عملکرد"].value_counts()
-        
-        labels_bidi = [fix_rtl(label) for label in performance_counts.index]
-        
-        # FIX: اندازه نمودار
-        fig_pie, ax_pie = plt.subplots(figsize=(4.5, 4.5)) 
-        ax_pie.axis('equal') 
-        
-        wedges, texts, autotexts = ax_pie.pie(
-            performance_counts,
-            labels=labels_bidi, 
-            autopct=lambda pct: f"{pct:.1f}%",
-            startangle=140,
-            colors=["#FF9999", "#FFD580", "#90EE90", "#66B2FF"],
-            wedgeprops={'linewidth': 1, 'edgecolor': 'white', 'width': 0.4}, 
-            pctdistance=0.7, 
-            labeldistance=1.1
+        show_chart(
+            "pie_chart", performance_counts, f"توزیع سطح عملکرد - {selected_lesson_display}",
+            size=(4.5, 4.5), title_size=12, donut=True,
         )
-        
-        for t in texts:
-            t.set_fontproperties(font_prop)
-            t.set_fontsize(10)
-            x, y = t.get_position()
-            if x > 0:
-                t.set_horizontalalignment('right') 
-            else:
-                t.set_horizontalalignment('left') 
-                
-        for autotext in autotexts:
-            autotext.set_fontproperties(font_prop)
-            autotext.set_fontsize(10)
-            
-        ax_pie.set_title(fix_rtl(f"توزیع سطح عملکرد - {selected_lesson_display}"), fontproperties=font_prop, fontsize=12)
-        st.pyplot(fig_pie)
 
     else:
         # --- آمار کلی ---
         st.subheader("📋 کارنامه کلی شما") 
-        avg_per_lesson = scores_df.groupby("درس")["نمره"].mean().reset_index()
-        avg_per_lesson["سطح عملکرد"] = avg_per_lesson["نمره"].apply(categorize)
-
-        class_data = supabase.table("scores").select("درس, نمره").execute().data
-        class_df = pd.DataFrame(class_data)
-        class_avg = class_df.groupby("درس")["نمره"].mean().reset_index().rename(columns={"نمره": "میانگین کلاس"})
-        report_df = pd.merge(avg_per_lesson, class_avg, on="درس", how="left")
-        report_df["مقایسه با کلاس"] = report_df.apply(
-            lambda x: "⬆️ بالاتر از میانگین" if x["نمره"] > x["میانگین کلاس"]
-            else "⬇️ پایین‌تر از میانگین" if x["نمره"] < x["میانگین کلاس"]
-            else "⚖️ برابر با میانگین", axis=1
+        # میانگین کلاس فقط برای همین آموزگار و کلاس و در سمت پایگاه داده محاسبه می‌شود؛
+        # هر دو خواندن هم‌زمان انجام می‌شوند
+        report_df = panel_data.student_report(
+            profile["id"], profile.get("teacher_id"), class_name, scale_for(profile.get("مدرسه"))
         )
         
         st.table(report_df[["درس", "نمره", "سطح عملکرد", "میانگین کلاس", "مقایسه با کلاس"]].rename(
@@ -1242,147 +1271,100 @@ def show_student_panel(username):
 
         # --- نمودار پیشرفت کلی دروس (Line Chart) ---
         st.subheader("📊 روند پیشرفت کلی دروس") 
-        fig_all, ax_all = plt.subplots(figsize=(6, 3.5))
-        colors = plt.cm.tab10.colors
-        for i, lesson in enumerate(scores_df["درس"].unique()):
-            lesson_df = scores_df[scores_df["درس"] == lesson].reset_index(drop=True)
-            lesson_df["شماره نمره"] = lesson_df.index + 1
-            ax_all.plot(
-                lesson_df["شماره نمره"],
-                lesson_df["نمره"],
-                marker="o",
-                linewidth=2,
-                color=colors[i % len(colors)],
-                label=fix_rtl(lesson), 
-            )
-            
-        ax_all.set_title(fix_rtl("نمودار پیشرفت نمرات در تمام دروس"), fontproperties=font_prop)
-        ax_all.set_xlabel(fix_rtl("شماره نمره"), fontproperties=font_prop)
-        ax_all.set_ylabel(fix_rtl("نمره"), fontproperties=font_prop)
-        ax_all.legend(prop=font_prop, loc="best")
-        st.pyplot(fig_all)
-
-        # --- بخش کارنامه PDF ---
-        base64_image = convert_image_to_base64(fig_all)
-        
-        # FIX: حذف fix_rtl از نام ستون‌ها برای PDF و استفاده از متن خام
-        report_df_pdf = report_df[["درس", "نمره", "سطح عملکرد", "میانگین کلاس", "مقایسه با کلاس"]].rename(
-            columns={
-                "درس": "درس", 
-                "نمره": "نمره", 
-                "سطح عملکرد": "سطح عملکرد", 
-                "میانگین کلاس": "میانگین کلاس", 
-                "مقایسه با کلاس": "مقایسه با کلاس"
-            }
-        )
-        
-        html_table = report_df_pdf.to_html(index=False, classes="report-table")
-        
-        html_content = f"""
-        <html lang="fa" dir="rtl">
-        <head>
-            <meta charset="UTF-8">
-            <title>کارنامه تحصیلی</title>
-            <style>
-                @font-face {{
-                    font-family: 'Vazir';
-                    src: url('file:///{absolute_font_path}') format('truetype');
-                }}
-                body {{
-                    font-family: 'Vazir', sans-serif;
-                    direction: rtl;
-                    text-align: right;
-                    margin: 40px;
-                    color: #333;
-                    line-height: 1.6;
-                }}
-                h1 {{
-                    color: #004d99; text-align: center; border-bottom: 2px solid #eee;
-                }}
-                table {{
-                    width: 100%; border-collapse: collapse; margin-top: 20px; font-size: 12pt;
-                }}
-                /* FIX نهایی: اعمال قوی جهت‌دهی بر روی سرستون‌ها و سلول‌ها */
-                th {{
-                    border: 2px solid #333; 
-                    padding: 10px; 
-                    text-align: right; 
-                    direction: rtl; 
-                    unicode-bidi: normal; 
-                    background-color: #cceeff;
-                }}
-                td {{
-                    border: 2px solid #333; 
-                    padding: 10px; 
-                    text-align: right; 
-                    direction: rtl; 
-                    unicode-bidi: normal; 
-                }}
-            </style>
-        </head>
-        <body>
-            <h1>📘 کارنامه تحصیلی</h1>
-            <p><b>نام دانش‌آموز:</b> {full_name}</p>
-            <p><b>مدرسه:</b> {school_name} | <b>پایه:</b> {grade} | <b>کلاس:</b> {class_name}</p>
-            {html_table}
-            <img src="data:image/png;base64,{base64_image}" style="width:100%;max-width:600px;display:block;margin:auto;">
-        </body>
-        </html>
-        """
-        pdf_bytes = HTML(string=html_content).write_pdf()
-        
-        st.download_button(
-            label="📥 دانلود کارنامه PDF",
-            data=pdf_bytes,
-            file_name=f"کارنامه_{full_name}.pdf",
-            mime="application/pdf",
+        progress_series = panel_data.progress_series(scores_df)
+        show_chart(
+            "multi_line_chart", progress_series, "نمودار پیشرفت نمرات در تمام دروس", "شماره نمره", "نمره", (6, 3.5)
         )
-        st.success("✅ کارنامه شما آماده دانلود است.")
+
+        # --- بخش کارنامه PDF (ساخت در پس‌زمینه، فقط با درخواست دانش‌آموز) ---
+        student_meta = {"نام": full_name, "مدرسه": school_name, "پایه": grade, "کلاس": class_name}
+        card_key = report_card.report_key(student_meta, report_df, progress_series)
+        pdf_bytes = report_card.get_pdf(card_key)
+
+        if pdf_bytes is not None:
+            st.download_button(
+                label="📥 دانلود کارنامه PDF",
+                data=pdf_bytes,
+                file_name=f"کارنامه_{full_name}.pdf",
+                mime="application/pdf",
+            )
+            st.success("✅ کارنامه شما آماده دانلود است.")
+        elif report_card.is_pending(card_key):
+            st.info("⏳ کارنامه در حال آماده‌سازی است...")
+            if st.button("🔄 بررسی وضعیت کارنامه"):
+                st.rerun()
+        else:
+            error = report_card.pdf_error(card_key)
+            if error is not None:
+                st.error(f"❌ خطا در ساخت کارنامه: {error}")
+            if st.button("📄 آماده‌سازی کارنامه PDF"):
+                report_card.request_pdf(card_key, student_meta, report_df, progress_series)
+                st.rerun()
 # تابع آمار آموزگار برای مدیر/معاون
 # -------------------------------
 
-def show_teacher_statistics_by_admin(school, selected_teacher):
-    st.subheader(f"📊 آمار آموزگار: {selected_teacher}")
+def show_teacher_statistics_by_admin(school, teacher_id, teacher_name):
+    st.subheader(f"📊 آمار آموزگار: {teacher_name}")
 
-    scores = supabase.table("scores").select("*").eq("آموزگار", selected_teacher).execute()
-    if not scores.data:
+    rollups_df = fetch_view("class_statistics", "score_rollups", {"teacher_id": teacher_id})
+    if rollups_df.empty:
         st.info("هنوز نمره‌ای برای این آموزگار ثبت نشده است.")
         return
 
-    df = pd.DataFrame(scores.data)
-    avg_per_student = df.groupby("student")["نمره"].mean().reset_index()
+    avg_per_student = student_averages(rollups_df).drop(columns="student_id")
     avg_per_student = avg_per_student.sort_values("نمره", ascending=False)
     st.dataframe(avg_per_student)
+    show_export_downloads("admin_teacher", teacher_name, teacher_id=teacher_id)
 
     st.subheader("نمودار میانگین نمرات دانش‌آموزان")
-    fig, ax = plt.subplots()
-    ax.bar(avg_per_student["student"], avg_per_student["نمره"])
-    ax.set_xticklabels(avg_per_student["student"], rotation=45, ha="right")
-    st.pyplot(fig)
+    show_chart("bar_chart", avg_per_student["student"], avg_per_student["نمره"], None)
 
     class_avg = round(avg_per_student["نمره"].mean(), 2)
     st.success(f"میانگین کلی کلاس: {class_avg}")
 
     st.subheader("نمودار دایره‌ای وضعیت کلی دانش‌آموزان")
-    bins = [0, 10, 14, 17, 20]
-    labels = ["ضعیف", "قابل قبول", "خوب", "عالی"]
-    avg_per_student["وضعیت"] = pd.cut(avg_per_student["نمره"], bins=bins, labels=labels, include_lowest=True)
+    scale = scale_for(school)
+    avg_per_student["وضعیت"] = scale.categorize(avg_per_student["نمره"])
+
+    pie_data = scale.level_counts(avg_per_student["وضعیت"])
+    show_chart("pie_chart", pie_data, "توزیع سطح عملکرد دانش‌آموزان", size=(6.4, 4.8))
+
+def show_teacher_comparison(teacher_names):
+    """مقایسه همه آموزگاران مدرسه با یک خواندن جدول تجمیعی و یک نمودار مشترک.
+
+    ``teacher_names``: شناسه ← نام کامل آموزگاران مدرسه (گروه‌بندی با شناسه است).
+    """
+    st.subheader("🆚 مقایسه عملکرد آموزگاران مدرسه")
+    rollups_df = fetch_view("teacher_comparison", "score_rollups", {"teacher_id": [int(i) for i in teacher_names]})
+    if rollups_df.empty:
+        st.info("هنوز نمره‌ای برای آموزگاران این مدرسه ثبت نشده است.")
+        return
+
+    scale = current_scale()
+    teacher_stats, lesson_stats = teacher_comparison(rollups_df, scale, teacher_names)
+    st.dataframe(teacher_stats.rename(columns={level: f"{level} (٪)" for level in scale.labels}))
 
-    pie_data = avg_per_student["وضعیت"].value_counts()
-    fig2, ax2 = plt.subplots()
-    ax2.pie(pie_data, labels=pie_data.index, autopct="%1.1f%%", startangle=90)
-    ax2.set_title("توزیع سطح عملکرد دانش‌آموزان")
-    st.pyplot(fig2)
+    st.subheader("توزیع سطح عملکرد دانش‌آموزان هر آموزگار")
+    show_chart(
+        "stacked_bar_chart", teacher_stats.index, [(level, teacher_stats[level]) for level in scale.labels],
+        "درصد دانش‌آموزان در هر سطح عملکرد", size=(8, max(3, 0.45 * len(teacher_stats) + 1.5)),
+    )
+
+    st.subheader("میانگین هر درس به تفکیک آموزگار")
+    st.dataframe(lesson_stats)
 
 # -------------------------------
 # تابع اصلی برنامه
 # -------------------------------
 
 def app():
+    if "user" not in st.session_state:
+        resume_session()
     if "user" not in st.session_state:
         login_page()
     else:
         main_dashboard(st.session_state["user"])
+    write_session_cookie()
 
 if __name__ == "__main__":
     app()
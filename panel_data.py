@@ -0,0 +1,69 @@
+"""بخش داده و محاسبه پنل‌ها، بدون Streamlit.
+
+پنل‌های ``main.py`` فقط ویجت‌ها و نمودارها را می‌سازند و داده را از این
+توابع می‌گیرند؛ بنچمارک ``benchmarks/panels.py`` هم همین توابع را صدا
+می‌زند، پس اندازه‌گیری با تغییر پنل‌ها هم‌گام می‌ماند.
+"""
+from functools import partial
+
+import pandas as pd
+
+import report_card
+from data_access import class_lesson_averages, fetch_concurrently, fetch_view
+from rollups import lesson_averages, student_averages
+
+
+def teacher_data(teacher_id):
+    """دانش‌آموزان، نمرات و جدول تجمیعی یک آموزگار (خواندن هم‌زمان).
+
+    خروجی دیکشنری با کلیدهای students، scores و rollups است.
+    """
+    teacher_filter = {"teacher_id": teacher_id}
+    return fetch_concurrently({
+        "students": partial(fetch_view, "teacher_students", "students", teacher_filter),
+        "scores": partial(fetch_view, "individual_reports", "scores", teacher_filter),
+        "rollups": partial(fetch_view, "class_statistics", "score_rollups", teacher_filter),
+    })
+
+
+def lesson_history(lesson_df, scale):
+    """نمرات یک درس به ترتیب ردیف‌ها، با ستون‌های «شماره نمره» و «سطح عملکرد»؛ خروجی (نمرات، تعداد هر سطح)."""
+    lesson_df = lesson_df.reset_index(drop=True)
+    lesson_df["شماره نمره"] = lesson_df.index + 1
+    lesson_df["سطح عملکرد"] = scale.categorize(lesson_df["نمره"])
+    return lesson_df, scale.level_counts(lesson_df["سطح عملکرد"])
+
+
+def individual_report(scores_df, rollups_df, student_id, lesson, scale):
+    """گزارش فردی: (نمرات درس به ترتیب تاریخ، تعداد هر سطح، میانگین از جدول تجمیعی)."""
+    lesson_df = scores_df[(scores_df["student_id"] == student_id) & (scores_df["درس"] == lesson)]
+    lesson_df, performance_counts = lesson_history(lesson_df.sort_values("تاریخ"), scale)
+    lesson_avgs = student_averages(rollups_df, lesson).set_index("student_id")["نمره"]
+    avg_score = lesson_avgs.get(student_id, lesson_df["نمره"].mean())
+    return lesson_df, performance_counts, avg_score
+
+
+def ranking(rollups_df, scale, lesson=None, names=None):
+    """میانگین و سطح عملکرد هر دانش‌آموز (همه دروس یا یک درس)، از بیشترین میانگین."""
+    averages = student_averages(rollups_df, lesson, names).drop(columns="student_id")
+    averages["سطح عملکرد"] = scale.categorize(averages["نمره"])
+    return averages.sort_values("نمره", ascending=False)
+
+
+def student_report(student_id, teacher_id, class_name, scale):
+    """جدول کارنامه یک دانش‌آموز: میانگین هر درس و مقایسه با میانگین کلاس."""
+    data = fetch_concurrently({
+        "rollups": partial(fetch_view, "student_panel", "score_rollups", {"student_id": student_id}),
+        "class_avg": partial(class_lesson_averages, teacher_id, class_name),
+    })
+    class_avg = pd.DataFrame(data["class_avg"], columns=["درس", "میانگین کلاس"])
+    return report_card.build_report_df(lesson_averages(data["rollups"]), class_avg, scale)
+
+
+def progress_series(scores_df):
+    """داده نمودار پیشرفت همه دروس: (درس، شماره نمره‌ها، نمره‌ها) برای هر درس."""
+    series = []
+    for lesson in scores_df["درس"].unique():
+        values = scores_df.loc[scores_df["درس"] == lesson, "نمره"].tolist()
+        series.append((lesson, list(range(1, len(values) + 1)), values))
+    return series
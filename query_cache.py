@@ -0,0 +1,136 @@
+"""حافظه نهان مشترک نتایج پرس‌وجو با TTL، سقف اندازه و حذف LRU.
+
+کلید هر مدخل (جدول، ستون‌ها، فیلترها، ...) است. پس از هر نوشتن، فقط
+مدخل‌هایی از همان جدول حذف می‌شوند که فیلترشان با ردیف نوشته‌شده سازگار
+باشد؛ مثلاً ثبت نمره برای یک آموزگار، نمرات آموزگاران دیگر را باطل نمی‌کند.
+
+خواندنی که پیش از یک نوشتن شروع شده و پس از آن تمام می‌شود نتیجه قدیمی
+دارد؛ ``get_or_load`` برای هر کلید در حال خواندن یک شماره نسل نگه می‌دارد
+که با هر ابطال آن کلید بالا می‌رود و نتیجه فقط اگر نسل عوض نشده باشد ذخیره می‌شود.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+
+
+def make_key(table, columns="*", filters=None, *extra):
+    """ساخت کلید قابل hash از مشخصات پرس‌وجو (فیلتر فهرستی یعنی IN)."""
+    frozen = tuple(sorted(
+        (column, frozenset(value) if isinstance(value, (list, tuple, set)) else value)
+        for column, value in (filters or {}).items()
+    ))
+    return (table, columns or "*", frozen) + tuple(extra)
+
+
+class QueryCache:
+    """حافظه نهان LRU با انقضای زمانی؛ ایمن برای استفاده هم‌زمان نشست‌ها."""
+
+    def __init__(self, maxsize=256, ttl=60.0, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock
+        self._data = OrderedDict()
+        # کلیدهای در حال خواندن: [نسل، تعداد خواندن‌های در جریان]
+        self._loads = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, value = entry
+            if expires_at < self._clock():
+                del self._data[key]
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, ttl=None):
+        with self._lock:
+            self._store(key, value, ttl)
+
+    def _store(self, key, value, ttl):
+        self._data[key] = (self._clock() + (self.ttl if ttl is None else ttl), value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def get_or_load(self, key, loader, ttl=None):
+        """مقدار ``key`` یا نتیجه ``loader()``؛ نتیجه‌ای که حین خواندنش باطل شده ذخیره نمی‌شود."""
+        value = self.get(key)
+        if value is not None:
+            return value
+        with self._lock:
+            load = self._loads.setdefault(key, [0, 0])
+            load[1] += 1
+            generation = load[0]
+        stored = False
+        try:
+            value = loader()
+            stored = True
+            return value
+        finally:
+            with self._lock:
+                load[1] -= 1
+                if not load[1]:
+                    del self._loads[key]
+                if stored and load[0] == generation:
+                    self._store(key, value, ttl)
+
+    def _invalidate(self, stale):
+        # زیر قفل صدا زده می‌شود
+        for key in stale:
+            self._data.pop(key, None)
+            if key in self._loads:
+                self._loads[key][0] += 1
+
+    def invalidate_table(self, table):
+        with self._lock:
+            self._invalidate([k for k in list(self._data) + list(self._loads) if k[0] == table])
+
+    def invalidate_rows(self, table, rows, wildcard=()):
+        """حذف مدخل‌هایی از ``table`` که فیلترشان با یکی از ``rows`` جور است.
+
+        ستون‌های ``wildcard`` (مثلاً ستون‌های تغییرکرده در update که مقدار
+        قبلی‌شان معلوم نیست) با هر مقداری جور در نظر گرفته می‌شوند.
+        """
+        with self._lock:
+            self._invalidate([
+                key for key in list(self._data) + list(self._loads)
+                if key[0] == table and any(_matches(key[2], row, wildcard) for row in rows)
+            ])
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            for load in self._loads.values():
+                load[0] += 1
+
+    def stats(self):
+        with self._lock:
+            return {"size": len(self._data), "hits": self.hits, "misses": self.misses}
+
+
+def _matches(frozen_filters, row, wildcard):
+    for column, value in frozen_filters:
+        if column in wildcard or column not in row:
+            continue
+        if isinstance(value, frozenset):
+            if row[column] not in value:
+                return False
+        elif row[column] != value:
+            return False
+    return True
+
+
+query_cache = QueryCache(
+    maxsize=int(os.environ.get("DARSBAN_CACHE_SIZE", 256)),
+    ttl=float(os.environ.get("DARSBAN_CACHE_TTL", 60)),
+)
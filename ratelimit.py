@@ -0,0 +1,87 @@
+"""محدودسازی نرخ تلاش‌های ورود با سطل توکن (token bucket) در حافظه سرور.
+
+پیش از هر بررسی رمز، یک توکن از سطل نشانی IP کاربر و یک توکن از سطل نام
+کاربری برداشته می‌شود. سطل‌ها با نرخ ثابت پر می‌شوند؛ پس چند تلاش پشت‌سرهم
+مجاز است ولی موجی از تلاش‌ها (حدس رمز یا امتحان فهرست رمزهای لورفته) پیش
+از رسیدن به پایگاه داده و هش PBKDF2 رد می‌شود و کاربران واردشده کند نمی‌شوند.
+
+تنظیمات با متغیرهای محیطی:
+    DARSBAN_LOGIN_IP_BURST     تعداد تلاش پشت‌سرهم از یک IP (پیش‌فرض ۳۰؛ یک مدرسه ممکن است یک IP داشته باشد)
+    DARSBAN_LOGIN_IP_RATE      تلاش مجاز در ثانیه برای هر IP (۰٫۵)
+    DARSBAN_LOGIN_USER_BURST   تعداد تلاش پشت‌سرهم برای یک نام کاربری (۵)
+    DARSBAN_LOGIN_USER_RATE    تلاش مجاز در ثانیه برای هر نام کاربری (یک تلاش در ۳۰ ثانیه)
+    DARSBAN_TRUST_PROXY        ۱ اگر برنامه پشت پراکسی است و IP کاربر از X-Forwarded-For خوانده شود (۰)
+"""
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+
+IP_BURST = float(os.environ.get("DARSBAN_LOGIN_IP_BURST", 30))
+IP_RATE = float(os.environ.get("DARSBAN_LOGIN_IP_RATE", 0.5))
+USER_BURST = float(os.environ.get("DARSBAN_LOGIN_USER_BURST", 5))
+USER_RATE = float(os.environ.get("DARSBAN_LOGIN_USER_RATE", 1 / 30))
+# بدون پراکسی، سرآیند X-Forwarded-For را خود مهاجم می‌نویسد و سطل IP را دور می‌زند
+TRUST_PROXY = os.environ.get("DARSBAN_TRUST_PROXY", "0") == "1"
+
+
+class TokenBucketLimiter:
+    """یک سطل توکن برای هر کلید با ظرفیت ``capacity`` و پرشدن ``rate`` توکن در ثانیه.
+
+    فقط ``maxsize`` سطل اخیر نگه داشته می‌شود (حذف LRU)؛ سطل حذف‌شده در
+    واقع پر بوده یا به زودی پر می‌شد. ایمن برای استفاده هم‌زمان نشست‌ها.
+    """
+
+    def __init__(self, capacity, rate, maxsize=10_000, clock=time.monotonic):
+        self.capacity = capacity
+        self.rate = rate
+        self.maxsize = maxsize
+        self._clock = clock
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _level(self, key, now):
+        tokens, updated = self._buckets.get(key, (self.capacity, now))
+        return min(self.capacity, tokens + (now - updated) * self.rate)
+
+    def retry_after(self, key):
+        """ثانیه‌های لازم تا تلاش بعدی مجاز شود (۰ یعنی همین حالا)، بدون برداشتن توکن."""
+        with self._lock:
+            tokens = self._level(key, self._clock())
+        return 0.0 if tokens >= 1 else (1 - tokens) / self.rate
+
+    def acquire(self, key):
+        """برداشتن یک توکن؛ خروجی: ۰ در صورت موفقیت، وگرنه ثانیه‌های انتظار."""
+        with self._lock:
+            now = self._clock()
+            tokens = self._level(key, now)
+            if tokens < 1:
+                return (1 - tokens) / self.rate
+            self._buckets[key] = (tokens - 1, now)
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.maxsize:
+                self._buckets.popitem(last=False)
+            return 0.0
+
+    def reset(self, key):
+        with self._lock:
+            self._buckets.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+
+
+login_by_ip = TokenBucketLimiter(IP_BURST, IP_RATE)
+login_by_username = TokenBucketLimiter(USER_BURST, USER_RATE)
+
+
+def check_login(ip, username):
+    """اجازه یک تلاش ورود؛ خروجی: ۰ یا ثانیه‌های انتظار (گرد به بالا).
+
+    اگر نام کاربری مسدود باشد توکن IP هدر نمی‌رود و سطل نام کاربری فقط وقتی
+    مصرف می‌شود که IP مجاز باشد.
+    """
+    wait = login_by_username.retry_after(username) or login_by_ip.acquire(ip) or login_by_username.acquire(username)
+    return math.ceil(wait)
@@ -0,0 +1,187 @@
+"""ساخت کارنامه PDF در پس‌زمینه با حافظه نهان بر اساس محتوای کارنامه.
+
+صفحه دانش‌آموز فقط کلید کارنامه را محاسبه می‌کند؛ رسم نمودار ۳۰۰ dpi و
+اجرای WeasyPrint وقتی دانش‌آموز درخواست کارنامه بدهد در یک Thread Pool
+انجام می‌شود. کارنامه با داده یکسان فقط یک بار ساخته می‌شود.
+"""
+import base64
+import hashlib
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+import charts
+from farsi_style import FONT_FACE_CSS
+from grading import DEFAULT_SCALE
+
+REPORT_COLUMNS = ["درس", "نمره", "سطح عملکرد", "میانگین کلاس", "مقایسه با کلاس"]
+
+_executor = ThreadPoolExecutor(
+    max_workers=int(os.environ.get("DARSBAN_PDF_WORKERS", 2)), thread_name_prefix="report-card"
+)
+_pdf_cache = charts.ChartCache(int(float(os.environ.get("DARSBAN_PDF_CACHE_MB", 64)) * 1024 * 1024))
+_pending = {}
+_errors = {}
+_pending_lock = threading.Lock()
+
+
+def report_key(student, report_df, progress_series):
+    """کلید محتوایی کارنامه: اطلاعات دانش‌آموز، جدول کارنامه و داده نمودار."""
+    raw = json.dumps(
+        [student, report_df[REPORT_COLUMNS].to_dict("split")["data"], progress_series],
+        ensure_ascii=False, default=str,
+    )
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def build_report_df(avg_per_lesson, class_avg, scale=DEFAULT_SCALE):
+    """جدول کارنامه از میانگین هر درس دانش‌آموز (درس، نمره) و میانگین کلاس (درس، میانگین کلاس)."""
+    report_df = avg_per_lesson.copy()
+    report_df["سطح عملکرد"] = scale.categorize(report_df["نمره"]).astype(str)
+    report_df = pd.merge(report_df, class_avg, on="درس", how="left")
+    report_df["مقایسه با کلاس"] = np.select(
+        [report_df["نمره"] > report_df["میانگین کلاس"], report_df["نمره"] < report_df["میانگین کلاس"]],
+        ["⬆️ بالاتر از میانگین", "⬇️ پایین‌تر از میانگین"],
+        default="⚖️ برابر با میانگین",
+    )
+    return report_df
+
+
+@lru_cache(maxsize=1)
+def font_resources():
+    """پیکربندی فونت و شیوه‌نامه @font-face وزیر؛ یک بار در هر فرایند بارگذاری می‌شود."""
+    from weasyprint import CSS
+    from weasyprint.text.fonts import FontConfiguration
+
+    font_config = FontConfiguration()
+    font_css = CSS(string=FONT_FACE_CSS, font_config=font_config)
+    return font_config, font_css
+
+
+def report_body(student, report_df, chart_png):
+    """بدنه HTML یک کارنامه (برای کارنامه تکی یا فایل ادغام‌شده)."""
+    html_table = report_df[REPORT_COLUMNS].to_html(index=False, classes="report-table")
+    base64_image = base64.b64encode(chart_png).decode("utf-8")
+    return f"""
+    <section class="report-card">
+        <h1>📘 کارنامه تحصیلی</h1>
+        <p><b>نام دانش‌آموز:</b> {student["نام"]}</p>
+        <p><b>مدرسه:</b> {student["مدرسه"]} | <b>پایه:</b> {student["پایه"]} | <b>کلاس:</b> {student["کلاس"]}</p>
+        {html_table}
+        <img src="data:image/png;base64,{base64_image}" style="width:100%;max-width:600px;display:block;margin:auto;">
+    </section>
+    """
+
+
+def build_report_html(bodies):
+    """HTML راست‌چین برای WeasyPrint؛ هر کارنامه در صفحه‌ای جدا."""
+    return f"""
+    <html lang="fa" dir="rtl">
+    <head>
+        <meta charset="UTF-8">
+        <title>کارنامه تحصیلی</title>
+        <style>
+            .report-card + .report-card {{
+                page-break-before: always;
+            }}
+            body {{
+                font-family: 'Vazir', sans-serif;
+                direction: rtl;
+                text-align: right;
+                margin: 40px;
+                color: #333;
+                line-height: 1.6;
+            }}
+            h1 {{
+                color: #004d99; text-align: center; border-bottom: 2px solid #eee;
+            }}
+            table {{
+                width: 100%; border-collapse: collapse; margin-top: 20px; font-size: 12pt;
+            }}
+            th {{
+                border: 2px solid #333;
+                padding: 10px;
+                text-align: right;
+                direction: rtl;
+                unicode-bidi: normal;
+                background-color: #cceeff;
+            }}
+            td {{
+                border: 2px solid #333;
+                padding: 10px;
+                text-align: right;
+                direction: rtl;
+                unicode-bidi: normal;
+            }}
+        </style>
+    </head>
+    <body>
+        {"".join(bodies)}
+    </body>
+    </html>
+    """
+
+
+def progress_chart(progress_series):
+    return charts.multi_line_chart(
+        progress_series, "نمودار پیشرفت نمرات در تمام دروس", "شماره نمره", "نمره", (6, 3.5), dpi=300
+    )
+
+
+def write_pdf(html_content):
+    # WeasyPrint فقط هنگام ساخت اولین PDF بارگذاری می‌شود، نه در راه‌اندازی صفحه
+    from weasyprint import HTML
+
+    font_config, font_css = font_resources()
+    return HTML(string=html_content).write_pdf(stylesheets=[font_css], font_config=font_config)
+
+
+def render_pdf(student, report_df, progress_series):
+    """ساخت هم‌زمان (blocking) بایت‌های PDF کارنامه."""
+    body = report_body(student, report_df, progress_chart(progress_series))
+    return write_pdf(build_report_html([body]))
+
+
+def _job(key, student, report_df, progress_series):
+    try:
+        _pdf_cache.put(key, render_pdf(student, report_df, progress_series))
+    except Exception as e:
+        with _pending_lock:
+            _errors[key] = e
+    finally:
+        with _pending_lock:
+            _pending.pop(key, None)
+
+
+def request_pdf(key, student, report_df, progress_series):
+    """ثبت درخواست ساخت کارنامه در پس‌زمینه (اگر قبلاً ساخته یا در صف نباشد)."""
+    if _pdf_cache.get(key) is not None:
+        return None
+    with _pending_lock:
+        _errors.pop(key, None)
+        future = _pending.get(key)
+        if future is None:
+            future = _executor.submit(_job, key, student, report_df.copy(), progress_series)
+            _pending[key] = future
+    return future
+
+
+def get_pdf(key):
+    """بایت‌های PDF آماده یا None."""
+    return _pdf_cache.get(key)
+
+
+def pdf_error(key):
+    """خطای آخرین تلاش ناموفق برای این کلید (اگر باشد)."""
+    with _pending_lock:
+        return _errors.get(key)
+
+
+def is_pending(key):
+    with _pending_lock:
+        return key in _pending
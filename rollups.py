@@ -0,0 +1,119 @@
+"""محاسبات جدول تجمیعی نمرات (score_rollups).
+
+برای هر سه‌تایی (آموزگار، دانش‌آموز، درس) تعداد، مجموع، کمینه، بیشینه و
+آخرین نمره نگه داشته می‌شود تا داشبوردها به جای گروه‌بندی همه ردیف‌های
+نمرات، فقط یک ردیف برای هر دانش‌آموز و درس بخوانند. به‌روزرسانی افزایشی
+با دستورهای اتمی در خود پایگاه داده انجام می‌شود (``data_access`` و توابع
+rollup_* در supabase_schema.sql) تا نوشتن‌های هم‌زمان یکدیگر را پاک نکنند؛
+این ماژول ساخت ردیف از روی نمرات و خواندن‌های داشبوردها را دارد.
+
+کلید هر ردیف شناسه‌های آموزگار و دانش‌آموز است؛ نام‌ها فقط برای نمایش
+(از آخرین نمره ثبت‌شده) در ردیف نگه داشته می‌شوند.
+"""
+import pandas as pd
+
+from grading import DEFAULT_SCALE
+
+KEY_COLUMNS = ("teacher_id", "student_id", "درس")
+DISPLAY_COLUMNS = ("آموزگار", "student")
+STAT_COLUMNS = ("تعداد", "مجموع", "کمینه", "بیشینه", "آخرین_نمره", "تاریخ_آخرین")
+
+
+def rollup_key(row):
+    return {column: row.get(column) for column in KEY_COLUMNS}
+
+
+def from_scores(key, scores):
+    """ساخت ردیف تجمیعی از فهرست ردیف‌های نمره یک گروه (None اگر خالی باشد)."""
+    scores = [s for s in scores if s.get("نمره") is not None]
+    if not scores:
+        return None
+    values = [s["نمره"] for s in scores]
+    last = max(scores, key=lambda s: (s.get("تاریخ") or "", s.get("id") or 0))
+    return {
+        **key,
+        **{column: last.get(column) for column in DISPLAY_COLUMNS},
+        "تعداد": len(values),
+        "مجموع": sum(values),
+        "کمینه": min(values),
+        "بیشینه": max(values),
+        "آخرین_نمره": last["نمره"],
+        "تاریخ_آخرین": last.get("تاریخ"),
+    }
+
+
+# -------------------------------
+# خواندن از جدول تجمیعی برای داشبوردها
+# -------------------------------
+
+def display_names(df, id_column, name_column, names=None):
+    """نام نمایشی هر شناسه (Series شناسه ← نام).
+
+    گروه‌بندی همیشه با شناسه است و نام فقط برای نمایش کنار آن گذاشته می‌شود:
+    از ``names`` (نام فعلی از جدول اصلی، اگر داده شود) یا آخرین نام ثبت‌شده
+    در ردیف‌ها. اگر دو شناسه هم‌نام باشند، شناسه کنار نام می‌آید تا در
+    جدول‌ها و نمودارها از هم جدا بمانند.
+    """
+    labels = df.groupby(id_column, sort=False)[name_column].last()
+    if names is not None:
+        labels = pd.Series(labels.index.map(lambda i: names.get(i, labels[i])), index=labels.index)
+    repeated = labels.duplicated(keep=False)
+    labels[repeated] = [f"{name} ({i})" for i, name in labels[repeated].items()]
+    return labels
+
+
+def student_averages(rollups_df, lesson=None, names=None):
+    """میانگین نمره هر دانش‌آموز (در همه دروس یا یک درس) با ستون‌های student_id، student و نمره."""
+    if lesson is not None:
+        rollups_df = rollups_df[rollups_df["درس"] == lesson]
+    grouped = rollups_df.groupby("student_id")[["مجموع", "تعداد"]].sum()
+    return pd.DataFrame({
+        "student_id": grouped.index,
+        "student": display_names(rollups_df, "student_id", "student", names).reindex(grouped.index).values,
+        "نمره": (grouped["مجموع"] / grouped["تعداد"]).values,
+    })
+
+
+def lesson_averages(rollups_df):
+    """میانگین هر درس (برای یک دانش‌آموز) با ستون‌های درس و نمره."""
+    grouped = rollups_df.groupby("درس")[["مجموع", "تعداد"]].sum()
+    return pd.DataFrame({
+        "درس": grouped.index,
+        "نمره": (grouped["مجموع"] / grouped["تعداد"]).values,
+    })
+
+
+def teacher_comparison(rollups_df, scale=DEFAULT_SCALE, teacher_names=None):
+    """آمار مقایسه‌ای آموزگاران یک مدرسه در یک گذر (همه محاسبات برداری).
+
+    گروه‌بندی با teacher_id و student_id است؛ ``teacher_names`` (شناسه ← نام
+    کامل) فقط برچسب ردیف‌ها را تعیین می‌کند.
+    خروجی: (آمار هر آموزگار با درصد دانش‌آموزان هر سطح عملکرد،
+    جدول میانگین وزنی هر درس به تفکیک آموزگار).
+    """
+    labels = display_names(rollups_df, "teacher_id", "آموزگار", teacher_names)
+    per_student = rollups_df.groupby(["teacher_id", "student_id"])[["مجموع", "تعداد"]].sum()
+    per_student["میانگین"] = per_student["مجموع"] / per_student["تعداد"]
+    per_student["سطح"] = scale.categorize(per_student["میانگین"])
+
+    totals = per_student.groupby(level="teacher_id")[["مجموع", "تعداد"]].sum()
+    teacher_stats = pd.DataFrame({
+        "دانش‌آموزان": per_student.groupby(level="teacher_id").size(),
+        "تعداد نمره": totals["تعداد"],
+        "میانگین": (totals["مجموع"] / totals["تعداد"]).round(2),
+    })
+    levels = pd.crosstab(per_student.index.get_level_values("teacher_id"), per_student["سطح"],
+                         normalize="index", dropna=False).reindex(columns=scale.labels, fill_value=0) * 100
+    teacher_stats = teacher_stats.join(levels.round(1)).sort_values("میانگین", ascending=False)
+
+    per_lesson = rollups_df.groupby(["teacher_id", "درس"])[["مجموع", "تعداد"]].sum()
+    lesson_stats = (per_lesson["مجموع"] / per_lesson["تعداد"]).round(2).unstack("درس").reindex(teacher_stats.index)
+    teacher_stats.index = lesson_stats.index = pd.Index(labels.reindex(teacher_stats.index).values, name="آموزگار")
+    return teacher_stats, lesson_stats
+
+
+if __name__ == "__main__":
+    # بازسازی جدول تجمیعی برای داده‌هایی که پیش از این جدول ثبت شده‌اند
+    from data_access import rebuild_rollups
+
+    print(f"{rebuild_rollups()} ردیف تجمیعی ساخته شد.")
@@ -0,0 +1,37 @@
+"""شکل‌دهی متن فارسی برای Matplotlib با حافظه نهان مشترک.
+
+Matplotlib حروف عربی/فارسی را نمی‌چسباند و جهت راست‌به‌چپ را نمی‌شناسد؛
+پس هر عنوان و برچسب باید با arabic_reshaper و الگوریتم BiDi آماده شود.
+نام دروس و سطوح عملکرد مدام تکرار می‌شوند، پس نتیجه در یک LRU محدود
+(``DARSBAN_RTL_CACHE_SIZE`` مدخل) نگه داشته می‌شود.
+"""
+import os
+from functools import lru_cache
+
+import arabic_reshaper
+from bidi.algorithm import get_display
+
+RTL_CACHE_SIZE = int(os.environ.get("DARSBAN_RTL_CACHE_SIZE", 4096))
+
+
+@lru_cache(maxsize=RTL_CACHE_SIZE)
+def _shape(text):
+    return get_display(arabic_reshaper.reshape(text))
+
+
+def shape(text):
+    """متن آماده نمایش راست‌به‌چپ؛ مقدار غیرمتنی یا خالی بدون تغییر برمی‌گردد."""
+    if not isinstance(text, str) or not text.strip():
+        return text
+    return _shape(text)
+
+
+def shape_all(texts):
+    """شکل‌دهی یک فهرست برچسب؛ هر متن تکراری فقط یک بار پردازش می‌شود."""
+    texts = list(texts)
+    shaped = {text: shape(text) for text in set(texts) if isinstance(text, str)}
+    return [shaped.get(text, text) if isinstance(text, str) else text for text in texts]
+
+
+def cache_info():
+    return _shape.cache_info()
@@ -0,0 +1,179 @@
+"""خروجی CSV/XLSX نمرات، رتبه‌بندی دانش‌آموزان و خلاصه دروس.
+
+ردیف‌ها با مولد (generator) و از روی خواندن صفحه‌به‌صفحه پایگاه داده
+ساخته می‌شوند؛ نمرات خام هیچ‌وقت یک‌جا در حافظه نیستند و میانگین‌ها از
+جدول تجمیعی score_rollups جمع زده می‌شوند. CSV تکه‌تکه نوشته می‌شود و
+XLSX با حالت write_only کتابخانه openpyxl ساخته می‌شود.
+
+اجرا از خط فرمان:
+    python score_export.py scores --school "شهید بهشتی" -o scores.xlsx
+    python score_export.py student_averages --teacher "نام آموزگار" -o ranking.csv
+"""
+import argparse
+import csv
+import io
+import sys
+
+from data_access import fetch_rows, iter_pages, resolve_ids
+from grading import DEFAULT_SCALE, scale_for
+
+EXPORT_KINDS = {
+    "scores": "نمرات",
+    "student_averages": "رتبه‌بندی دانش‌آموزان",
+    "lesson_summary": "خلاصه دروس",
+}
+FORMATS = ("xlsx", "csv")
+MIME_TYPES = {
+    "csv": "text/csv",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+CSV_FLUSH_ROWS = 500
+
+
+def scope_filters(teacher_id=None, school_id=None):
+    """فیلتر نمرات یک آموزگار (اگر داده شده باشد) یا همه آموزگاران یک مدرسه."""
+    if teacher_id:
+        return {"teacher_id": teacher_id}
+    teachers = fetch_rows("users", "id", {"school_id": school_id, "نقش": "آموزگار"})
+    return {"teacher_id": [row["id"] for row in teachers]}
+
+
+# -------------------------------
+# مولد ردیف‌ها (اولین ردیف سرستون‌هاست)
+# -------------------------------
+
+def iter_score_rows(filters, scale):
+    yield ["دانش‌آموز", "درس", "نمره", "آموزگار", "تاریخ"]
+    for page in iter_pages("scores", "student, درس, نمره, آموزگار, تاریخ", filters):
+        for row in page:
+            yield [row["student"], row["درس"], row["نمره"], row["آموزگار"], row["تاریخ"]]
+
+
+def _rollup_totals(filters, group_columns):
+    """جمع تعداد، مجموع، کمینه و بیشینه ردیف‌های تجمیعی به تفکیک ``group_columns``.
+
+    گروه‌بندی با شناسه‌هاست؛ نام آموزگار و دانش‌آموز هر گروه برای نمایش کنار آن نگه داشته می‌شود.
+    """
+    totals = {}
+    columns = "teacher_id, student_id, آموزگار, student, درس, تعداد, مجموع, کمینه, بیشینه"
+    for page in iter_pages("score_rollups", columns, filters):
+        for row in page:
+            key = tuple(row[column] for column in group_columns)
+            total = totals.setdefault(key, {"تعداد": 0, "مجموع": 0, "کمینه": None, "بیشینه": None, "students": set(),
+                                            "آموزگار": row["آموزگار"], "student": row["student"]})
+            total["تعداد"] += row["تعداد"]
+            total["مجموع"] += row["مجموع"]
+            total["کمینه"] = row["کمینه"] if total["کمینه"] is None else min(total["کمینه"], row["کمینه"])
+            total["بیشینه"] = row["بیشینه"] if total["بیشینه"] is None else max(total["بیشینه"], row["بیشینه"])
+            total["students"].add(row["student_id"])
+    return totals
+
+
+def iter_student_average_rows(filters, scale):
+    yield ["رتبه", "دانش‌آموز", "آموزگار", "تعداد نمره", "میانگین", "سطح عملکرد"]
+    averages = [
+        (total["student"], total["آموزگار"], total["تعداد"], round(total["مجموع"] / total["تعداد"], 2))
+        for total in _rollup_totals(filters, ("teacher_id", "student_id")).values()
+        if total["تعداد"]
+    ]
+    averages.sort(key=lambda item: item[3], reverse=True)
+    levels = scale.categorize([average for *_, average in averages]).astype(str)
+    for rank, ((student, teacher, count, average), level) in enumerate(zip(averages, levels), start=1):
+        yield [rank, student, teacher, count, average, level]
+
+
+def iter_lesson_summary_rows(filters, scale):
+    yield ["آموزگار", "درس", "تعداد دانش‌آموز", "تعداد نمره", "میانگین", "کمینه", "بیشینه"]
+    totals = _rollup_totals(filters, ("teacher_id", "درس"))
+    for (_, lesson), total in sorted(totals.items(), key=lambda item: (item[1]["آموزگار"] or "", item[0][1])):
+        if total["تعداد"]:
+            yield [total["آموزگار"], lesson, len(total["students"]), total["تعداد"],
+                   round(total["مجموع"] / total["تعداد"], 2), total["کمینه"], total["بیشینه"]]
+
+
+ROW_BUILDERS = {
+    "scores": iter_score_rows,
+    "student_averages": iter_student_average_rows,
+    "lesson_summary": iter_lesson_summary_rows,
+}
+
+
+# -------------------------------
+# نوشتن فایل
+# -------------------------------
+
+def iter_csv(rows):
+    """تکه‌های بایتی CSV (UTF-8 با BOM تا اکسل فارسی را درست نشان دهد)."""
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    yield "\ufeff".encode("utf-8")
+    for i, row in enumerate(rows, start=1):
+        writer.writerow(row)
+        if i % CSV_FLUSH_ROWS == 0:
+            yield buf.getvalue().encode("utf-8")
+            buf.seek(0)
+            buf.truncate()
+    yield buf.getvalue().encode("utf-8")
+
+
+def write_xlsx(rows, output, title):
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(title[:31])
+    sheet.sheet_view.rightToLeft = True
+    for row in rows:
+        sheet.append(row)
+    workbook.save(output)
+
+
+def export(kind, fmt, output, teacher_id=None, school_id=None, scale=DEFAULT_SCALE):
+    """نوشتن خروجی ``kind`` با قالب ``fmt`` در ``output`` (مسیر یا شیء فایل باینری).
+
+    محدوده یک آموزگار (``teacher_id``) یا همه آموزگاران یک مدرسه (``school_id``) است.
+    خروجی: تعداد ردیف‌های داده (بدون سرستون).
+    """
+    counter = {"rows": -1}
+
+    def counted(rows):
+        for row in rows:
+            counter["rows"] += 1
+            yield row
+
+    rows = counted(ROW_BUILDERS[kind](scope_filters(teacher_id, school_id), scale))
+    if fmt == "xlsx":
+        write_xlsx(rows, output, EXPORT_KINDS[kind])
+    else:
+        f = output if hasattr(output, "write") else open(output, "wb")
+        try:
+            for chunk in iter_csv(rows):
+                f.write(chunk)
+        finally:
+            if f is not output:
+                f.close()
+    return max(counter["rows"], 0)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="خروجی CSV/XLSX نمرات و رتبه‌بندی‌ها")
+    parser.add_argument("kind", choices=list(EXPORT_KINDS))
+    parser.add_argument("--teacher", help="نام کامل آموزگار (بدون آن: کل مدرسه)")
+    parser.add_argument("--school", help="نام مدرسه (مقیاس سطح‌بندی هم از مدرسه خوانده می‌شود)")
+    parser.add_argument("--format", choices=FORMATS, help="پیش‌فرض: از پسوند فایل خروجی")
+    parser.add_argument("--output", "-o", required=True)
+    args = parser.parse_args(argv)
+    if not (args.teacher or args.school):
+        parser.error("--teacher یا --school لازم است")
+
+    try:
+        teacher_id, school_id = resolve_ids(args.teacher, args.school)
+    except ValueError as e:
+        parser.error(str(e))
+
+    fmt = args.format or ("csv" if args.output.lower().endswith(".csv") else "xlsx")
+    count = export(args.kind, fmt, args.output, teacher_id, school_id, scale_for(args.school))
+    print(f"{count} ردیف در {args.output} ذخیره شد.", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""نشست‌های ورود با توکن امضاشده و نگه‌داری نمایه در حافظه سرور.
+
+پس از ورود موفق یک توکن (نام کاربری، شناسه تصادفی و امضای HMAC) ساخته و
+در کوکی مرورگر (نه نشانی صفحه) گذاشته می‌شود. اگر اتصال Streamlit قطع
+و ``st.session_state`` خالی شود، نمایه با همین توکن از حافظه سرور برگردانده
+می‌شود و ورود دوباره به پایگاه داده نمی‌رود. هر بازگرداندن (``rotate``) توکن
+تازه می‌دهد و توکن قبلی را باطل می‌کند. توکن جعلی یا دست‌کاری‌شده
+بدون جستجو در حافظه رد می‌شود.
+
+- عمر نشست ``DARSBAN_SESSION_TTL`` ثانیه است (پیش‌فرض ۸ ساعت).
+- کلید امضا ``DARSBAN_SESSION_SECRET`` است؛ بدون آن کلید تصادفی هر فرایند
+  استفاده می‌شود (نشست‌ها به هر حال با راه‌اندازی دوباره سرور از بین می‌روند).
+- نشست‌ها با حساب (جدول و شناسه ردیف) کلید می‌خورند؛ با هر تغییر یا حذف
+  حساب (``revoke_account``) همه نشست‌های آن باطل می‌شوند، حتی اگر نام کاربری
+  عوض شده باشد.
+"""
+import base64
+import hashlib
+import hmac
+import json
+import os
+import secrets
+
+from query_cache import QueryCache, make_key
+
+SESSION_TTL = float(os.environ.get("DARSBAN_SESSION_TTL", 8 * 3600))
+MAX_SESSIONS = int(os.environ.get("DARSBAN_MAX_SESSIONS", 10_000))
+_secret = (os.environ.get("DARSBAN_SESSION_SECRET") or "").encode("utf-8") or secrets.token_bytes(32)
+
+sessions = QueryCache(maxsize=MAX_SESSIONS, ttl=SESSION_TTL)
+
+
+def _sign(payload):
+    digest = hmac.new(_secret, payload.encode("ascii"), hashlib.sha256).digest()
+    return base64.urlsafe_b64encode(digest).decode("ascii").rstrip("=")
+
+
+def _account(profile):
+    return {"جدول": "students" if profile["نقش"] == "دانش‌آموز" else "users", "row_id": profile["id"]}
+
+
+def _decode(token):
+    """کلید نشست (حساب و شناسه نشست) از توکن با امضای درست، وگرنه None."""
+    try:
+        payload, signature = token.split(".")
+        if not hmac.compare_digest(_sign(payload), signature):
+            return None
+        data = json.loads(base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4)))
+        return {"جدول": data["t"], "row_id": data["i"], "session_id": data["s"]}
+    except (AttributeError, ValueError, KeyError, TypeError):
+        return None
+
+
+def issue(profile):
+    """ساخت نشست برای نمایه واردشده؛ خروجی توکن امضاشده."""
+    account = _account(profile)
+    session = {**account, "session_id": secrets.token_urlsafe(16)}
+    data = json.dumps({"t": account["جدول"], "i": account["row_id"], "s": session["session_id"]})
+    payload = base64.urlsafe_b64encode(data.encode("ascii")).decode("ascii").rstrip("=")
+    sessions.set(make_key("sessions", "*", session), dict(profile))
+    return f"{payload}.{_sign(payload)}"
+
+
+def resume(token):
+    """نمایه نشست معتبر و منقضی‌نشده، وگرنه None."""
+    session = _decode(token)
+    if session is None:
+        return None
+    profile = sessions.get(make_key("sessions", "*", session))
+    return dict(profile) if profile else None
+
+
+def rotate(token):
+    """(نمایه، توکن تازه) برای نشست معتبر و باطل کردن ``token``، وگرنه (None, None)."""
+    profile = resume(token)
+    if profile is None:
+        return None, None
+    revoke(token)
+    return profile, issue(profile)
+
+
+def revoke(token):
+    """پایان یک نشست (خروج از سامانه)."""
+    session = _decode(token)
+    if session is not None:
+        sessions.invalidate_rows("sessions", [session])
+
+
+def revoke_account(table, row_id):
+    """باطل کردن همه نشست‌های یک حساب (پس از تغییر اطلاعات یا حذف آن)."""
+    sessions.invalidate_rows("sessions", [{"جدول": table, "row_id": row_id}])
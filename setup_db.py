@@ -1,42 +1,240 @@
+import os
 import sqlite3
 
-conn = sqlite3.connect("school.db")
-cursor = conn.cursor()
-
-# جدول کاربران
-cursor.execute("""
-CREATE TABLE IF NOT EXISTS users (
-    نام_کاربر TEXT PRIMARY KEY,
-    رمز_عبور TEXT,
-    نقش TEXT,
-    مدرسه TEXT,
-    وضعیت TEXT DEFAULT 'فعال',
-    تاریخ_انقضا TEXT
-)
-""")
-
-# جدول دانش‌آموزها
-cursor.execute("""
-CREATE TABLE IF NOT EXISTS students (
-    آموزگار TEXT,
-    نام_دانش‌آموز TEXT,
-    رمز_دانش‌آموز TEXT,
-    کلاس TEXT,
-    تاریخ_ثبت TEXT
-)
-""")
-
-# جدول نمرات
-cursor.execute("""
-CREATE TABLE IF NOT EXISTS scores (
-    آموزگار TEXT,
-    نام_دانش‌آموز TEXT,
-    درس TEXT,
-    نمره_شماره TEXT,
-    نمره INTEGER,
-    تاریخ TEXT
-)
-""")
-
-conn.commit()
-conn.close()
+# مسیر پیش‌فرض پایگاه داده محلی (قابل تغییر با متغیر محیطی)
+DB_PATH = os.environ.get("DARSBAN_SQLITE_PATH", "school.db")
+
+SCHEMA = [
+    # جدول مدارس
+    """
+    CREATE TABLE IF NOT EXISTS schools (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        نام_مدرسه TEXT UNIQUE NOT NULL,
+        کد_مدرسه TEXT
+    )
+    """,
+    # جدول کاربران (مدیر سامانه، مدیر مدرسه، معاون، آموزگار)
+    """
+    CREATE TABLE IF NOT EXISTS users (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        نام_کاربر TEXT UNIQUE NOT NULL,
+        رمز_عبور TEXT,
+        نام_کامل TEXT,
+        نقش TEXT,
+        مدرسه TEXT,
+        وضعیت TEXT DEFAULT 'فعال',
+        تاریخ_انقضا TEXT,
+        school_id INTEGER REFERENCES schools(id)
+    )
+    """,
+    # جدول دانش‌آموزها
+    """
+    CREATE TABLE IF NOT EXISTS students (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        student TEXT NOT NULL,
+        نام_کاربر TEXT UNIQUE,
+        رمز_عبور TEXT,
+        پایه TEXT,
+        کلاس TEXT,
+        مدرسه TEXT,
+        آموزگار TEXT,
+        تاریخ_ثبت TEXT,
+        teacher_id INTEGER REFERENCES users(id),
+        school_id INTEGER REFERENCES schools(id)
+    )
+    """,
+    # جدول نمرات
+    """
+    CREATE TABLE IF NOT EXISTS scores (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        student TEXT NOT NULL,
+        درس TEXT NOT NULL,
+        نمره INTEGER,
+        آموزگار TEXT,
+        تاریخ TEXT,
+        teacher_id INTEGER REFERENCES users(id),
+        student_id INTEGER REFERENCES students(id)
+    )
+    """,
+    # جدول تجمیعی نمرات برای هر (آموزگار، دانش‌آموز، درس)
+    """
+    CREATE TABLE IF NOT EXISTS score_rollups (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        teacher_id INTEGER REFERENCES users(id),
+        student_id INTEGER REFERENCES students(id),
+        آموزگار TEXT,
+        student TEXT NOT NULL,
+        درس TEXT NOT NULL,
+        تعداد INTEGER NOT NULL,
+        مجموع REAL NOT NULL,
+        کمینه REAL,
+        بیشینه REAL,
+        آخرین_نمره REAL,
+        تاریخ_آخرین TEXT,
+        UNIQUE ("teacher_id", "student_id", "درس")
+    )
+    """,
+    # فهرست یکپارچه حساب‌ها برای ورود: نام کاربری ← (نقش، جدول، شناسه، هش رمز)
+    """
+    CREATE TABLE IF NOT EXISTS credentials (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        نام_کاربر TEXT UNIQUE NOT NULL,
+        نقش TEXT,
+        جدول TEXT NOT NULL,
+        row_id INTEGER NOT NULL,
+        رمز_هش TEXT
+    )
+    """,
+]
+
+# جدول‌های نسخه اول (مثل data/school.db): users بدون id و ستون‌های با نام قدیمی.
+# این جدول‌ها با طرح فعلی دوباره ساخته و داده‌ها کپی می‌شوند؛ نام قدیمی ← نام فعلی
+LEGACY_TABLES = {
+    "users": {},
+    "students": {"نام_دانش‌آموز": "student", "نام_کاربری": "نام_کاربر", "رمز_دانش‌آموز": "رمز_عبور"},
+    "scores": {"نام_دانش‌آموز": "student"},
+}
+# ستون یکتایی که در داده قدیمی تکراری است؛ فقط اولین ردیف هر مقدار آن را نگه می‌دارد
+LEGACY_UNIQUE = {"students": "نام_کاربر"}
+
+# ستون‌های شناسه برای پایگاه‌هایی که پیش از کلیدهای عددی ساخته شده‌اند
+ID_COLUMNS = [
+    ("users", "school_id", "INTEGER REFERENCES schools(id)"),
+    ("students", "teacher_id", "INTEGER REFERENCES users(id)"),
+    ("students", "school_id", "INTEGER REFERENCES schools(id)"),
+    ("scores", "teacher_id", "INTEGER REFERENCES users(id)"),
+    ("scores", "student_id", "INTEGER REFERENCES students(id)"),
+    ("score_rollups", "teacher_id", "INTEGER REFERENCES users(id)"),
+    ("score_rollups", "student_id", "INTEGER REFERENCES students(id)"),
+]
+
+# پر کردن شناسه‌های خالی از روی نام‌های نمایشی (فقط ردیف‌هایی که شناسه ندارند)
+# در نسخه اول نام_کامل آموزگار خالی بود و نام کاربری او در ستون آموزگار ثبت می‌شد
+_TEACHER_BY_NAME = """COALESCE(
+    (SELECT u.id FROM users u WHERE u."نام_کامل" = {table}."آموزگار" AND u."نقش" = 'آموزگار' ORDER BY u.id LIMIT 1),
+    (SELECT u.id FROM users u WHERE u."نام_کاربر" = {table}."آموزگار" AND u."نقش" = 'آموزگار'))"""
+_STUDENT_BY_NAME = """(SELECT s.id FROM students s WHERE s."student" = {table}."student" AND s."آموزگار" = {table}."آموزگار"
+                      ORDER BY s.id LIMIT 1)"""
+BACKFILL = [
+    # مدارسی که فقط با نام در users آمده‌اند (پایگاه نسخه اول جدول schools نداشت)
+    """INSERT INTO schools ("نام_مدرسه") SELECT DISTINCT "مدرسه" FROM users
+       WHERE school_id IS NULL AND "مدرسه" != '' AND "نقش" != 'مدیر سامانه'
+       AND "مدرسه" NOT IN (SELECT "نام_مدرسه" FROM schools)""",
+    'UPDATE users SET school_id = (SELECT id FROM schools WHERE "نام_مدرسه" = users."مدرسه") WHERE school_id IS NULL',
+    f'UPDATE students SET teacher_id = {_TEACHER_BY_NAME.format(table="students")} WHERE teacher_id IS NULL',
+    'UPDATE students SET school_id = (SELECT id FROM schools WHERE "نام_مدرسه" = students."مدرسه") WHERE school_id IS NULL',
+    # دانش‌آموز بدون نام مدرسه: مدرسه آموزگار او
+    """UPDATE students SET school_id = (SELECT school_id FROM users WHERE id = students.teacher_id),
+       "مدرسه" = COALESCE("مدرسه", (SELECT "مدرسه" FROM users WHERE id = students.teacher_id))
+       WHERE school_id IS NULL""",
+    *(f'UPDATE {table} SET teacher_id = {_TEACHER_BY_NAME.format(table=table)} WHERE teacher_id IS NULL'
+      for table in ("scores", "score_rollups")),
+    *(f'UPDATE {table} SET student_id = {_STUDENT_BY_NAME.format(table=table)} WHERE student_id IS NULL'
+      for table in ("scores", "score_rollups")),
+]
+
+# حساب‌هایی که هنوز در credentials نیستند (مثلاً از نسخه‌های قبلی) با هش خالی
+# فهرست می‌شوند و در اولین ورود موفق هش می‌گیرند؛ در نام تکراری، users مثل قبل مقدم است
+CREDENTIALS_BACKFILL = [
+    """INSERT OR IGNORE INTO credentials ("نام_کاربر", "نقش", "جدول", row_id)
+       SELECT "نام_کاربر", "نقش", 'users', id FROM users
+       WHERE "نام_کاربر" IS NOT NULL AND id NOT IN (SELECT row_id FROM credentials WHERE "جدول" = 'users')""",
+    """INSERT OR IGNORE INTO credentials ("نام_کاربر", "نقش", "جدول", row_id)
+       SELECT "نام_کاربر", 'دانش‌آموز', 'students', id FROM students
+       WHERE "نام_کاربر" IS NOT NULL AND id NOT IN (SELECT row_id FROM credentials WHERE "جدول" = 'students')""",
+]
+
+INDEXES = [
+    # ایندکس‌های قبلی روی نام‌های نمایشی؛ پنل‌ها دیگر با نام فیلتر نمی‌کنند
+    'DROP INDEX IF EXISTS idx_users_school_role',
+    'DROP INDEX IF EXISTS idx_students_teacher_class',
+    'DROP INDEX IF EXISTS idx_students_school',
+    'DROP INDEX IF EXISTS idx_scores_teacher_lesson',
+    'DROP INDEX IF EXISTS idx_scores_student_lesson',
+    'DROP INDEX IF EXISTS idx_rollups_student',
+    # 📇 ایندکس‌ها برای فیلترهای پرتکرار پنل‌ها (همه روی شناسه‌ها)
+    'CREATE INDEX IF NOT EXISTS idx_users_school_id_role ON users (school_id, "نقش")',
+    'CREATE INDEX IF NOT EXISTS idx_students_teacher_id_class ON students (teacher_id, "کلاس")',
+    'CREATE INDEX IF NOT EXISTS idx_students_school_id ON students (school_id)',
+    'CREATE INDEX IF NOT EXISTS idx_scores_teacher_id_lesson ON scores (teacher_id, "درس")',
+    'CREATE INDEX IF NOT EXISTS idx_scores_student_id_lesson ON scores (student_id, "درس")',
+    'CREATE INDEX IF NOT EXISTS idx_rollups_student_id_lesson ON score_rollups (student_id, "درس")',
+    # کلید upsert جدول تجمیعی در پایگاه‌های قدیمی (در جدول تازه همان قید UNIQUE است)
+    'CREATE UNIQUE INDEX IF NOT EXISTS idx_rollups_key ON score_rollups (teacher_id, student_id, "درس")',
+    'CREATE INDEX IF NOT EXISTS idx_credentials_account ON credentials ("جدول", row_id)',
+]
+
+
+def _columns(cursor, table):
+    return [row[1] for row in cursor.execute(f'PRAGMA table_info("{table}")')]
+
+
+def _create_statement(table, name=None):
+    marker = f"CREATE TABLE IF NOT EXISTS {table} ("
+    statement = next(statement for statement in SCHEMA if marker in statement)
+    return statement.replace(marker, f'CREATE TABLE IF NOT EXISTS "{name or table}" (')
+
+
+def upgrade_legacy_tables(conn):
+    """بازسازی جدول‌های نسخه اول با طرح فعلی (پیش از ``migrate_ids``).
+
+    جدول تازه با نام موقت ساخته، ستون‌های هم‌نام (یا تغییرنام‌یافته) کپی و
+    جدول قدیمی حذف می‌شود؛ ردیف‌های users بدون id به ترتیب rowid شناسه می‌گیرند.
+    """
+    cursor = conn.cursor()
+    for table, renames in LEGACY_TABLES.items():
+        existing = _columns(cursor, table)
+        if not existing or ("id" in existing and not set(renames) & set(existing)):
+            continue
+        new_table = f"{table}_upgraded"
+        cursor.execute(f'DROP TABLE IF EXISTS "{new_table}"')
+        cursor.execute(_create_statement(table, new_table))
+        current = _columns(cursor, new_table)
+        targets, sources = [], []
+        for column in existing:
+            target = renames.get(column, column)
+            if target not in current or target in targets:
+                continue
+            source = f'"{column}"'
+            if LEGACY_UNIQUE.get(table) == target:
+                source = (f'CASE WHEN rowid = (SELECT MIN(rowid) FROM "{table}" AS first '
+                          f'WHERE first.{source} = "{table}".{source}) THEN {source} END')
+            targets.append(target)
+            sources.append(source)
+        column_list = ", ".join(f'"{column}"' for column in targets)
+        cursor.execute(f'INSERT INTO "{new_table}" ({column_list}) SELECT {", ".join(sources)} FROM "{table}" ORDER BY rowid')
+        cursor.execute(f'DROP TABLE "{table}"')
+        cursor.execute(f'ALTER TABLE "{new_table}" RENAME TO "{table}"')
+
+
+def migrate_ids(conn):
+    """افزودن ستون‌های شناسه به جدول‌های قدیمی و پر کردن آن‌ها از روی نام‌ها.
+
+    نام‌های نمایشی (``آموزگار``، ``student``، ``مدرسه``) برای نمایش می‌مانند؛
+    فیلترها و پیوندها با شناسه‌ها انجام می‌شوند و با تغییر نام نمی‌شکنند.
+    """
+    cursor = conn.cursor()
+    for table, column, declaration in ID_COLUMNS:
+        if column not in _columns(cursor, table):
+            cursor.execute(f'ALTER TABLE "{table}" ADD COLUMN {column} {declaration}')
+    for statement in BACKFILL:
+        cursor.execute(statement)
+
+
+def create_schema(conn):
+    """ساخت جدول‌ها و ایندکس‌های پایگاه داده محلی (قابل اجرای مکرر)."""
+    cursor = conn.cursor()
+    upgrade_legacy_tables(conn)
+    for statement in SCHEMA:
+        cursor.execute(statement)
+    migrate_ids(conn)
+    for statement in INDEXES + CREDENTIALS_BACKFILL:
+        cursor.execute(statement)
+    conn.commit()
+
+
+if __name__ == "__main__":
+    conn = sqlite3.connect(DB_PATH)
+    conn.execute("PRAGMA journal_mode=WAL")
+    create_schema(conn)
+    conn.close()
@@ -0,0 +1,210 @@
+-- توابع و نماهای سمت Supabase که لایه data_access از آن‌ها استفاده می‌کند.
+-- این فایل را یک بار در SQL Editor پروژه Supabase اجرا کنید.
+
+-- 🔑 کلیدهای عددی به جای نام‌های نمایشی: فیلترها و پیوندها با شناسه‌ها انجام می‌شوند
+-- و با ویرایش نام آموزگار، دانش‌آموز یا مدرسه نمی‌شکنند. ستون‌های نام برای نمایش می‌مانند.
+alter table users add column if not exists school_id bigint references schools(id);
+alter table students add column if not exists teacher_id bigint references users(id);
+alter table students add column if not exists school_id bigint references schools(id);
+alter table scores add column if not exists teacher_id bigint references users(id);
+alter table scores add column if not exists student_id bigint references students(id);
+
+-- پر کردن شناسه‌های ردیف‌های قبلی از روی نام‌ها (قابل اجرای مکرر)
+update users u set school_id = sch.id
+from schools sch where u.school_id is null and sch."نام_مدرسه" = u."مدرسه";
+update students s set school_id = sch.id
+from schools sch where s.school_id is null and sch."نام_مدرسه" = s."مدرسه";
+update students s set teacher_id = (
+    select u.id from users u where u."نام_کامل" = s."آموزگار" and u."نقش" = 'آموزگار' order by u.id limit 1
+) where s.teacher_id is null;
+update scores sc set teacher_id = (
+    select u.id from users u where u."نام_کامل" = sc."آموزگار" and u."نقش" = 'آموزگار' order by u.id limit 1
+) where sc.teacher_id is null;
+update scores sc set student_id = (
+    select s.id from students s where s.student = sc.student and s."آموزگار" = sc."آموزگار" order by s.id limit 1
+) where sc.student_id is null;
+
+drop index if exists idx_scores_teacher_lesson;
+drop index if exists idx_students_teacher_class;
+create index if not exists idx_scores_teacher_id_lesson on scores (teacher_id, "درس");
+create index if not exists idx_scores_student_id_lesson on scores (student_id, "درس");
+create index if not exists idx_students_teacher_id_class on students (teacher_id, "کلاس");
+
+-- میانگین هر درس در یک کلاس (پنل دانش‌آموز - آمار کلی)
+drop function if exists class_lesson_averages(text, text);
+create or replace function class_lesson_averages(p_teacher_id bigint, p_class text)
+returns table ("درس" text, "میانگین کلاس" numeric)
+language sql stable as $$
+    select sc."درس", avg(sc."نمره")
+    from scores sc
+    join students s on s.id = sc.student_id
+    where sc.teacher_id = p_teacher_id and s."کلاس" = p_class
+    group by sc."درس";
+$$;
+
+-- جدول تجمیعی نمرات؛ add_score/update_score/delete_score آن را با توابع rollup_* (پایین‌تر) به‌روز می‌کنند.
+-- برای داده‌های قبلی یک بار `python rollups.py` را اجرا کنید.
+create table if not exists score_rollups (
+    id bigint generated always as identity primary key,
+    teacher_id bigint references users(id),
+    student_id bigint references students(id),
+    "آموزگار" text,
+    student text not null,
+    "درس" text not null,
+    "تعداد" integer not null,
+    "مجموع" numeric not null,
+    "کمینه" numeric,
+    "بیشینه" numeric,
+    "آخرین_نمره" numeric,
+    "تاریخ_آخرین" text,
+    unique (teacher_id, student_id, "درس")
+);
+-- جدول‌های تجمیعی ساخته‌شده پیش از کلیدهای عددی: افزودن شناسه‌ها و کلید upsert تازه
+alter table score_rollups add column if not exists teacher_id bigint references users(id);
+alter table score_rollups add column if not exists student_id bigint references students(id);
+update score_rollups r set teacher_id = sc.teacher_id, student_id = sc.student_id
+from scores sc
+where r.teacher_id is null and sc."آموزگار" = r."آموزگار" and sc.student = r.student and sc."درس" = r."درس";
+alter table score_rollups drop constraint if exists "score_rollups_آموزگار_student_درس_key";
+create unique index if not exists idx_rollups_key on score_rollups (teacher_id, student_id, "درس");
+drop index if exists idx_rollups_student;
+create index if not exists idx_rollups_student_id_lesson on score_rollups (student_id, "درس");
+
+-- نگه‌داری جدول تجمیعی با یک دستور اتمی برای هر گروه (معادل دستورهای SQLite در data_access.py)؛
+-- دو نوشتن هم‌زمان روی یک (دانش‌آموز، درس) هیچ‌کدام گم نمی‌شود.
+-- افزودن سهم یک دسته نمره به هر گروه (p_rows: فهرست ردیف‌های تجمیعی ساخته‌شده از نمرات جدید)
+create or replace function rollup_add(p_rows jsonb)
+returns void
+language sql as $$
+    insert into score_rollups as r (teacher_id, student_id, "درس", "آموزگار", student,
+                                    "تعداد", "مجموع", "کمینه", "بیشینه", "آخرین_نمره", "تاریخ_آخرین")
+    select (d->>'teacher_id')::bigint, (d->>'student_id')::bigint, d->>'درس', d->>'آموزگار', d->>'student',
+           (d->>'تعداد')::integer, (d->>'مجموع')::numeric, (d->>'کمینه')::numeric, (d->>'بیشینه')::numeric,
+           (d->>'آخرین_نمره')::numeric, d->>'تاریخ_آخرین'
+    from jsonb_array_elements(p_rows) d
+    on conflict (teacher_id, student_id, "درس") do update set
+        "تعداد" = r."تعداد" + excluded."تعداد",
+        "مجموع" = r."مجموع" + excluded."مجموع",
+        "کمینه" = least(r."کمینه", excluded."کمینه"),
+        "بیشینه" = greatest(r."بیشینه", excluded."بیشینه"),
+        "آخرین_نمره" = case when coalesce(excluded."تاریخ_آخرین", '') >= coalesce(r."تاریخ_آخرین", '')
+                            then excluded."آخرین_نمره" else r."آخرین_نمره" end,
+        "تاریخ_آخرین" = case when coalesce(excluded."تاریخ_آخرین", '') >= coalesce(r."تاریخ_آخرین", '')
+                             then excluded."تاریخ_آخرین" else r."تاریخ_آخرین" end;
+$$;
+
+-- ویرایش یک نمره؛ false یعنی نمره قبلی کمینه، بیشینه یا شاید آخرین نمره بوده و گروه باید بازسازی شود
+create or replace function rollup_change(p_teacher_id bigint, p_student_id bigint, p_lesson text,
+                                         p_old numeric, p_old_date text, p_new numeric)
+returns boolean
+language sql as $$
+    with changed as (
+        update score_rollups set
+            "مجموع" = "مجموع" + p_new - p_old,
+            "کمینه" = case when "تعداد" = 1 then p_new else least("کمینه", p_new) end,
+            "بیشینه" = case when "تعداد" = 1 then p_new else greatest("بیشینه", p_new) end,
+            "آخرین_نمره" = case when "تعداد" = 1 then p_new else "آخرین_نمره" end
+        where teacher_id = p_teacher_id and student_id = p_student_id and "درس" = p_lesson
+          and ("تعداد" = 1 or (p_old > "کمینه" and p_old < "بیشینه"
+               and not ("تاریخ_آخرین" is not distinct from p_old_date and "آخرین_نمره" = p_old)))
+        returning id
+    )
+    select exists (select 1 from changed);
+$$;
+
+-- حذف یک نمره؛ false یعنی گروه باید بازسازی شود
+create or replace function rollup_remove(p_teacher_id bigint, p_student_id bigint, p_lesson text,
+                                         p_old numeric, p_old_date text)
+returns boolean
+language sql as $$
+    with changed as (
+        update score_rollups set "تعداد" = "تعداد" - 1, "مجموع" = "مجموع" - p_old
+        where teacher_id = p_teacher_id and student_id = p_student_id and "درس" = p_lesson and "تعداد" > 1
+          and p_old > "کمینه" and p_old < "بیشینه" and "تاریخ_آخرین" is distinct from p_old_date
+        returning id
+    )
+    select exists (select 1 from changed);
+$$;
+
+-- بازسازی یک گروه از روی نمرات آن (و حذف ردیف اگر نمره‌ای نمانده باشد)
+create or replace function rollup_refresh(p_teacher_id bigint, p_student_id bigint, p_lesson text)
+returns void
+language sql as $$
+    delete from score_rollups r
+    where r.teacher_id = p_teacher_id and r.student_id = p_student_id and r."درس" = p_lesson
+      and not exists (select 1 from scores sc where sc.teacher_id = p_teacher_id and sc.student_id = p_student_id
+                      and sc."درس" = p_lesson and sc."نمره" is not null);
+    with grp as (
+        select * from scores
+        where teacher_id = p_teacher_id and student_id = p_student_id and "درس" = p_lesson and "نمره" is not null
+    ), last as (
+        select * from grp order by coalesce("تاریخ"::text, '') desc, id desc limit 1
+    )
+    insert into score_rollups (teacher_id, student_id, "درس", "آموزگار", student,
+                               "تعداد", "مجموع", "کمینه", "بیشینه", "آخرین_نمره", "تاریخ_آخرین")
+    select p_teacher_id, p_student_id, p_lesson, last."آموزگار", last.student,
+           (select count(*) from grp), (select sum("نمره") from grp), (select min("نمره") from grp),
+           (select max("نمره") from grp), last."نمره", last."تاریخ"::text
+    from last
+    on conflict (teacher_id, student_id, "درس") do update set
+        "تعداد" = excluded."تعداد", "مجموع" = excluded."مجموع", "کمینه" = excluded."کمینه",
+        "بیشینه" = excluded."بیشینه", "آخرین_نمره" = excluded."آخرین_نمره", "تاریخ_آخرین" = excluded."تاریخ_آخرین";
+$$;
+
+-- آمار کلی یک مدرسه (یا کل سامانه با p_school_id = null) در یک فراخوانی؛
+-- آموزگار فعال: آموزگاری که از تاریخ p_since به بعد نمره ثبت کرده است.
+drop function if exists school_overview(text, text);
+create or replace function school_overview(p_school_id bigint, p_since text)
+returns json
+language sql stable as $$
+    with school_scores as (
+        select sc.*
+        from scores sc
+        join users u on u.id = sc.teacher_id
+        where p_school_id is null or u.school_id = p_school_id
+    )
+    select json_build_object(
+        'مدارس', (select count(*) from schools where p_school_id is null or id = p_school_id),
+        'کاربران', (select count(*) from users where p_school_id is null or school_id = p_school_id),
+        'آموزگاران', (select count(*) from users where "نقش" = 'آموزگار' and (p_school_id is null or school_id = p_school_id)),
+        'دانش‌آموزان', (select count(*) from students where p_school_id is null or school_id = p_school_id),
+        'نمرات', (select count(*) from school_scores),
+        'آموزگاران فعال', (select count(distinct teacher_id) from school_scores where "تاریخ"::text >= p_since),
+        'پایه‌ها', coalesce((
+            select json_agg(g order by g."پایه")
+            from (
+                select s."پایه", count(distinct s.id) as "دانش‌آموزان",
+                       count(sc.id) as "نمرات", round(avg(sc."نمره"), 2) as "میانگین"
+                from students s
+                left join scores sc on sc.student_id = s.id
+                where p_school_id is null or s.school_id = p_school_id
+                group by s."پایه"
+            ) g
+        ), '[]'::json)
+    );
+$$;
+
+drop index if exists idx_users_school_role;
+drop index if exists idx_students_school;
+create index if not exists idx_users_school_id_role on users (school_id, "نقش");
+create index if not exists idx_students_school_id on students (school_id);
+
+-- 🔐 فهرست یکپارچه حساب‌ها برای ورود (نام کاربری ← نقش، جدول، شناسه، هش رمز)؛
+-- هش‌ها در برنامه (auth.py) با PBKDF2 ساخته می‌شوند. حساب‌های قبلی با هش خالی
+-- فهرست می‌شوند و در اولین ورود موفق (یا با `python auth.py`) هش می‌گیرند.
+create table if not exists credentials (
+    id bigint generated always as identity primary key,
+    "نام_کاربر" text unique not null,
+    "نقش" text,
+    "جدول" text not null,
+    row_id bigint not null,
+    "رمز_هش" text
+);
+create index if not exists idx_credentials_account on credentials ("جدول", row_id);
+
+insert into credentials ("نام_کاربر", "نقش", "جدول", row_id)
+select "نام_کاربر", "نقش", 'users', id from users where "نام_کاربر" is not null
+on conflict ("نام_کاربر") do nothing;
+insert into credentials ("نام_کاربر", "نقش", "جدول", row_id)
+select "نام_کاربر", 'دانش‌آموز', 'students', id from students where "نام_کاربر" is not null
+on conflict ("نام_کاربر") do nothing;
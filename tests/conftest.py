@@ -0,0 +1,40 @@
+"""تنظیمات مشترک آزمون‌ها: ماژول‌های ریشه مخزن و پایگاه SQLite موقت.
+
+همه آزمون‌ها بدون شبکه روی پشتیبان SQLite اجرا می‌شوند:
+    python -m pytest
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import data_access  # noqa: E402
+from query_cache import query_cache  # noqa: E402
+
+
+class FakeClock:
+    """ساعت ساختگی برای ``clock=`` حافظه‌های نهان و محدودکننده‌ها؛ زمان با ``now`` جلو می‌رود."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def sqlite_db(tmp_path):
+    """پشتیبان SQLite تازه با طرح کامل ``setup_db`` برای یک آزمون."""
+    previous = data_access._backend
+    backend = data_access.SQLiteBackend(str(tmp_path / "test.db"))
+    data_access.set_backend(backend)
+    yield backend
+    data_access.set_backend(previous)
+    query_cache.clear()
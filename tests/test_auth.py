@@ -0,0 +1,140 @@
+"""هش رمز، ارتقای هزینه هش، ورود حساب‌های قدیمی و حافظه تلاش‌های ناموفق."""
+import sqlite3
+
+import pytest
+
+import auth
+import data_access
+
+
+@pytest.fixture(autouse=True)
+def cheap_hashes(monkeypatch):
+    # هزینه کم برای سرعت آزمون‌ها؛ هش ثابت نام کاربری ناموجود هم با همین هزینه ساخته می‌شود
+    monkeypatch.setattr(auth, "PASSWORD_ITERATIONS", 1000)
+    monkeypatch.setattr(auth, "_dummy_hash", None)
+    auth.failed_logins.clear()
+    yield
+    auth.failed_logins.clear()
+
+
+def _hash(username):
+    return data_access.fetch_rows("credentials", "رمز_هش", {"نام_کاربر": username}, cached=False)[0]["رمز_هش"]
+
+
+def test_hash_and_verify_password():
+    encoded = auth.hash_password("رمز-۱۲۳۴")
+    algorithm, iterations, salt, _ = encoded.split("$")
+    assert (algorithm, iterations) == ("pbkdf2_sha256", "1000")
+    assert auth.verify_password("رمز-۱۲۳۴", encoded)
+    assert not auth.verify_password("رمز-۱۲۳۵", encoded)
+    # نمک تصادفی: دو هش یک رمز یکسان نیستند
+    assert auth.hash_password("رمز-۱۲۳۴") != encoded
+
+
+@pytest.mark.parametrize("encoded", [None, "", "plain", "md5$1$salt$digest", "pbkdf2_sha256$1000$salt"])
+def test_verify_rejects_malformed_hashes(encoded):
+    assert not auth.verify_password("1234", encoded)
+
+
+def test_needs_rehash_follows_configured_iterations(monkeypatch):
+    encoded = auth.hash_password("1234", iterations=500)
+    assert auth.needs_rehash(encoded)
+    assert not auth.needs_rehash(auth.hash_password("1234"))
+    monkeypatch.setattr(auth, "PASSWORD_ITERATIONS", 500)
+    assert not auth.needs_rehash(encoded)
+
+
+def test_login_rehashes_outdated_hash(sqlite_db):
+    auth.add_account("users", {"نام_کاربر": "teacher1", "نقش": "آموزگار",
+                               "رمز_هش": auth.hash_password("1111", iterations=500)})
+    profile = auth.authenticate("teacher1", "1111")
+    assert profile["نام_کاربر"] == "teacher1"
+    assert _hash("teacher1").split("$")[1] == "1000"
+    assert auth.authenticate("teacher1", "1111")["id"] == profile["id"]
+
+
+def test_add_account_never_stores_plain_password(sqlite_db):
+    student = auth.add_account("students", {"student": "علی", "نام_کاربر": "ali", "رمز_عبور": "9876"})
+    row = data_access.fetch_rows("students", "رمز_عبور", {"id": student["id"]}, cached=False)[0]
+    assert row["رمز_عبور"] is None
+    assert auth.verify_password("9876", _hash("ali"))
+    assert auth.authenticate("ali", "9876")["student"] == "علی"
+
+
+def test_duplicate_username_is_rejected(sqlite_db):
+    auth.add_account("users", {"نام_کاربر": "ali", "نقش": "آموزگار", "رمز_عبور": "1"})
+    with pytest.raises(ValueError):
+        auth.add_account("students", {"student": "علی", "نام_کاربر": "ali", "رمز_عبور": "2"})
+
+
+def test_legacy_plaintext_account_is_upgraded(sqlite_db):
+    user = data_access.insert_rows("users", {"نام_کاربر": "old", "رمز_عبور": "1385", "نقش": "معاون"})[0]
+    data_access.insert_rows("credentials", {"نام_کاربر": "old", "نقش": "معاون", "جدول": "users",
+                                            "row_id": user["id"], "رمز_هش": None})
+    assert auth.authenticate("old", "wrong") is None
+    assert auth.authenticate("old", "1385")["id"] == user["id"]
+    assert data_access.fetch_rows("users", "رمز_عبور", {"id": user["id"]}, cached=False)[0]["رمز_عبور"] is None
+    assert auth.verify_password("1385", _hash("old"))
+    assert auth.authenticate("old", "1385")["id"] == user["id"]
+
+
+def test_repeated_failure_is_answered_from_cache(sqlite_db, monkeypatch):
+    auth.add_account("users", {"نام_کاربر": "teacher1", "نقش": "آموزگار", "رمز_عبور": "1111"})
+    assert auth.authenticate("teacher1", "0000") is None
+    assert auth.authenticate("nobody", "0000") is None
+
+    reads = []
+    monkeypatch.setattr(auth, "fetch_rows", lambda *args, **kwargs: reads.append(args) or [])
+    assert auth.authenticate("teacher1", "0000") is None
+    assert auth.authenticate("nobody", "0000") is None
+    assert not reads
+    # رمز دیگر (از جمله رمز درست) از حافظه رد نمی‌شود
+    monkeypatch.setattr(auth, "fetch_rows", data_access.fetch_rows)
+    assert auth.authenticate("teacher1", "1111")["نام_کاربر"] == "teacher1"
+
+
+def test_password_change_forgets_failures(sqlite_db):
+    user = auth.add_account("users", {"نام_کاربر": "teacher1", "نقش": "آموزگار", "رمز_عبور": "1111"})
+    assert auth.authenticate("teacher1", "2222") is None
+    auth.update_account("users", {"رمز_عبور": "2222"}, {"id": user["id"]})
+    assert auth.authenticate("teacher1", "2222")["id"] == user["id"]
+    assert auth.authenticate("teacher1", "1111") is None
+
+
+def test_failed_credentials_insert_leaves_no_account(sqlite_db, monkeypatch):
+    # مسابقه با درج هم‌زمان: بررسی تکراری نبودن چیزی نمی‌بیند ولی درج credentials شکست می‌خورد
+    auth.add_account("users", {"نام_کاربر": "ali", "نقش": "آموزگار", "رمز_عبور": "1"})
+    monkeypatch.setattr(auth, "fetch_rows", lambda *args, **kwargs: [])
+    with pytest.raises(sqlite3.IntegrityError):
+        auth.add_accounts("students", [{"student": "سارا", "نام_کاربر": "sara", "رمز_عبور": "2"},
+                                       {"student": "علی", "نام_کاربر": "ali", "رمز_عبور": "3"}])
+    assert data_access.count_rows("students") == 0
+    assert data_access.count_rows("credentials") == 1
+
+
+def test_supabase_removes_accounts_when_credentials_insert_fails():
+    class FakeSupabase(data_access.SupabaseBackend):
+        def __init__(self):
+            self.deleted = []
+
+        def insert(self, table, rows):
+            if table == "credentials":
+                raise RuntimeError("duplicate key")
+            return [{**row, "id": i} for i, row in enumerate(rows, start=1)]
+
+        def delete(self, table, filters):
+            self.deleted.append((table, filters))
+            return []
+
+    backend = FakeSupabase()
+    with pytest.raises(RuntimeError):
+        backend.insert_linked("students", [{"نام_کاربر": "a"}, {"نام_کاربر": "b"}], "credentials", dict)
+    assert backend.deleted == [("students", {"id": [1, 2]})]
+
+
+def test_chunk_passwords_are_hashed_per_row(sqlite_db):
+    rows = [{"student": f"s{i}", "نام_کاربر": f"s{i}", "رمز_عبور": "1385"} for i in range(6)]
+    auth.add_accounts("students", rows)
+    hashes = [_hash(f"s{i}") for i in range(6)]
+    assert len(set(hashes)) == 6
+    assert all(auth.verify_password("1385", encoded) for encoded in hashes)
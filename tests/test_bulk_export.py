@@ -0,0 +1,54 @@
+"""انتخاب دانش‌آموزان خروجی گروهی کارنامه‌ها با پایه و کلاس."""
+import pytest
+
+import bulk_export
+from data_access import insert_rows
+
+
+@pytest.fixture
+def school(sqlite_db):
+    """یک مدرسه با کلاس «الف» در دو پایه و یک نمره برای هر دانش‌آموز."""
+    school_id = insert_rows("schools", [{"نام_مدرسه": "نمونه"}])[0]["id"]
+    teacher_id = insert_rows("users", [{"نام_کاربر": "t", "نقش": "آموزگار", "school_id": school_id}])[0]["id"]
+    students = insert_rows("students", [
+        {"student": name, "نام_کاربر": name, "پایه": grade, "کلاس": class_name,
+         "teacher_id": teacher_id, "school_id": school_id}
+        for name, grade, class_name in [("علی", "دوم", "الف"), ("سارا", "سوم", "الف"), ("مبینا", "سوم", "ب")]
+    ])
+    insert_rows("scores", [
+        {"student": row["student"], "student_id": row["id"], "teacher_id": teacher_id,
+         "درس": "ریاضی", "نمره": 3, "تاریخ": "1403/07/01"}
+        for row in students
+    ])
+    return school_id
+
+
+def _names(jobs):
+    return sorted(meta["نام"] for _, meta, _, _ in jobs)
+
+
+@pytest.mark.parametrize("class_name, grade, expected", [
+    (None, None, ["سارا", "علی", "مبینا"]),
+    ("الف", None, ["سارا", "علی"]),
+    (None, "سوم", ["سارا", "مبینا"]),
+    ("الف", "سوم", ["سارا"]),
+])
+def test_collect_report_jobs_filters_on_grade_and_class(school, class_name, grade, expected):
+    assert _names(bulk_export.collect_report_jobs(school, class_name, grade)) == expected
+
+
+def test_report_files_are_grouped_by_grade_and_class(school):
+    filenames = sorted(job[0] for job in bulk_export.collect_report_jobs(school))
+    assert filenames == ["دوم/الف/علی_علی.pdf", "سوم/الف/سارا_سارا.pdf", "سوم/ب/مبینا_مبینا.pdf"]
+
+
+@pytest.mark.parametrize("class_name, grade", [(None, None), ("الف", None), (None, "سوم")])
+def test_merged_pdf_needs_grade_and_class(school, tmp_path, class_name, grade):
+    with pytest.raises(ValueError):
+        bulk_export.export_merged_pdf(school, tmp_path / "out.pdf", class_name, grade)
+
+
+def test_cli_rejects_class_without_grade(capsys):
+    with pytest.raises(SystemExit):
+        bulk_export.main(["--school", "نمونه", "--class", "الف", "--output", "out.zip"])
+    assert "--grade" in capsys.readouterr().err
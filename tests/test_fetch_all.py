@@ -0,0 +1,68 @@
+"""خواندن کامل جدول با fetch_all: تقسیم بازه کلیدها بین چند رشته."""
+import pytest
+
+import data_access
+
+# شناسه‌های با فاصله نامنظم تا بازه‌ها تعداد ردیف برابر نداشته باشند
+IDS = [i for i in range(1, 400) if i % 3 and i % 7] + [1000, 1500]
+
+
+@pytest.fixture
+def scores(sqlite_db):
+    data_access.insert_rows("scores", [
+        {"id": i, "student": f"s{i}", "درس": "ریاضی" if i % 2 else "علوم", "نمره": i % 4 + 1, "teacher_id": i % 5}
+        for i in IDS
+    ])
+    return sqlite_db
+
+
+@pytest.fixture
+def selects(scores, monkeypatch):
+    calls = []
+    select = scores.select
+
+    def spy(table, columns="*", filters=None, order_by=None, limit=None, after=None, until=None):
+        calls.append((after, until))
+        return select(table, columns, filters, order_by, limit, after, until)
+
+    monkeypatch.setattr(scores, "select", spy)
+    return calls
+
+
+def test_ranges_cover_all_rows_in_order(selects, monkeypatch):
+    monkeypatch.setattr(data_access, "FETCH_WORKERS", 4)
+    rows = data_access.fetch_all("scores", "id, student", page_size=20)
+    assert [row["id"] for row in rows] == IDS
+    assert rows[0] == {"id": IDS[0], "student": f"s{IDS[0]}"}
+    ranges = {(after, until) for after, until in selects if until is not None}
+    # چهار بازه پیوسته از آخرین شناسه صفحه اول تا بزرگ‌ترین شناسه
+    assert len({until for _, until in ranges}) == 4
+    assert max(until for _, until in ranges) == IDS[-1]
+
+
+def test_key_is_stripped_when_not_requested(selects, monkeypatch):
+    monkeypatch.setattr(data_access, "FETCH_WORKERS", 3)
+    rows = data_access.fetch_all("scores", "student", page_size=25)
+    assert [row["student"] for row in rows] == [f"s{i}" for i in IDS]
+    assert all(set(row) == {"student"} for row in rows)
+
+
+def test_filters_apply_to_every_range(selects, monkeypatch):
+    monkeypatch.setattr(data_access, "FETCH_WORKERS", 4)
+    rows = data_access.fetch_all("scores", "id, درس", {"درس": "ریاضی", "teacher_id": [1, 2]}, page_size=10)
+    expected = [i for i in IDS if i % 2 and i % 5 in (1, 2)]
+    assert [row["id"] for row in rows] == expected
+    assert any(until is not None for _, until in selects)
+
+
+def test_single_worker_reads_pages_serially(selects, monkeypatch):
+    monkeypatch.setattr(data_access, "FETCH_WORKERS", 1)
+    rows = data_access.fetch_all("scores", page_size=50)
+    assert [row["id"] for row in rows] == IDS
+    assert all(until is None for _, until in selects)
+
+
+def test_small_table_is_one_read(selects):
+    rows = data_access.fetch_all("scores", "id", page_size=len(IDS) + 1)
+    assert len(rows) == len(IDS)
+    assert selects == [(None, None)]
@@ -0,0 +1,83 @@
+"""سطح‌بندی عملکرد: مرزهای مقیاس پیش‌فرض و مقیاس اختصاصی مدرسه از فایل JSON."""
+import json
+import math
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import grading
+from grading import DEFAULT_SCALE, UNKNOWN, GradingScale
+
+LOW, FAIR, GOOD, EXCELLENT = DEFAULT_SCALE.labels
+
+
+@pytest.fixture
+def school_scales(tmp_path, monkeypatch):
+    """نوشتن فایل مقیاس مدارس و خواندن دوباره آن (حافظه نهان ``_school_scales`` خالی می‌شود)."""
+    def write(config):
+        path = tmp_path / "scales.json"
+        path.write_text(json.dumps(config, ensure_ascii=False), encoding="utf-8")
+        monkeypatch.setenv("DARSBAN_GRADING_SCALES", str(path))
+        grading._school_scales.cache_clear()
+
+    yield write
+    grading._school_scales.cache_clear()
+
+
+@pytest.mark.parametrize("score, level", [
+    (1, LOW),
+    (np.nextafter(1.5, 0), LOW),
+    (1.5, FAIR),
+    (np.nextafter(2.5, 0), FAIR),
+    (2.5, GOOD),
+    (np.nextafter(3.5, 0), GOOD),
+    (3.5, EXCELLENT),
+    (4, EXCELLENT),
+    (math.nan, UNKNOWN),
+    (None, UNKNOWN),
+    ("نمره", UNKNOWN),
+])
+def test_default_scale_boundaries(score, level):
+    assert DEFAULT_SCALE.categorize_one(score) == level
+
+
+def test_categorize_keeps_index_and_level_order():
+    scores = pd.Series([3.5, 1.49, float("nan"), 2.5], index=[10, 11, 12, 13])
+    levels = DEFAULT_SCALE.categorize(scores)
+    assert list(levels.index) == [10, 11, 12, 13]
+    assert list(levels) == [EXCELLENT, LOW, UNKNOWN, GOOD]
+    assert list(levels.cat.categories) == DEFAULT_SCALE.labels + [UNKNOWN]
+    assert dict(DEFAULT_SCALE.level_counts(levels)) == {LOW: 1, GOOD: 1, EXCELLENT: 1, UNKNOWN: 1}
+
+
+def test_school_scale_is_loaded_from_json(school_scales):
+    school_scales({"نمونه": {"مرزها": [2, 3], "سطوح": ["ضعیف", "متوسط", "عالی"]}})
+    scale = grading.scale_for("نمونه")
+    assert scale.labels == ["ضعیف", "متوسط", "عالی"]
+    assert list(scale.categorize([1.99, 2, 2.99, 3, math.nan])) == ["ضعیف", "متوسط", "متوسط", "عالی", UNKNOWN]
+    # مدرسه بدون مقیاس اختصاصی و حالت بدون مدرسه مقیاس پیش‌فرض را می‌گیرند
+    assert grading.scale_for("دیگر") is DEFAULT_SCALE
+    assert grading.scale_for() is DEFAULT_SCALE
+
+
+def test_without_scales_file_every_school_uses_default(monkeypatch):
+    monkeypatch.delenv("DARSBAN_GRADING_SCALES", raising=False)
+    grading._school_scales.cache_clear()
+    assert grading.scale_for("نمونه") is DEFAULT_SCALE
+    grading._school_scales.cache_clear()
+
+
+@pytest.mark.parametrize("thresholds, labels", [
+    ([1.5, 2.5], ["a", "b"]),
+    ([2.5, 1.5], ["a", "b", "c"]),
+])
+def test_invalid_scale_is_rejected(thresholds, labels):
+    with pytest.raises(ValueError):
+        GradingScale(thresholds, labels)
+
+
+def test_invalid_scale_in_json_is_rejected(school_scales):
+    school_scales({"نمونه": {"مرزها": [3, 2], "سطوح": ["a", "b", "c"]}})
+    with pytest.raises(ValueError):
+        grading.scale_for("نمونه")
@@ -0,0 +1,179 @@
+"""ورود گروهی از CSV و XLSX: ترتیب ستون‌ها، ردیف‌های خالی یا نادرست، دسته‌ها و نام کاربری تکراری."""
+import csv
+import datetime
+import io
+
+import pytest
+from openpyxl import Workbook
+
+import auth
+import importer
+from data_access import fetch_rows, insert_rows
+
+FORMATS = ["csv", "xlsx"]
+STUDENT_HEADER = ["student", "نام_کاربر", "رمز_عبور", "پایه", "کلاس"]
+
+
+@pytest.fixture(autouse=True)
+def cheap_hashes(monkeypatch):
+    monkeypatch.setattr(auth, "PASSWORD_ITERATIONS", 1000)
+
+
+@pytest.fixture
+def teacher(sqlite_db):
+    school_id = insert_rows("schools", [{"نام_مدرسه": "نمونه"}])[0]["id"]
+    row = insert_rows("users", [{"نام_کاربر": "t", "نام_کامل": "آموزگار", "نقش": "آموزگار",
+                                 "مدرسه": "نمونه", "school_id": school_id}])[0]
+    return {"id": row["id"], "نام_کامل": "آموزگار", "مدرسه": "نمونه", "school_id": school_id}
+
+
+def _file(kind, rows):
+    """فایل درون حافظه با ردیف اول سرستون؛ ``None`` در CSV سلول خالی است."""
+    buffer = io.BytesIO()
+    if kind == "csv":
+        text = io.StringIO()
+        csv.writer(text).writerows([["" if v is None else v for v in row] for row in rows])
+        buffer.write(text.getvalue().encode("utf-8-sig"))
+    else:
+        workbook = Workbook()
+        for row in rows:
+            workbook.active.append(row)
+        workbook.save(buffer)
+    buffer.seek(0)
+    return buffer, f"data.{kind}"
+
+
+def _student(i, **overrides):
+    return {"student": f"دانش‌آموز {i}", "نام_کاربر": f"s{i}", "رمز_عبور": "1385", "پایه": "سوم", "کلاس": "الف",
+            **overrides}
+
+
+def _student_rows(students, header=STUDENT_HEADER):
+    return [header] + [[s[importer._normalize_header(h)] for h in header] for s in students]
+
+
+def _usernames(teacher):
+    return sorted(row["نام_کاربر"] for row in fetch_rows("students", "نام_کاربر", {"teacher_id": teacher["id"]},
+                                                          cached=False))
+
+
+# -------------------------------
+# دانش‌آموزان
+# -------------------------------
+
+@pytest.mark.parametrize("kind", FORMATS)
+def test_students_header_in_other_order_with_aliases(teacher, kind):
+    header = ["کلاس", "username", "رمز", "نام دانش‌آموز", "پایه"]
+    report = importer.import_students(*_file(kind, _student_rows([_student(1), _student(2)], header)), teacher)
+    assert report == {"inserted": 2, "errors": []}
+    rows = fetch_rows("students", "student, نام_کاربر, پایه, کلاس, teacher_id", {"نام_کاربر": "s1"}, cached=False)
+    assert rows == [{"student": "دانش‌آموز 1", "نام_کاربر": "s1", "پایه": "سوم", "کلاس": "الف",
+                     "teacher_id": teacher["id"]}]
+    assert auth.authenticate("s2", "1385")["نام_کاربر"] == "s2"
+
+
+@pytest.mark.parametrize("kind", FORMATS)
+def test_blank_and_malformed_student_rows_are_reported(teacher, kind):
+    rows = _student_rows([_student(1)]) + [
+        [None] * 5,                                  # ردیف ۳: کاملاً خالی، نادیده گرفته می‌شود
+        ["بی‌پایه", "s4", "1385", None, "الف"],       # ردیف ۴: پایه خالی
+        ["کوتاه", "s5"],                             # ردیف ۵: ستون‌های کم
+    ] + _student_rows([_student(6)])[1:]
+    report = importer.import_students(*_file(kind, rows), teacher)
+    assert report["inserted"] == 2
+    assert [(number, message.split(":")[0]) for number, message in report["errors"]] == [
+        (4, "ستون‌های خالی"), (5, "ستون‌های خالی"),
+    ]
+    assert "رمز_عبور" in report["errors"][1][1] and "کلاس" in report["errors"][1][1]
+    assert _usernames(teacher) == ["s1", "s6"]
+
+
+@pytest.mark.parametrize("kind", FORMATS)
+def test_duplicate_usernames_in_file_and_database(teacher, kind):
+    auth.add_accounts("students", [{**_student(0, نام_کاربر="taken"), "teacher_id": teacher["id"]}])
+    students = [_student(1), _student(2, نام_کاربر="s1"), _student(3, نام_کاربر="taken"), _student(4),
+                _student(5, نام_کاربر="s1")]
+    # مرز دسته‌ها: تکرار در دسته بعدی هم شناخته می‌شود
+    report = importer.import_students(*_file(kind, _student_rows(students)), teacher, chunk_size=2)
+    assert report["inserted"] == 2
+    assert report["errors"] == [
+        (3, "نام کاربری تکراری در فایل: s1"),
+        (4, "نام کاربری از قبل ثبت شده است: taken"),
+        (6, "نام کاربری تکراری در فایل: s1"),
+    ]
+    assert _usernames(teacher) == ["s1", "s4", "taken"]
+
+
+@pytest.mark.parametrize("kind", FORMATS)
+@pytest.mark.parametrize("count, chunk_size, expected", [
+    (4, 2, [2, 4]),
+    (5, 2, [2, 4, 5]),
+    (3, 5, [3]),
+    (1, 1, [1]),
+])
+def test_students_are_inserted_chunk_by_chunk(teacher, kind, count, chunk_size, expected):
+    progress = []
+    report = importer.import_students(*_file(kind, _student_rows([_student(i) for i in range(count)])), teacher,
+                                      chunk_size=chunk_size, progress=lambda r: progress.append(r["inserted"]))
+    assert progress == expected
+    assert report == {"inserted": count, "errors": []}
+    assert len(_usernames(teacher)) == count
+
+
+@pytest.mark.parametrize("kind", FORMATS)
+def test_header_only_file_inserts_nothing(teacher, kind):
+    assert importer.import_students(*_file(kind, [STUDENT_HEADER]), teacher) == {"inserted": 0, "errors": []}
+
+
+# -------------------------------
+# نمرات
+# -------------------------------
+
+@pytest.fixture
+def students(teacher):
+    importer.import_students(*_file("csv", _student_rows([_student(1), _student(2)])), teacher)
+    return {row["student"]: row["id"] for row in fetch_rows("students", "id, student", cached=False)}
+
+
+def _scores(teacher):
+    rows = fetch_rows("scores", "student_id, درس, نمره, تاریخ", {"teacher_id": teacher["id"]},
+                      order_by="id", cached=False)
+    return [(row["student_id"], row["درس"], row["نمره"], row["تاریخ"]) for row in rows]
+
+
+@pytest.mark.parametrize("kind", FORMATS)
+def test_scores_header_in_other_order(teacher, students, kind):
+    rows = [["تاریخ", "نمره", "درس", "نام دانش‌آموز"],
+            ["2024-10-01", 3, "ریاضی", "دانش‌آموز 1"],
+            ["2024-10-02", 4, "علوم", "دانش‌آموز 2"]]
+    assert importer.import_scores(*_file(kind, rows), teacher) == {"inserted": 2, "errors": []}
+    assert _scores(teacher) == [(students["دانش‌آموز 1"], "ریاضی", 3, "2024-10-01"),
+                                (students["دانش‌آموز 2"], "علوم", 4, "2024-10-02")]
+
+
+@pytest.mark.parametrize("kind", FORMATS)
+def test_malformed_score_rows_are_reported(teacher, students, kind):
+    rows = [["student", "درس", "نمره", "تاریخ"],
+            ["دانش‌آموز 1", "ریاضی", 2, "2024-10-01"],
+            ["دانش‌آموز 1", "ریاضی", 5, None],
+            ["دانش‌آموز 1", "ریاضی", "2.5", None],
+            ["دانش‌آموز 1", "ریاضی", "nan", None],
+            [None, None, None, None],
+            ["دانش‌آموز 1", None, 3, None],
+            ["ناشناس", "ریاضی", 3, None],
+            ["دانش‌آموز 2", "علوم", 3, "1403/07/01"],
+            ["دانش‌آموز 2", "علوم", 1, "2024-10-03"]]
+    report = importer.import_scores(*_file(kind, rows), teacher, chunk_size=3)
+    assert report["inserted"] == 2
+    assert [(number, message.split(" ")[0]) for number, message in report["errors"]] == [
+        (3, "نمره"), (4, "نمره"), (5, "نمره"), (7, "ستون‌های"), (8, "دانش‌آموز"), (9, "تاریخ"),
+    ]
+    assert [score[2] for score in _scores(teacher)] == [2, 1]
+
+
+def test_excel_numbers_and_dates_are_converted(teacher, students):
+    rows = [["student", "درس", "نمره", "تاریخ"],
+            ["دانش‌آموز 1", "ریاضی", 3.0, datetime.datetime(2024, 10, 1)],
+            ["دانش‌آموز 1", "ریاضی", 2, datetime.date(2024, 10, 2)]]
+    assert importer.import_scores(*_file("xlsx", rows), teacher) == {"inserted": 2, "errors": []}
+    assert [score[2:] for score in _scores(teacher)] == [(3, "2024-10-01"), (2, "2024-10-02")]
@@ -0,0 +1,155 @@
+"""حافظه نهان پرس‌وجوها: TTL، حذف LRU و ابطال بر اساس ردیف‌های نوشته‌شده."""
+import threading
+
+import pytest
+
+from query_cache import QueryCache, make_key
+
+
+def test_entries_expire_after_ttl(clock):
+    cache = QueryCache(ttl=10, clock=clock)
+    cache.set("key", [1])
+    clock.now = 9
+    assert cache.get("key") == [1]
+    clock.now = 11
+    assert cache.get("key") is None
+    cache.set("short", [2], ttl=1)
+    clock.now = 12.5
+    assert cache.get("short") is None
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = QueryCache(maxsize=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+    assert cache.get("c") == 3
+
+
+def test_make_key_ignores_filter_order_and_list_order():
+    assert make_key("scores", "*", {"a": 1, "b": [2, 3]}) == make_key("scores", "*", {"b": [3, 2], "a": 1})
+
+
+def test_invalidate_rows_drops_only_matching_filters():
+    cache = QueryCache()
+    teacher_1 = make_key("scores", "*", {"teacher_id": 1})
+    teacher_2 = make_key("scores", "*", {"teacher_id": 2})
+    whole_table = make_key("scores", "*")
+    other_table = make_key("students", "*", {"teacher_id": 1})
+    for key in (teacher_1, teacher_2, whole_table, other_table):
+        cache.set(key, ["cached"])
+
+    cache.invalidate_rows("scores", [{"id": 7, "teacher_id": 1, "نمره": 3}])
+
+    assert cache.get(teacher_1) is None
+    assert cache.get(whole_table) is None
+    assert cache.get(teacher_2) == ["cached"]
+    assert cache.get(other_table) == ["cached"]
+
+
+def test_invalidate_rows_with_in_filter():
+    cache = QueryCache()
+    both = make_key("score_rollups", "*", {"teacher_id": [1, 2]})
+    others = make_key("score_rollups", "*", {"teacher_id": [3, 4]})
+    cache.set(both, ["cached"])
+    cache.set(others, ["cached"])
+
+    cache.invalidate_rows("score_rollups", [{"teacher_id": 2}])
+
+    assert cache.get(both) is None
+    assert cache.get(others) == ["cached"]
+
+
+def test_invalidate_rows_ignores_columns_missing_from_row():
+    # ردیف حذف‌شده با RETURNING همه ستون‌ها را دارد، ولی ردیف ورودی insert ممکن است نداشته باشد
+    cache = QueryCache()
+    key = make_key("students", "*", {"teacher_id": 1, "کلاس": "الف"})
+    cache.set(key, ["cached"])
+    cache.invalidate_rows("students", [{"teacher_id": 1}])
+    assert cache.get(key) is None
+
+
+def test_invalidate_rows_wildcard_matches_changed_columns():
+    # در update مقدار قبلی ستون تغییرکرده معلوم نیست
+    cache = QueryCache()
+    old_class = make_key("students", "*", {"teacher_id": 1, "کلاس": "الف"})
+    other_teacher = make_key("students", "*", {"teacher_id": 2, "کلاس": "الف"})
+    cache.set(old_class, ["cached"])
+    cache.set(other_teacher, ["cached"])
+
+    cache.invalidate_rows("students", [{"teacher_id": 1, "کلاس": "ب"}], wildcard=("کلاس",))
+
+    assert cache.get(old_class) is None
+    assert cache.get(other_teacher) == ["cached"]
+
+
+def test_invalidate_table_and_stats():
+    cache = QueryCache()
+    cache.set(make_key("scores", "*"), [])
+    cache.set(make_key("users", "*"), [])
+    cache.invalidate_table("scores")
+    assert cache.get(make_key("scores", "*")) is None
+    assert cache.get(make_key("users", "*")) == []
+    assert cache.stats() == {"size": 1, "hits": 1, "misses": 1}
+
+
+def test_load_invalidated_while_running_is_not_stored():
+    cache = QueryCache()
+    key = make_key("scores", "*", {"teacher_id": 1})
+
+    def load():
+        # نوشتنی که هم‌زمان با خواندن (پس از گرفتن ردیف‌های قدیمی) انجام می‌شود
+        cache.invalidate_rows("scores", [{"teacher_id": 1}])
+        return ["stale"]
+
+    assert cache.get_or_load(key, load) == ["stale"]
+    assert cache.get(key) is None
+    assert cache.get_or_load(key, lambda: ["fresh"]) == ["fresh"]
+    assert cache.get(key) == ["fresh"]
+
+
+def test_unrelated_write_during_load_keeps_result():
+    cache = QueryCache()
+    key = make_key("scores", "*", {"teacher_id": 1})
+
+    def load():
+        cache.invalidate_rows("scores", [{"teacher_id": 2}])
+        cache.invalidate_table("students")
+        return ["rows"]
+
+    cache.get_or_load(key, load)
+    assert cache.get(key) == ["rows"]
+
+
+def test_concurrent_load_and_invalidate():
+    cache = QueryCache()
+    key = make_key("scores", "*", {"teacher_id": 1})
+    started, written = threading.Event(), threading.Event()
+
+    def load():
+        started.set()
+        written.wait(5)
+        return ["stale"]
+
+    reader = threading.Thread(target=cache.get_or_load, args=(key, load))
+    reader.start()
+    started.wait(5)
+    cache.invalidate_rows("scores", [{"teacher_id": 1}])
+    written.set()
+    reader.join(5)
+    assert cache.get(key) is None
+
+
+def test_failed_load_stores_nothing():
+    cache = QueryCache()
+
+    def load():
+        raise RuntimeError("network")
+
+    with pytest.raises(RuntimeError):
+        cache.get_or_load("key", load)
+    assert cache.get("key") is None
+    assert cache.get_or_load("key", lambda: [1]) == [1]
@@ -0,0 +1,67 @@
+"""محدودسازی نرخ ورود با سطل توکن و ساعت ساختگی."""
+import pytest
+
+import ratelimit
+from ratelimit import TokenBucketLimiter
+
+
+def test_burst_then_refill(clock):
+    limiter = TokenBucketLimiter(capacity=3, rate=0.5, clock=clock)
+    assert [limiter.acquire("ip") for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert limiter.acquire("ip") == pytest.approx(2.0)
+    assert limiter.retry_after("ip") == pytest.approx(2.0)
+    clock.now = 1
+    assert limiter.acquire("ip") == pytest.approx(1.0)
+    clock.now = 2
+    assert limiter.acquire("ip") == 0.0
+    assert limiter.acquire("other") == 0.0
+
+
+def test_refill_is_capped_at_capacity(clock):
+    limiter = TokenBucketLimiter(capacity=2, rate=1, clock=clock)
+    limiter.acquire("ip")
+    clock.now = 100
+    assert [limiter.acquire("ip") for _ in range(3)][-1] > 0
+
+
+def test_retry_after_does_not_consume(clock):
+    limiter = TokenBucketLimiter(capacity=1, rate=1, clock=clock)
+    assert limiter.retry_after("ip") == 0.0
+    assert limiter.retry_after("ip") == 0.0
+    assert limiter.acquire("ip") == 0.0
+
+
+def test_reset_and_lru_eviction(clock):
+    limiter = TokenBucketLimiter(capacity=1, rate=0.1, maxsize=2, clock=clock)
+    limiter.acquire("a")
+    assert limiter.acquire("a") > 0
+    limiter.reset("a")
+    assert limiter.acquire("a") == 0.0
+    limiter.acquire("b")
+    limiter.acquire("c")
+    # «a» قدیمی‌ترین سطل بود و حذف شد (یعنی دوباره پر حساب می‌شود)
+    assert limiter.acquire("a") == 0.0
+    assert limiter.acquire("c") > 0
+
+
+@pytest.fixture
+def login_limits(monkeypatch, clock):
+    monkeypatch.setattr(ratelimit, "login_by_ip", TokenBucketLimiter(3, 0.5, clock=clock))
+    monkeypatch.setattr(ratelimit, "login_by_username", TokenBucketLimiter(2, 0.1, clock=clock))
+    return clock
+
+
+def test_check_login_limits_username(login_limits):
+    assert [ratelimit.check_login("1.2.3.4", "ali") for _ in range(2)] == [0, 0]
+    assert ratelimit.check_login("1.2.3.4", "ali") == 10
+    # نام کاربری مسدود توکن IP را هدر نمی‌دهد
+    assert ratelimit.check_login("1.2.3.4", "sara") == 0
+    login_limits.now = 10
+    assert ratelimit.check_login("1.2.3.4", "ali") == 0
+
+
+def test_check_login_limits_ip(login_limits):
+    assert [ratelimit.check_login("1.2.3.4", name) for name in ("a", "b", "c")] == [0, 0, 0]
+    assert [ratelimit.check_login("1.2.3.4", "d") for _ in range(2)] == [2, 2]
+    # IP مسدود توکن‌های نام کاربری را مصرف نکرده است
+    assert [ratelimit.check_login("5.6.7.8", "d") for _ in range(2)] == [0, 0]
@@ -0,0 +1,139 @@
+"""جدول تجمیعی نمرات: به‌روزرسانی افزایشی باید همان نتیجه بازسازی کامل را بدهد."""
+import random
+import threading
+import time
+
+import pandas as pd
+import pytest
+
+import data_access
+import rollups
+
+COMPARED_COLUMNS = rollups.KEY_COLUMNS + rollups.DISPLAY_COLUMNS + rollups.STAT_COLUMNS
+TEACHERS = {1: "آموزگار یک", 2: "آموزگار دو"}
+STUDENTS = {10: "علی", 11: "سارا", 12: "مبینا"}
+LESSONS = ["ریاضی", "علوم"]
+# تاریخ‌های کم تا نمره‌های هم‌تاریخ (و گره در آخرین نمره) زیاد پیش بیاید
+DATES = ["1403/07/01", "1403/07/08", "1403/07/15"]
+
+
+def _score(rng):
+    teacher_id = rng.choice(list(TEACHERS))
+    student_id = rng.choice(list(STUDENTS))
+    return {
+        "teacher_id": teacher_id, "آموزگار": TEACHERS[teacher_id],
+        "student_id": student_id, "student": STUDENTS[student_id],
+        "درس": rng.choice(LESSONS), "نمره": rng.randint(1, 4), "تاریخ": rng.choice(DATES),
+    }
+
+
+def _rollup_table():
+    rows = data_access.fetch_rows("score_rollups", cached=False)
+    return sorted(tuple(row[column] for column in COMPARED_COLUMNS) for row in rows)
+
+
+@pytest.mark.parametrize("seed", range(8))
+def test_incremental_rollups_match_rebuild(sqlite_db, seed):
+    rng = random.Random(seed)
+    for _ in range(120):
+        ids = [row["id"] for row in data_access.fetch_rows("scores", "id", cached=False)]
+        action = rng.random()
+        if not ids or action < 0.35:
+            data_access.add_score(_score(rng))
+        elif action < 0.5:
+            data_access.add_scores([_score(rng) for _ in range(rng.randint(2, 5))])
+        elif action < 0.75:
+            data_access.update_score(rng.choice(ids), rng.randint(1, 4))
+        else:
+            data_access.delete_score(rng.choice(ids))
+
+    incremental = _rollup_table()
+    data_access.rebuild_rollups()
+    assert incremental == _rollup_table()
+
+
+def test_rebuild_with_filters_keeps_other_groups(sqlite_db):
+    rng = random.Random(0)
+    data_access.add_scores([_score(rng) for _ in range(30)])
+    before = _rollup_table()
+    assert data_access.rebuild_rollups({"teacher_id": 1}) == sum(1 for row in before if row[0] == 1)
+    assert _rollup_table() == before
+
+
+def test_update_of_tied_last_score_rebuilds(sqlite_db):
+    # دو نمره هم‌مقدار در آخرین تاریخ: آخرین نمره همان ردیف با شناسه بزرگ‌تر است
+    base = {"teacher_id": 1, "آموزگار": "آموزگار یک", "student_id": 10, "student": "علی", "درس": "ریاضی"}
+    scores = [(1, "1403/07/01"), (2, "1403/07/15"), (2, "1403/07/15"), (4, "1403/07/01")]
+    ids = [row["id"] for row in data_access.add_scores([{**base, "نمره": v, "تاریخ": d} for v, d in scores])]
+    data_access.update_score(ids[1], 3)
+    assert _rollup_table()[0][-2:] == (2, "1403/07/15")
+    incremental = _rollup_table()
+    data_access.rebuild_rollups()
+    assert incremental == _rollup_table()
+
+
+def _rollups_df(rows):
+    return pd.DataFrame(rows, columns=["teacher_id", "student_id", "آموزگار", "student", "درس", "تعداد", "مجموع"])
+
+
+def test_same_named_students_are_ranked_separately():
+    df = _rollups_df([
+        (1, 10, "آموزگار یک", "علی", "ریاضی", 2, 8),
+        (1, 11, "آموزگار یک", "علی", "ریاضی", 2, 4),
+        (1, 12, "آموزگار یک", "سارا", "ریاضی", 1, 3),
+    ])
+    averages = rollups.student_averages(df).set_index("student_id")
+    assert averages["نمره"].to_dict() == {10: 4.0, 11: 2.0, 12: 3.0}
+    assert averages["student"].to_dict() == {10: "علی (10)", 11: "علی (11)", 12: "سارا"}
+    named = rollups.student_averages(df, names={10: "علی رضایی", 11: "علی کریمی"}).set_index("student_id")
+    assert named["student"].to_dict() == {10: "علی رضایی", 11: "علی کریمی", 12: "سارا"}
+
+
+def test_teacher_comparison_groups_by_teacher_id():
+    df = _rollups_df([
+        # آموزگار ۱ پس از تغییر نام با دو نام در جدول تجمیعی آمده است
+        (1, 10, "نام قدیمی", "علی", "ریاضی", 1, 4),
+        (1, 11, "نام جدید", "سارا", "ریاضی", 1, 2),
+        # دو آموزگار هم‌نام
+        (2, 12, "مریم احمدی", "رضا", "علوم", 1, 3),
+        (3, 13, "مریم احمدی", "رضا", "علوم", 1, 1),
+    ])
+    stats, lessons = rollups.teacher_comparison(df)
+    assert list(stats.index) == ["نام جدید", "مریم احمدی (2)", "مریم احمدی (3)"]
+    assert stats["دانش‌آموزان"].tolist() == [2, 1, 1]
+    assert list(lessons.index) == list(stats.index)
+    named, _ = rollups.teacher_comparison(df, teacher_names={1: "زهرا موسوی", 2: "مریم احمدی", 3: "مریم رحیمی"})
+    assert list(named.index) == ["زهرا موسوی", "مریم احمدی", "مریم رحیمی"]
+
+
+def test_concurrent_writes_to_one_group_are_not_lost(sqlite_db, monkeypatch):
+    # خواندن کند جدول تجمیعی بازه خواندن-تغییر-نوشتن را باز می‌کند؛ به‌روزرسانی اتمی نباید به آن وابسته باشد
+    select = sqlite_db.select
+
+    def slow_select(table, *args, **kwargs):
+        rows = select(table, *args, **kwargs)
+        if table == "score_rollups":
+            time.sleep(0.002)
+        return rows
+
+    monkeypatch.setattr(sqlite_db, "select", slow_select)
+    base = {"teacher_id": 1, "آموزگار": "آموزگار یک", "student_id": 10, "student": "علی", "درس": "ریاضی"}
+    seeded = data_access.add_scores([{**base, "نمره": 2, "تاریخ": "1403/07/01"} for _ in range(40)])
+
+    def write(worker):
+        rng = random.Random(worker)
+        for i in range(20):
+            data_access.add_score({**base, "نمره": rng.randint(1, 4), "تاریخ": rng.choice(DATES)})
+            data_access.update_score(seeded[worker * 10 + i % 10]["id"], rng.randint(1, 4))
+        data_access.delete_score(seeded[worker * 10]["id"])
+
+    threads = [threading.Thread(target=write, args=(worker,)) for worker in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    incremental = _rollup_table()
+    assert incremental[0][5] == 40 + 4 * 20 - 4
+    data_access.rebuild_rollups()
+    assert incremental == _rollup_table()
@@ -0,0 +1,66 @@
+"""توکن‌های نشست: صدور، بازگرداندن، رد توکن دست‌کاری‌شده و ابطال."""
+import pytest
+
+import sessions
+from query_cache import QueryCache
+
+TEACHER = {"id": 3, "نام_کاربر": "teacher1", "نقش": "آموزگار", "school_id": 1}
+STUDENT = {"id": 3, "نام_کاربر": "ali", "نقش": "دانش‌آموز", "school_id": 1}
+
+
+@pytest.fixture(autouse=True)
+def session_store(monkeypatch, clock):
+    monkeypatch.setattr(sessions, "sessions", QueryCache(maxsize=100, ttl=60, clock=clock))
+
+
+def test_issued_token_resumes_profile():
+    token = sessions.issue(TEACHER)
+    profile = sessions.resume(token)
+    assert profile == TEACHER
+    # نمایه برگردانده‌شده کپی است و تغییر آن نشست را عوض نمی‌کند
+    profile["نقش"] = "مدیر سامانه"
+    assert sessions.resume(token) == TEACHER
+
+
+def test_session_expires(clock):
+    token = sessions.issue(TEACHER)
+    clock.now = 61
+    assert sessions.resume(token) is None
+
+
+@pytest.mark.parametrize("tamper", [
+    lambda token: token[:-1] + ("A" if token[-1] != "A" else "B"),
+    lambda token: "e30." + token.split(".")[1],
+    lambda token: token.split(".")[0],
+    lambda token: "",
+    lambda token: None,
+])
+def test_tampered_token_is_rejected(tamper):
+    token = sessions.issue(TEACHER)
+    assert sessions.resume(tamper(token)) is None
+
+
+def test_revoke_ends_only_that_session():
+    first, second = sessions.issue(TEACHER), sessions.issue(TEACHER)
+    sessions.revoke(first)
+    assert sessions.resume(first) is None
+    assert sessions.resume(second) == TEACHER
+    sessions.revoke("not-a-token")
+
+
+def test_rotate_replaces_the_token():
+    old = sessions.issue(TEACHER)
+    profile, new = sessions.rotate(old)
+    assert profile == TEACHER and new != old
+    assert sessions.resume(old) is None
+    assert sessions.resume(new) == TEACHER
+    assert sessions.rotate(old) == (None, None)
+
+
+def test_revoke_account_ends_all_its_sessions():
+    # شناسه یکسان در دو جدول متفاوت دو حساب جداست
+    tokens = [sessions.issue(TEACHER), sessions.issue(TEACHER)]
+    student = sessions.issue(STUDENT)
+    sessions.revoke_account("users", TEACHER["id"])
+    assert all(sessions.resume(token) is None for token in tokens)
+    assert sessions.resume(student) == STUDENT
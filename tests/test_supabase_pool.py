@@ -0,0 +1,108 @@
+"""Pool کلاینت‌های Supabase با کلاینت جعلی: تکرار خواندن‌ها، نوشتن‌ها و اشباع."""
+import threading
+import time
+
+import httpx
+import pytest
+
+from data_access import SupabaseBackend
+from supabase_utils import ClientPool, PoolTimeout
+
+
+class FakeClient:
+    """کلاینتی که ``failures`` بار اول خطای گذرای شبکه می‌دهد و بعد پاسخ می‌دهد."""
+
+    def __init__(self, failures=0, error=httpx.ConnectError):
+        self.failures = failures
+        self.error = error
+        self.calls = 0
+
+    def execute(self):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise self.error("connection reset")
+        return "ok"
+
+
+def _pool(client, **kwargs):
+    return ClientPool.from_clients([client], retries=2, backoff=0, **kwargs)
+
+
+def test_read_retries_transient_error_then_succeeds():
+    client = FakeClient(failures=2)
+    pool = _pool(client)
+    assert SupabaseBackend(pool=pool)._read(lambda c: c) == "ok"
+    assert client.calls == 3
+    stats = pool.stats()
+    assert stats["retries"] == 2 and stats["failures"] == 0
+    assert stats["checkouts"] == 3 and stats["in_use"] == 0 and stats["idle"] == 1
+
+
+def test_read_gives_up_after_retry_limit():
+    client = FakeClient(failures=10)
+    pool = _pool(client)
+    with pytest.raises(httpx.ConnectError):
+        SupabaseBackend(pool=pool)._read(lambda c: c)
+    assert client.calls == 3
+    assert pool.stats()["retries"] == 2 and pool.stats()["failures"] == 1
+    # کلاینت پس از خطا به Pool برمی‌گردد
+    assert pool.stats()["in_use"] == 0 and pool.stats()["idle"] == 1
+
+
+@pytest.mark.parametrize("error", [httpx.ReadTimeout, httpx.RemoteProtocolError])
+def test_write_is_never_retried(error):
+    client = FakeClient(failures=1, error=error)
+    pool = _pool(client)
+    with pytest.raises(error):
+        SupabaseBackend(pool=pool)._write(lambda c: c)
+    assert client.calls == 1
+    assert pool.stats()["retries"] == 0 and pool.stats()["failures"] == 1
+
+
+def test_non_transient_error_is_not_retried():
+    client = FakeClient(failures=1, error=ValueError)
+    pool = _pool(client)
+    with pytest.raises(ValueError):
+        pool.run(lambda c: c.execute(), retry=True)
+    assert client.calls == 1 and pool.stats()["retries"] == 0
+
+
+def test_saturation_counters_when_all_clients_are_checked_out():
+    pool = ClientPool.from_clients([FakeClient(), FakeClient()], wait=0.01)
+    with pool.client(), pool.client():
+        stats = pool.stats()
+        assert stats["in_use"] == 2 and stats["idle"] == 0 and stats["saturation"] == 1.0
+        with pytest.raises(PoolTimeout):
+            pool.run(lambda c: c.execute())
+    stats = pool.stats()
+    assert stats["waits"] == 1 and stats["pool_timeouts"] == 1 and stats["waiting"] == 0
+    assert stats["peak_in_use"] == 2 and stats["in_use"] == 0 and stats["saturation"] == 0.0
+
+
+def test_waiting_thread_gets_the_released_client():
+    pool = ClientPool.from_clients([FakeClient()], wait=5)
+    results = []
+    with pool.client():
+        waiter = threading.Thread(target=lambda: results.append(pool.run(lambda c: c.execute())))
+        waiter.start()
+        deadline = time.monotonic() + 5
+        while pool.stats()["waiting"] == 0 and time.monotonic() < deadline:
+            time.sleep(0.001)
+        assert pool.stats()["waiting"] == 1
+    waiter.join(5)
+    assert results == ["ok"]
+    stats = pool.stats()
+    assert stats["waits"] == 1 and stats["pool_timeouts"] == 0 and stats["waiting"] == 0
+
+
+def test_clients_are_created_lazily_up_to_size():
+    created = []
+    pool = ClientPool(lambda: created.append(FakeClient()) or created[-1], size=2, wait=0.01)
+    pool.run(lambda c: c.execute())
+    pool.run(lambda c: c.execute())
+    assert len(created) == 1
+    with pool.client(), pool.client():
+        assert len(created) == 2
+        with pytest.raises(PoolTimeout):
+            pool.run(lambda c: c.execute())
+    assert pool.stats()["created"] == 2
@@ -0,0 +1,247 @@
+"""ستون‌هایی که پنل‌ها می‌خوانند باید در ``views.VIEW_COLUMNS`` اعلام شده باشند.
+
+آزمون زمان اجرا DataFrame هر نما را مثل پنل‌ها با ``fetch_view`` می‌سازد و
+بررسی می‌کند که ستون اعلام‌نشده KeyError بدهد. آزمون ایستا ``main.py`` و
+``panel_data.py`` را با هم تجزیه می‌کند: هر DataFrame حاصل از ``fetch_view``
+(مستقیم، از ``fetch_concurrently`` یا تابعی که نتیجه آن را برمی‌گرداند، یا پس
+از فیلتر/مرتب‌سازی و ارسال به تابع دیگر همین دو ماژول) دنبال می‌شود و نام
+ستون‌های ثابتی که از آن خوانده می‌شود باید در نمای همان DataFrame باشد.
+"""
+import ast
+import os
+
+import pytest
+
+from data_access import fetch_view
+from views import VIEW_COLUMNS, view_columns
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PANEL_MODULES = ("main.py", "panel_data.py")
+
+VIEW_TABLES = [(view, table) for view, tables in VIEW_COLUMNS.items() for table in tables]
+
+# متدهایی که همان ستون‌ها را نگه می‌دارند (ردیف‌ها را فیلتر یا مرتب می‌کنند)
+ROW_METHODS = {"sort_values", "reset_index", "copy", "head", "tail", "drop_duplicates", "dropna", "iloc"}
+# متدهایی که نام ستون را به عنوان آرگومان می‌گیرند
+COLUMN_METHODS = {"sort_values", "groupby", "set_index", "drop_duplicates", "pivot_table"}
+COLUMN_KEYWORDS = {"by", "subset", "columns", "index", "values"}
+
+
+# -------------------------------
+# زمان اجرا
+# -------------------------------
+
+@pytest.mark.parametrize("view, table", VIEW_TABLES)
+def test_fetch_view_projects_declared_columns(sqlite_db, view, table):
+    df = fetch_view(view, table)
+    assert list(df.columns) == list(view_columns(view, table))
+    for column in view_columns(view, table):
+        df[column]
+
+
+@pytest.mark.parametrize("view, table", VIEW_TABLES)
+def test_undeclared_column_raises(sqlite_db, view, table):
+    df = fetch_view(view, table)
+    schema = [row[1] for row in sqlite_db.connection().execute(f'PRAGMA table_info("{table}")')]
+    undeclared = [column for column in schema if column not in view_columns(view, table)]
+    assert undeclared
+    for column in undeclared:
+        with pytest.raises(KeyError):
+            df[column]
+
+
+# -------------------------------
+# بررسی ایستای main.py
+# -------------------------------
+
+def _view_call(node):
+    """(نما، جدول) برای ``fetch_view(...)`` یا ``partial(fetch_view, ...)``."""
+    if not isinstance(node, ast.Call) or not isinstance(node.func, ast.Name):
+        return None
+    args = node.args
+    if node.func.id == "partial" and args and isinstance(args[0], ast.Name) and args[0].id == "fetch_view":
+        args = args[1:]
+    elif node.func.id != "fetch_view":
+        return None
+    if len(args) >= 2 and all(isinstance(arg, ast.Constant) for arg in args[:2]):
+        return args[0].value, args[1].value
+    return None
+
+
+def _names(node):
+    """نام ستون‌های ثابت در یک آرگومان (رشته یا فهرست رشته‌ها)."""
+    if isinstance(node, ast.Constant) and isinstance(node.value, str):
+        return [node.value]
+    if isinstance(node, (ast.List, ast.Tuple)):
+        return [element.value for element in node.elts
+                if isinstance(element, ast.Constant) and isinstance(element.value, str)]
+    return []
+
+
+def _concurrent_views(node):
+    """نام ← (نما، جدول) برای ``fetch_concurrently({...})``، وگرنه None."""
+    if (isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id == "fetch_concurrently"
+            and node.args and isinstance(node.args[0], ast.Dict)):
+        return {key.value: _view_call(query) for key, query in zip(node.args[0].keys, node.args[0].values)
+                if _view_call(query)}
+    return None
+
+
+def _called(call, functions):
+    """نام تابع این ماژول‌ها که ``call`` صدا می‌زند (``f(...)`` یا ``panel_data.f(...)``)، وگرنه None."""
+    if not isinstance(call, ast.Call):
+        return None
+    func = call.func
+    if isinstance(func, ast.Name) and func.id in functions:
+        return func.id
+    if isinstance(func, ast.Attribute) and isinstance(func.value, ast.Name) and func.attr in functions:
+        return func.attr
+    return None
+
+
+def _assignments(node):
+    target = node.targets[0]
+    if isinstance(target, ast.Name):
+        return [(target.id, node.value)]
+    if isinstance(target, ast.Tuple) and isinstance(node.value, ast.Tuple):
+        return [(element.id, value) for element, value in zip(target.elts, node.value.elts)
+                if isinstance(element, ast.Name)]
+    return []
+
+
+def _frame(node, frames):
+    """نمای DataFrame ای که عبارت ``node`` به آن می‌رسد (فیلتر و مرتب‌سازی ردیف‌ها)، وگرنه None."""
+    if isinstance(node, ast.Name):
+        return frames.get(node.id)
+    if isinstance(node, ast.Subscript):
+        if isinstance(node.value, ast.Attribute) and node.value.attr in ("loc", "iloc"):
+            return _frame(node.value.value, frames) if not isinstance(node.slice, ast.Tuple) else None
+        return _frame(node.value, frames) if not _names(node.slice) else None
+    if isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute) and node.func.attr in ROW_METHODS:
+        return _frame(node.func.value, frames)
+    return None
+
+
+def _column_reads(node, frames):
+    """(نما، جدول، ستون) برای هر خواندن ستون ثابت از یک DataFrame نما در ``node``.
+
+    ستون‌هایی که همان تابع به DataFrame نما اضافه می‌کند (مثلاً «سطح عملکرد») کنار گذاشته می‌شوند.
+    """
+    derived = {
+        name for child in ast.walk(node)
+        if isinstance(child, ast.Subscript) and isinstance(child.ctx, ast.Store) and _frame(child.value, frames)
+        for name in _names(child.slice)
+    }
+    for child in ast.walk(node):
+        if isinstance(child, ast.Subscript) and isinstance(child.ctx, ast.Load):
+            if isinstance(child.value, ast.Attribute) and child.value.attr == "loc":
+                frame, columns = _frame(child.value.value, frames), (
+                    _names(child.slice.elts[1]) if isinstance(child.slice, ast.Tuple) else [])
+            else:
+                frame, columns = _frame(child.value, frames), _names(child.slice)
+        elif (isinstance(child, ast.Call) and isinstance(child.func, ast.Attribute)
+              and child.func.attr in COLUMN_METHODS):
+            frame = _frame(child.func.value, frames)
+            columns = [name for arg in child.args[:1] for name in _names(arg)]
+            columns += [name for keyword in child.keywords if keyword.arg in COLUMN_KEYWORDS
+                        for name in _names(keyword.value)]
+        else:
+            continue
+        if frame:
+            for column in columns:
+                if column not in derived:
+                    yield (*frame, column, child.lineno)
+
+
+def _panel_frames(*trees):
+    """برای هر تابع ماژول‌های پنل: نام متغیر یا پارامتر ← (نما، جدول)."""
+    functions = {node.name: node for tree in trees for node in tree.body if isinstance(node, ast.FunctionDef)}
+    frames = {name: {} for name in functions}
+    # توابعی که نتیجه fetch_concurrently را مستقیم برمی‌گردانند (مثل panel_data.teacher_data)
+    returned = {
+        name: views for name, function in functions.items()
+        for node in ast.walk(function) if isinstance(node, ast.Return)
+        for views in [_concurrent_views(node.value)] if views
+    }
+    assignments, groups = {}, {}
+    for name, function in functions.items():
+        assignments[name] = [pair for node in ast.walk(function) if isinstance(node, ast.Assign)
+                             for pair in _assignments(node)]
+        groups[name] = {}
+        for var, value in assignments[name]:
+            if _view_call(value):
+                frames[name][var] = _view_call(value)
+            elif _concurrent_views(value) is not None:
+                groups[name][var] = _concurrent_views(value)
+            elif _called(value, returned):
+                groups[name][var] = returned[_called(value, returned)]
+
+    def bind(function, var, frame):
+        if frame and var not in frames[function]:
+            frames[function][var] = frame
+            return True
+        return False
+
+    # تا رسیدن به نقطه ثابت: نتیجه‌های fetch_concurrently، DataFrame های مشتق
+    # (فیلتر یا مرتب‌شده) و DataFrame هایی که به توابع دیگر main.py فرستاده می‌شوند
+    changed = True
+    while changed:
+        changed = False
+        for name, function in functions.items():
+            for var, value in assignments[name]:
+                if (isinstance(value, ast.Subscript) and isinstance(value.value, ast.Name)
+                        and value.value.id in groups[name] and isinstance(value.slice, ast.Constant)):
+                    changed |= bind(name, var, groups[name][value.value.id].get(value.slice.value))
+                else:
+                    changed |= bind(name, var, _frame(value, frames[name]))
+            for call in ast.walk(function):
+                callee = _called(call, functions)
+                if not callee:
+                    continue
+                params = [arg.arg for arg in functions[callee].args.args]
+                bound = list(zip(params, call.args)) + [(keyword.arg, keyword.value) for keyword in call.keywords]
+                for param, arg in bound:
+                    changed |= bind(callee, param, _frame(arg, frames[name]))
+    return functions, frames
+
+
+def _main_column_reads():
+    trees, modules = [], {}
+    for module in PANEL_MODULES:
+        with open(os.path.join(ROOT, module), encoding="utf-8") as f:
+            trees.append(ast.parse(f.read()))
+        modules.update({node.name: module for node in trees[-1].body if isinstance(node, ast.FunctionDef)})
+    functions, frames = _panel_frames(*trees)
+    return [(f"{modules[name]}:{read[3]} {name}", *read[:3]) for name, function in functions.items() if frames[name]
+            for read in _column_reads(function, frames[name])]
+
+
+def test_main_reads_only_declared_columns():
+    reads = _main_column_reads()
+    # اگر تحلیل چیزی پیدا نکند، خودش خراب شده است
+    assert {view for _, view, _, _ in reads} >= {"teacher_students", "school_teachers", "student_panel"}
+    # توابع داده panel_data هم با DataFrame های نما دنبال می‌شوند
+    assert any(where.startswith("panel_data.py") for where, _, _, _ in reads)
+    undeclared = [
+        f"{where}: {view}/{table} ستون «{column}» را اعلام نکرده است"
+        for where, view, table, column in reads
+        if column not in view_columns(view, table)
+    ]
+    assert not undeclared, "\n".join(undeclared)
+
+
+def test_static_check_detects_undeclared_column():
+    source = '''
+def panel(profile):
+    data = fetch_concurrently({"scores": partial(fetch_view, "student_panel", "scores", {})})
+    scores_df = data["scores"]
+    show(scores_df[scores_df["درس"] == "ریاضی"])
+
+
+def show(df):
+    return df.sort_values("تاریخ")["نمره"]
+'''
+    functions, frames = _panel_frames(ast.parse(source))
+    reads = [read for name, function in functions.items() for read in _column_reads(function, frames[name])]
+    assert ("student_panel", "scores", "تاریخ", 9) in reads
+    assert "تاریخ" not in view_columns("student_panel", "scores")
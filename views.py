@@ -0,0 +1,52 @@
+"""ستون‌های مورد نیاز هر نما (بخش پنل) از هر جدول.
+
+لایه داده (``data_access.fetch_view``) فقط همین ستون‌ها را از پایگاه داده
+می‌خواند و DataFrame را دقیقاً با همین ستون‌ها می‌سازد؛ اگر نمایی به ستونی
+دسترسی پیدا کند که اینجا اعلام نشده، با KeyError متوقف می‌شود. هنگام
+افزودن ستون جدید به یک پنل، ابتدا آن را به نمای مربوط اضافه کنید.
+
+نماهایی که بر اساس دانش‌آموز یا آموزگار گروه‌بندی می‌کنند شناسه‌ها را هم
+می‌خوانند؛ نام‌ها فقط برای نمایش‌اند و ممکن است تکراری باشند.
+"""
+
+VIEW_COLUMNS = {
+    # پنل آموزگار: فهرست دانش‌آموزان و بخش مدیریت
+    "teacher_students": {
+        "students": ("id", "student", "نام_کاربر", "پایه", "کلاس", "مدرسه"),
+    },
+    # مدیریت نمرات ثبت‌شده (ویرایش و حذف با id)
+    "score_management": {
+        "scores": ("id", "student", "درس", "نمره"),
+    },
+    # گزارش‌های فردی (پنل آموزگار و گزارش آموزگاران برای مدیر/معاون)
+    "individual_reports": {
+        "scores": ("student_id", "student", "درس", "نمره", "تاریخ"),
+    },
+    # آمار کلی کلاس و آمار آموزگار برای مدیر (از جدول تجمیعی)
+    "class_statistics": {
+        "score_rollups": ("student_id", "student", "درس", "تعداد", "مجموع"),
+    },
+    # مقایسه همه آموزگاران مدرسه (مدیر مدرسه)
+    "teacher_comparison": {
+        "score_rollups": ("teacher_id", "student_id", "آموزگار", "student", "درس", "تعداد", "مجموع"),
+    },
+    # فهرست آموزگاران مدرسه (مدیر و معاون)
+    "school_teachers": {
+        "users": ("id", "نام_کاربر", "نام_کامل"),
+    },
+    # نمایه نشست (یک بار هنگام ورود خوانده می‌شود؛ رمز عبور در آن نیست)
+    "profile": {
+        "users": ("id", "نام_کاربر", "نام_کامل", "نقش", "مدرسه", "school_id"),
+        "students": ("id", "student", "نام_کاربر", "پایه", "کلاس", "مدرسه", "آموزگار", "teacher_id", "school_id"),
+    },
+    # پنل دانش‌آموز
+    "student_panel": {
+        "scores": ("درس", "نمره"),
+        "score_rollups": ("درس", "تعداد", "مجموع"),
+    },
+}
+
+
+def view_columns(view, table):
+    """ستون‌های اعلام‌شده نمای ``view`` از جدول ``table`` (به ترتیب اعلام)."""
+    return VIEW_COLUMNS[view][table]